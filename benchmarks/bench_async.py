@@ -0,0 +1,95 @@
+""" Benchmarks asyncio batch transfers of many small files """
+import os
+
+import pytest
+from cupyopt.async_tasks import (
+    ObjstrFPutBatch,
+    SFTPGetBatch,
+    SFTPPutBatch,
+    SFTPRenameBatch,
+)
+from cupyopt.sftp_tasks import SFTPGet
+
+FILES = 200
+
+
+@pytest.fixture(name="small_files")
+def fixture_small_files(tmp_path):
+    """local directory of small files"""
+    file_paths = []
+    for num in range(FILES):
+        file_paths.append(str(tmp_path / f"small_{num}.txt"))
+        with open(file_paths[-1], "w", encoding="utf-8") as small_file:
+            small_file.write("lemur" * 200)
+    return file_paths
+
+
+def test_sftp_put_batch(benchmark, sftp_config, small_files):
+    """SFTPPutBatch of small files"""
+    benchmark(
+        SFTPPutBatch(known_hosts=None).run,
+        workfiles=small_files,
+        config_box=sftp_config,
+    )
+
+
+def test_sftp_get_batch(benchmark, sftp_config, small_files, tmp_path):
+    """SFTPGetBatch of small files"""
+    SFTPPutBatch(known_hosts=None).run(workfiles=small_files, config_box=sftp_config)
+    os.makedirs(tmp_path / "get", exist_ok=True)
+
+    benchmark(
+        SFTPGetBatch(known_hosts=None).run,
+        workfiles=[os.path.basename(file_path) for file_path in small_files],
+        config_box=sftp_config,
+        tempfolderpath=str(tmp_path / "get"),
+    )
+
+
+def test_sftp_get_sequential(benchmark, sftp_config, cnopts, small_files, tmp_path):
+    """SFTPGet of the same small files one connection at a time, for comparison"""
+    SFTPPutBatch(known_hosts=None).run(workfiles=small_files, config_box=sftp_config)
+    os.makedirs(tmp_path / "get", exist_ok=True)
+
+    def get_all():
+        for file_path in small_files:
+            SFTPGet().run(
+                workfile=os.path.basename(file_path),
+                config_box=sftp_config,
+                cnopts=cnopts,
+                tempfolderpath=str(tmp_path / "get"),
+            )
+
+    benchmark.pedantic(get_all, rounds=1)
+
+
+def test_sftp_rename_batch(benchmark, sftp_config):
+    """SFTPRenameBatch of 1000 files into a done folder and back"""
+    upload_dir = os.path.join(sftp_config.root_dir, sftp_config.target_dir)
+    workfiles = [f"rename_{num}.txt" for num in range(1000)]
+    for workfile in workfiles:
+        with open(os.path.join(upload_dir, workfile), "w", encoding="utf-8") as work:
+            work.write("lemur")
+
+    def rename_round_trip():
+        SFTPRenameBatch(known_hosts=None, target_folder="done").run(
+            workfiles=workfiles, config_box=sftp_config
+        )
+        SFTPRenameBatch(known_hosts=None, source_folder="done", target_folder=".").run(
+            workfiles=workfiles, config_box=sftp_config
+        )
+
+    benchmark(rename_round_trip)
+
+
+def test_objstr_fput_batch(benchmark, s3_config, objstr_client, small_files):
+    """ObjstrFPutBatch of small files into the bench bucket"""
+    assert objstr_client.bucket_exists("bench")
+
+    benchmark(
+        ObjstrFPutBatch().run,
+        file_paths=small_files,
+        config_box=s3_config,
+        bucket_name="bench",
+        prefix="batch/",
+    )
@@ -0,0 +1,15 @@
+""" Benchmarks dataframe export """
+import pytest
+from cupyopt.dataframe_tasks import DFExport
+
+
+@pytest.mark.parametrize("export_type", ["parquet", "csv", "feather", "avro"])
+def test_dfexport(benchmark, frame, tmp_path, export_type):
+    """DFExport to each file format"""
+    benchmark(
+        DFExport().run,
+        dataframe=frame,
+        df_name="bench",
+        export_type=export_type,
+        dir_name=str(tmp_path),
+    )
@@ -0,0 +1,36 @@
+""" Benchmarks passing results between tasks """
+import cloudpickle
+import pyarrow as pa
+from cupyopt.handoff import to_handoff
+
+
+def test_pickle_result(benchmark, frame):
+    """dataframe pickled into a prefect result and loaded by the next task"""
+    benchmark(lambda: cloudpickle.loads(cloudpickle.dumps(frame)))
+
+
+def test_arrow_handoff(benchmark, frame, tmp_path):
+    """dataframe handed off through a memory-mapped arrow IPC file"""
+
+    def handoff():
+        handoff_ref = cloudpickle.loads(
+            cloudpickle.dumps(to_handoff(frame, str(tmp_path)))
+        )
+        handoff_ref.load(arrow=True)
+        handoff_ref.remove()
+
+    benchmark(handoff)
+
+
+def test_arrow_handoff_table(benchmark, frame, tmp_path):
+    """arrow table handed off through a memory-mapped arrow IPC file"""
+    table = pa.Table.from_pandas(frame)
+
+    def handoff():
+        handoff_ref = cloudpickle.loads(
+            cloudpickle.dumps(to_handoff(table, str(tmp_path)))
+        )
+        handoff_ref.load(arrow=True)
+        handoff_ref.remove()
+
+    benchmark(handoff)
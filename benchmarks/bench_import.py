@@ -0,0 +1,29 @@
+""" Benchmarks cupyopt import time """
+import os
+import subprocess
+import sys
+
+import cupyopt
+import pytest
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import cupyopt",
+        "from cupyopt import ObjstrFPut",
+        "from cupyopt import SFTPGet",
+        "from cupyopt import DFExport",
+        "from cupyopt import *",
+    ],
+)
+def test_import(benchmark, statement):
+    """import time of cupyopt names in a fresh interpreter"""
+    src_dir = os.path.dirname(os.path.dirname(cupyopt.__file__))
+
+    benchmark.pedantic(
+        subprocess.run,
+        args=([sys.executable, "-c", statement],),
+        kwargs={"env": {**os.environ, "PYTHONPATH": src_dir}, "check": True},
+        rounds=5,
+    )
@@ -0,0 +1,85 @@
+""" Benchmarks object store tasks against an in-process s3 compatible server """
+import os
+
+from cupyopt.objectstore_tasks import (
+    ObjstrCopy,
+    ObjstrFGet,
+    ObjstrFPut,
+    ObjstrGetAsDF,
+    ObjstrSync,
+)
+
+
+def test_objstr_fput(benchmark, objstr_client, frame, tmp_path):
+    """ObjstrFPut of a csv file"""
+    file_path = str(tmp_path / f"fput_{len(frame.index)}.csv")
+    frame.to_csv(file_path, index=False)
+
+    benchmark(
+        ObjstrFPut().run, client=objstr_client, bucket_name="bench", file_path=file_path
+    )
+
+
+def test_objstr_fget(benchmark, objstr_client, frame, tmp_path):
+    """ObjstrFGet of a csv object"""
+    file_path = str(tmp_path / f"fget_{len(frame.index)}.csv")
+    frame.to_csv(file_path, index=False)
+    objstr_client.fput_object("bench", os.path.basename(file_path), file_path)
+
+    benchmark(
+        ObjstrFGet().run,
+        client=objstr_client,
+        bucket_name="bench",
+        object_name=os.path.basename(file_path),
+        file_path=str(tmp_path / "fget.csv"),
+    )
+
+
+def test_objstr_get_as_df(benchmark, objstr_client, frame, tmp_path):
+    """ObjstrGetAsDF of a csv object"""
+    file_path = str(tmp_path / f"getasdf_{len(frame.index)}.csv")
+    frame.to_csv(file_path, index=False)
+    objstr_client.fput_object("bench", os.path.basename(file_path), file_path)
+
+    dataframe = benchmark(
+        ObjstrGetAsDF().run,
+        client=objstr_client,
+        bucket_name="bench",
+        object_name=os.path.basename(file_path),
+        dftype="csv",
+    )
+
+    assert len(dataframe.index) == len(frame.index)
+
+
+def test_objstr_copy(benchmark, objstr_client, tmp_path):
+    """ObjstrCopy of 50 objects"""
+    object_names = []
+    for num in range(50):
+        file_path = str(tmp_path / f"copy_{num}.txt")
+        with open(file_path, "w", encoding="utf-8") as copy_file:
+            copy_file.write("lemur" * 1000)
+        objstr_client.fput_object("bench", f"copy/{num}.txt", file_path)
+        object_names.append(f"copy/{num}.txt")
+
+    benchmark(
+        ObjstrCopy().run,
+        client=objstr_client,
+        bucket_name="bench",
+        object_names=object_names,
+        target_prefix="copied/",
+    )
+
+
+def test_objstr_sync(benchmark, objstr_client, frame, tmp_path):
+    """ObjstrSync of a directory of 20 csv files, unchanged after the first round"""
+    for num in range(20):
+        frame.to_csv(str(tmp_path / f"sync_{num}.csv"), index=False)
+
+    benchmark(
+        ObjstrSync().run,
+        client=objstr_client,
+        bucket_name="bench",
+        dir_name=str(tmp_path),
+        prefix=f"sync_{len(frame.index)}/",
+    )
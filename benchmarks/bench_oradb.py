@@ -0,0 +1,13 @@
+""" Benchmarks database tasks against sqlite """
+from cupyopt.oradb_tasks import ORADBSelectToDataFrame
+
+
+def test_select_to_dataframe(benchmark, sqlite_engine, frame):
+    """ORADBSelectToDataFrame of the whole table"""
+    dataframe = benchmark(
+        ORADBSelectToDataFrame().run,
+        select_stmt="select * from bench",
+        engine=sqlite_engine,
+    )
+
+    assert len(dataframe.index) == len(frame.index)
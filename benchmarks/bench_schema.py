@@ -0,0 +1,24 @@
+""" Benchmarks schema validation """
+import pytest
+from cupyopt.schema_tasks import (
+    DFInferArrowSchema,
+    DFInferAvroSchema,
+    DFValidateSchemaArrow,
+    DFValidateSchemaAvro,
+)
+
+
+@pytest.mark.parametrize("mode", ["equals", "dtypes"])
+def test_validate_arrow(benchmark, frame, mode):
+    """DFValidateSchemaArrow in each mode"""
+    arsc = DFInferArrowSchema().run(dataframe=frame)
+
+    benchmark(DFValidateSchemaArrow().run, dataframe=frame, arsc=arsc, mode=mode)
+
+
+@pytest.mark.parametrize("engine", ["records", "columns"])
+def test_validate_avro(benchmark, frame, engine):
+    """DFValidateSchemaAvro with each engine"""
+    avsc = DFInferAvroSchema().run(dataframe=frame)
+
+    benchmark(DFValidateSchemaAvro().run, dataframe=frame, avsc=avsc, engine=engine)
@@ -0,0 +1,86 @@
+""" Benchmarks sftp tasks against an in-process sftp server """
+import gzip
+import os
+import shutil
+
+from cupyopt.sftp_tasks import SFTPGet, SFTPPoll, SFTPPut
+
+
+def test_sftp_put(benchmark, sftp_config, cnopts, frame, tmp_path):
+    """SFTPPut of a csv file"""
+    workfile = str(tmp_path / f"put_{len(frame.index)}.csv")
+    frame.to_csv(workfile, index=False)
+
+    benchmark(SFTPPut().run, workfile=workfile, config_box=sftp_config, cnopts=cnopts)
+
+
+def test_sftp_get(benchmark, sftp_config, cnopts, frame, tmp_path):
+    """SFTPGet of a csv file"""
+    workfile = f"get_{len(frame.index)}.csv"
+    frame.to_csv(
+        os.path.join(sftp_config.root_dir, sftp_config.target_dir, workfile),
+        index=False,
+    )
+
+    benchmark(
+        SFTPGet().run,
+        workfile=workfile,
+        config_box=sftp_config,
+        cnopts=cnopts,
+        tempfolderpath=str(tmp_path),
+    )
+
+
+def test_sftp_get_gzip(benchmark, sftp_config, cnopts, frame, tmp_path):
+    """SFTPGet of a gzipped csv file, decompressed as it's fetched"""
+    workfile = f"get_{len(frame.index)}.csv.gz"
+    frame.to_csv(
+        os.path.join(sftp_config.root_dir, sftp_config.target_dir, workfile),
+        index=False,
+    )
+
+    benchmark(
+        SFTPGet().run,
+        workfile=workfile,
+        config_box=sftp_config,
+        cnopts=cnopts,
+        tempfolderpath=str(tmp_path),
+        decompress="gzip",
+    )
+
+
+def test_sftp_get_then_gunzip(benchmark, sftp_config, cnopts, frame, tmp_path):
+    """SFTPGet of a gzipped csv file to disk, then decompressed to disk again"""
+    workfile = f"get_{len(frame.index)}.csv.gz"
+    frame.to_csv(
+        os.path.join(sftp_config.root_dir, sftp_config.target_dir, workfile),
+        index=False,
+    )
+
+    def get_then_gunzip():
+        localfile = SFTPGet().run(
+            workfile=workfile,
+            config_box=sftp_config,
+            cnopts=cnopts,
+            tempfolderpath=str(tmp_path),
+        )
+        with gzip.open(localfile, "rb") as source, open(
+            localfile[: -len(".gz")], "wb"
+        ) as target:
+            shutil.copyfileobj(source, target)
+
+    benchmark(get_then_gunzip)
+
+
+def test_sftp_poll(benchmark, sftp_config, cnopts):
+    """SFTPPoll of a directory with 200 files"""
+    for num in range(200):
+        filepath = os.path.join(
+            sftp_config.root_dir, sftp_config.target_dir, f"poll_{num}.txt"
+        )
+        with open(filepath, "w", encoding="utf-8") as poll_file:
+            poll_file.write("lemur")
+
+    files_df = benchmark(SFTPPoll().run, config_box=sftp_config, cnopts=cnopts)
+
+    assert len(files_df.index) >= 200
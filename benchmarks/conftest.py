@@ -0,0 +1,79 @@
+""" Fixtures for cupyopt benchmarks """
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from box import Box
+from sqlalchemy import create_engine
+
+# the service stand-ins and their fixtures are shared with the tests
+# pylint: disable=unused-import
+from tests.standins import (
+    fixture_cnopts,
+    fixture_known_hosts,
+    fixture_s3_client,
+    fixture_s3_config,
+    fixture_sftp_server,
+)
+
+# rows in the synthetic datasets, e.g. CUPYOPT_BENCH_ROWS=1000,100000,1000000
+ROWS = [
+    int(rows) for rows in os.environ.get("CUPYOPT_BENCH_ROWS", "1000,100000").split(",")
+]
+
+
+def synthetic_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    """dataframe of rows with integer, float, string, timestamp and null values"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "id": np.arange(rows, dtype="int64"),
+            "amount": rng.normal(100, 25, rows),
+            "animal": rng.choice(["lemur", "tiger", "leopard", "lynx"], rows),
+            "updated": pd.Timestamp("2021-01-01")
+            + pd.to_timedelta(rng.integers(0, 86400 * 365, rows), unit="s"),
+            "comment": pd.Series(
+                rng.choice(["ok", None, "late", "resubmitted"], rows), dtype="object"
+            ),
+        }
+    )
+
+
+@pytest.fixture(name="frame", params=ROWS, ids=[f"{rows}rows" for rows in ROWS])
+def fixture_frame(request):
+    """synthetic dataframe for each benchmark size"""
+    return synthetic_frame(request.param)
+
+
+@pytest.fixture(name="sftp_config", scope="session")
+def fixture_sftp_config(sftp_server):
+    """config box for the in-process sftp server with an upload directory"""
+    os.makedirs(os.path.join(sftp_server.root_dir, "upload"), exist_ok=True)
+
+    return Box(
+        {
+            "hostname": "127.0.0.1",
+            "port": sftp_server.port,
+            "username": "bench",
+            "password": "bench",
+            "target_dir": "upload",
+            "root_dir": sftp_server.root_dir,
+        }
+    )
+
+
+@pytest.fixture(name="objstr_client", scope="session")
+def fixture_objstr_client(s3_client):
+    """minio client for the in-process s3 compatible server with a bench bucket"""
+    s3_client.make_bucket("bench")
+
+    return s3_client
+
+
+@pytest.fixture(name="sqlite_engine")
+def fixture_sqlite_engine(tmp_path, frame):
+    """sqlite engine with the synthetic dataframe loaded as table bench"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    frame.to_sql("bench", engine, index=False)
+    return engine
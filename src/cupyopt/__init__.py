@@ -1,30 +1,79 @@
 """ Init for cupyopt base """
-from .dataframe_tasks import DFExport, DFColumnUpdate
-from .objectstore_tasks import (
-    ObjstrClient,
-    ObjstrFGet,
-    ObjstrFPut,
-    ObjstrGet,
-    ObjstrGetAsDF,
-    ObjstrMakeBucket,
-    ObjstrPut,
-)
-from .oradb_tasks import ORADBGetEngine, ORADBSelectToDataFrame
-from .sftp_tasks import (
-    DFGetOldestFile,
-    SFTPExists,
-    SFTPGet,
-    SFTPPoll,
-    SFTPPut,
-    SFTPRemove,
-)
-from .schema_tasks import (
-    DFInferArrowSchema,
-    ArrowSchemaToParquet,
-    ArrowSchemaFromParquet,
-    AvroSchema,
-    DFInferAvroSchema,
-    AvroSchemaToFile,
-    DFValidateSchemaArrow,
-    DFValidateSchemaAvro,
-)
+import importlib
+from typing import Any, List
+
+# task modules are imported on first use of one of their names, so a flow only
+# pays for the dependencies (pandas, pyarrow, pysftp, sqlalchemy...) it uses
+_LAZY_IMPORTS = {
+    ".async_tasks": [
+        "ObjstrFGetBatch",
+        "ObjstrFPutBatch",
+        "SFTPGetBatch",
+        "SFTPPutBatch",
+        "SFTPRemoveBatch",
+        "SFTPRenameBatch",
+    ],
+    ".avro_tasks": ["AvroSchemaToArrow", "AvroToArrow", "AvroToDF", "DFToAvro"],
+    ".handoff": ["ArrowHandoff"],
+    ".instrumentation": ["InstrumentedTask", "configure_metrics"],
+    ".dataframe_tasks": ["DFExport", "DFColumnUpdate", "DFTransform"],
+    ".objectstore_tasks": [
+        "ObjstrClient",
+        "ObjstrCompose",
+        "ObjstrCopy",
+        "ObjstrFGet",
+        "ObjstrFPut",
+        "ObjstrGet",
+        "ObjstrGetAsDF",
+        "ObjstrMakeBucket",
+        "ObjstrPut",
+        "ObjstrSensor",
+        "ObjstrSync",
+    ],
+    ".oradb_tasks": ["ORADBGetEngine", "ORADBSelectToDataFrame"],
+    ".sftp_tasks": [
+        "DFGetOldestFile",
+        "SFTPExists",
+        "SFTPGet",
+        "SFTPPoll",
+        "SFTPPut",
+        "SFTPRemove",
+        "SFTPSensor",
+    ],
+    ".schema_tasks": [
+        "DFInferArrowSchema",
+        "ArrowSchemaToParquet",
+        "ArrowSchemaFromParquet",
+        "AvroSchema",
+        "DFInferAvroSchema",
+        "AvroSchemaToFile",
+        "DFValidateSchemaArrow",
+        "DFValidateSchemaAvro",
+    ],
+    ".schema_registry_tasks": [
+        "LocalSchemaRegistry",
+        "ObjstrSchemaRegistry",
+        "SchemaRegistryGet",
+        "SchemaRegistryRegister",
+    ],
+    ".schema_evolution_tasks": ["DFProjectSchema", "SchemaCompatibility"],
+}
+
+_MODULES = {name: module for module, names in _LAZY_IMPORTS.items() for name in names}
+
+__all__ = list(_MODULES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_MODULES[name], __name__), name)
+
+    # cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(list(globals()) + __all__)
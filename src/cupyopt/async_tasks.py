@@ -0,0 +1,438 @@
+""" Asyncio batch transfer tasks for SFTP and object store """
+import asyncio
+import contextlib
+import os
+import posixpath
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Sequence
+
+import asyncssh
+import pandas as pd
+from box import Box
+from miniopy_async import Minio as AsyncMinio
+from prefect.utilities.tasks import defaults_from_attrs
+
+from .instrumentation import InstrumentedTask, measure
+
+# pylint: disable=arguments-differ, too-many-arguments
+
+DEFAULT_CONCURRENCY = 64
+
+
+async def _gather_limited(
+    names: Sequence[str],
+    transfer: Callable[[str], Awaitable[Any]],
+    max_concurrency: int = DEFAULT_CONCURRENCY,
+) -> pd.DataFrame:
+    """
+    run transfer for each name, at most max_concurrency at a time, into a status
+    frame: done, the status transfer returns or failed when it raises
+    """
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(name: str) -> dict:
+        async with semaphore:
+            try:
+                status = await transfer(name)
+            except Exception as err:  # pylint: disable=broad-except
+                # one failed transfer doesn't stop the rest of the batch
+                return {"File Name": name, "Status": "failed", "Error": str(err)}
+        return {"File Name": name, "Status": status or "done", "Error": None}
+
+    results = await asyncio.gather(*(limited(name) for name in names))
+
+    return pd.DataFrame(results, columns=["File Name", "Status", "Error"])
+
+
+def _log_failures(task: InstrumentedTask, status_df: pd.DataFrame):
+    """warn about the failed transfers in a status frame"""
+    failed = status_df[status_df["Status"] == "failed"]
+    if not failed.empty:
+        task.logger.warning(
+            "%s of %s transfers failed, first error: %s",
+            len(failed.index),
+            len(status_df.index),
+            failed.iloc[0]["Error"],
+        )
+
+
+async def _sftp_connect(
+    config_box: Box, known_hosts: Any = ()
+) -> asyncssh.SSHClientConnection:
+    """open an asyncssh connection with the config's private key or password"""
+
+    # We have to handle either a password or a key
+    if config_box.get("private_key_path"):
+        auth = {
+            "client_keys": [config_box["private_key_path"]],
+            "passphrase": config_box.get("private_key_passphrase"),
+        }
+    elif config_box.get("password"):
+        auth = {"password": config_box["password"], "client_keys": None}
+    else:
+        raise ValueError("The configuration must have a private_key_path or password")
+
+    with measure("connect_seconds"):
+        return await asyncssh.connect(
+            config_box["hostname"],
+            port=config_box.get("port", 22),
+            username=config_box["username"],
+            known_hosts=known_hosts,
+            **auth,
+        )
+
+
+class SFTPGetBatch(InstrumentedTask):
+    """
+    Fetch many files from the FTP server concurrently
+
+    All transfers share one SSH connection and SFTP session, driven from a
+    single event loop with at most max_concurrency files in flight. known_hosts
+    is passed to asyncssh, the default () reads ~/.ssh/known_hosts.
+
+    Returns a pd.DataFrame with the "File Name", "Status" (done or failed) and
+    "Error" of each file, which is fetched to tempfolderpath.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+        **kwargs: Any,
+    ):
+        self.max_concurrency = max_concurrency
+        self.known_hosts = known_hosts
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("max_concurrency", "known_hosts")
+    def run(
+        self,
+        workfiles: List[str],
+        config_box: Box,
+        tempfolderpath: str,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+    ) -> pd.DataFrame:
+
+        self.logger.info("SFTPGetBatch %s files", len(workfiles))
+
+        async def get_all() -> pd.DataFrame:
+            async with await _sftp_connect(config_box, known_hosts) as conn:
+                async with conn.start_sftp_client() as sftp:
+                    await sftp.chdir(config_box["target_dir"])
+
+                    async def get(workfile: str):
+                        await sftp.get(
+                            workfile, localpath=os.path.join(tempfolderpath, workfile)
+                        )
+
+                    return await _gather_limited(workfiles, get, max_concurrency)
+
+        status_df = asyncio.run(get_all())
+        _log_failures(self, status_df)
+
+        return status_df
+
+
+class SFTPPutBatch(InstrumentedTask):
+    """
+    Put many files on the FTP server concurrently
+
+    Files are put in the config's target_dir (created if missing) under their
+    basename, see SFTPGetBatch for the connection and concurrency.
+
+    Returns a pd.DataFrame with the "File Name", "Status" and "Error" of each file.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+        **kwargs: Any,
+    ):
+        self.max_concurrency = max_concurrency
+        self.known_hosts = known_hosts
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("max_concurrency", "known_hosts")
+    def run(
+        self,
+        workfiles: List[str],
+        config_box: Box,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+    ) -> pd.DataFrame:
+
+        self.logger.info("SFTPPutBatch %s files", len(workfiles))
+
+        async def put_all() -> pd.DataFrame:
+            async with await _sftp_connect(config_box, known_hosts) as conn:
+                async with conn.start_sftp_client() as sftp:
+                    if not await sftp.isdir(config_box["target_dir"]):
+                        await sftp.mkdir(config_box["target_dir"])
+                    await sftp.chdir(config_box["target_dir"])
+
+                    async def put(workfile: str):
+                        await sftp.put(workfile, remotepath=os.path.basename(workfile))
+
+                    return await _gather_limited(workfiles, put, max_concurrency)
+
+        status_df = asyncio.run(put_all())
+        _log_failures(self, status_df)
+
+        return status_df
+
+
+class SFTPRemoveBatch(InstrumentedTask):
+    """
+    Remove many files from the FTP server
+
+    The removes are pipelined over one SFTP session, see SFTPGetBatch for the
+    connection and concurrency.
+
+    Returns a pd.DataFrame with the "File Name", "Status" (done, missing or
+    failed) and "Error" of each file.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+        **kwargs: Any,
+    ):
+        self.max_concurrency = max_concurrency
+        self.known_hosts = known_hosts
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("max_concurrency", "known_hosts")
+    def run(
+        self,
+        workfiles: List[str],
+        config_box: Box,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+    ) -> pd.DataFrame:
+
+        self.logger.info("SFTPRemoveBatch %s files", len(workfiles))
+
+        async def remove_all() -> pd.DataFrame:
+            async with await _sftp_connect(config_box, known_hosts) as conn:
+                async with conn.start_sftp_client() as sftp:
+                    await sftp.chdir(config_box["target_dir"])
+
+                    async def remove(workfile: str) -> str:
+                        try:
+                            await sftp.remove(workfile)
+                        except asyncssh.SFTPNoSuchFile:
+                            return "missing"
+                        return "done"
+
+                    return await _gather_limited(workfiles, remove, max_concurrency)
+
+        status_df = asyncio.run(remove_all())
+        _log_failures(self, status_df)
+
+        return status_df
+
+
+class SFTPRenameBatch(InstrumentedTask):
+    """
+    Rename (move) many files between folders on the FTP server
+
+    Files move from source_folder under the config's target_dir ("root" for
+    target_dir itself) to target_folder, which is created once up front.
+    Each file is renamed without first checking it exists, so a move is one
+    round trip pipelined over a single SFTP session. Servers with SFTP v3 rename
+    semantics (e.g. OpenSSH) don't overwrite files already in target_folder and
+    those show as failed. See SFTPGetBatch for the connection and concurrency.
+
+    Returns a pd.DataFrame with the "File Name", "Status" (done, missing or
+    failed) and "Error" of each file.
+    """
+
+    def __init__(
+        self,
+        source_folder: str = "root",
+        target_folder: str = "done",
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+        **kwargs: Any,
+    ):
+        self.source_folder = source_folder
+        self.target_folder = target_folder
+        self.max_concurrency = max_concurrency
+        self.known_hosts = known_hosts
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "source_folder", "target_folder", "max_concurrency", "known_hosts"
+    )
+    def run(
+        self,
+        workfiles: List[str],
+        config_box: Box,
+        source_folder: str = "root",
+        target_folder: str = "done",
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        known_hosts: Any = (),
+    ) -> pd.DataFrame:
+
+        self.logger.info(
+            "SFTPRenameBatch %s files from %s to %s",
+            len(workfiles),
+            source_folder,
+            target_folder,
+        )
+
+        # "root" is special
+        source_dir = "." if source_folder == "root" else source_folder
+
+        async def rename_all() -> pd.DataFrame:
+            async with await _sftp_connect(config_box, known_hosts) as conn:
+                async with conn.start_sftp_client() as sftp:
+                    await sftp.chdir(config_box["target_dir"])
+                    if not await sftp.isdir(target_folder):
+                        await sftp.mkdir(target_folder)
+
+                    async def rename(workfile: str) -> str:
+                        try:
+                            await sftp.rename(
+                                posixpath.join(source_dir, workfile),
+                                posixpath.join(target_folder, workfile),
+                            )
+                        except asyncssh.SFTPNoSuchFile:
+                            return "missing"
+                        return "done"
+
+                    return await _gather_limited(workfiles, rename, max_concurrency)
+
+        status_df = asyncio.run(rename_all())
+        _log_failures(self, status_df)
+
+        return status_df
+
+
+@contextlib.asynccontextmanager
+async def _async_objstr_client(config_box: Box) -> AsyncIterator[AsyncMinio]:
+    """asyncio object store client for the config used by ObjstrClient"""
+    client = AsyncMinio(
+        endpoint=config_box.endpoint,
+        access_key=config_box.key,
+        secret_key=config_box.secret,
+        secure=config_box.get("secure", True),
+    )
+    try:
+        yield client
+    finally:
+        # older miniopy-async releases open a session per request instead
+        if hasattr(client, "close_session"):
+            await client.close_session()
+
+
+class ObjstrFGetBatch(InstrumentedTask):
+    """
+    Get many objects as files from object store concurrently
+
+    Uses an asyncio client for the config_box used by ObjstrClient, with at
+    most max_concurrency requests in flight from one event loop. Objects are
+    written under dir_name by object name.
+
+    Returns a pd.DataFrame with the "File Name" (object name), "Status" and
+    "Error" of each object.
+    """
+
+    def __init__(
+        self,
+        config_box: Box = None,
+        bucket_name: str = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs: Any,
+    ):
+        self.config_box = config_box
+        self.bucket_name = bucket_name
+        self.max_concurrency = max_concurrency
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("config_box", "bucket_name", "max_concurrency")
+    def run(
+        self,
+        object_names: List[str],
+        dir_name: str,
+        config_box: Box = None,
+        bucket_name: str = None,
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> pd.DataFrame:
+
+        self.logger.info(
+            "Getting %s objects under %s to %s",
+            len(object_names),
+            bucket_name,
+            dir_name,
+        )
+
+        async def get_all() -> pd.DataFrame:
+            async with _async_objstr_client(config_box) as client:
+
+                async def get(object_name: str):
+                    await client.fget_object(
+                        bucket_name, object_name, os.path.join(dir_name, object_name)
+                    )
+
+                return await _gather_limited(object_names, get, max_concurrency)
+
+        status_df = asyncio.run(get_all())
+        _log_failures(self, status_df)
+
+        return status_df
+
+
+class ObjstrFPutBatch(InstrumentedTask):
+    """
+    Put many files as objects in object store concurrently
+
+    Objects are named prefix followed by the file's basename, see
+    ObjstrFGetBatch for the client and concurrency.
+
+    Returns a pd.DataFrame with the "File Name", "Status" and "Error" of each file.
+    """
+
+    def __init__(
+        self,
+        config_box: Box = None,
+        bucket_name: str = None,
+        prefix: str = "",
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+        **kwargs: Any,
+    ):
+        self.config_box = config_box
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.max_concurrency = max_concurrency
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("config_box", "bucket_name", "prefix", "max_concurrency")
+    def run(
+        self,
+        file_paths: List[str],
+        config_box: Box = None,
+        bucket_name: str = None,
+        prefix: str = "",
+        max_concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> pd.DataFrame:
+
+        self.logger.info("Putting %s files under %s", len(file_paths), bucket_name)
+
+        async def put_all() -> pd.DataFrame:
+            async with _async_objstr_client(config_box) as client:
+
+                async def put(file_path: str):
+                    await client.fput_object(
+                        bucket_name, f"{prefix}{os.path.basename(file_path)}", file_path
+                    )
+
+                return await _gather_limited(file_paths, put, max_concurrency)
+
+        status_df = asyncio.run(put_all())
+        _log_failures(self, status_df)
+
+        return status_df
@@ -0,0 +1,574 @@
+""" Avro data functions """
+import io
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from itertools import chain
+from typing import Any, BinaryIO, Callable, Iterable, List, Optional, Union
+
+import fastavro as avro
+import pandas as pd
+import pyarrow as pa
+from prefect.utilities.tasks import defaults_from_attrs
+
+from .batches import DEFAULT_BATCH_SIZE, iter_frames
+from .instrumentation import InstrumentedTask
+from .schema_tasks import DFInferAvroSchema
+
+# pylint: disable=arguments-differ, too-many-arguments, too-many-instance-attributes
+# pylint: disable=too-many-branches, too-many-return-statements
+
+# fastavro's default bytes written between sync markers
+_FASTAVRO_SYNC_INTERVAL = 16000
+
+# default bytes written between sync markers, i.e. the approximate block size, of
+# about 1MB so per-block codec overhead is small compared to fastavro's default
+DEFAULT_SYNC_INTERVAL = 64 * _FASTAVRO_SYNC_INTERVAL
+
+# avro sync markers are 16 random bytes ending the header and every block
+_SYNC_SIZE = 16
+
+# codec aliases accepted in addition to fastavro's codec names
+_AVRO_CODECS = {None: "null", "zstd": "zstandard"}
+
+# codecs needing a library which isn't installed with fastavro, by module name
+_AVRO_CODEC_LIBRARIES = {
+    "snappy": ("snappy", "python-snappy"),
+    "zstandard": ("zstandard", "zstandard"),
+    "lz4": ("lz4", "lz4"),
+}
+
+
+class DFToAvro(InstrumentedTask):
+    """
+    Write dataframe to an avro container file
+
+    Records are encoded in blocks of about sync_interval bytes, compressed with
+    codec ("null", "deflate", "bzip2" or "xz", or "snappy", "zstd" and "lz4" if
+    python-snappy, zstandard or lz4 are installed). The dataframe may also be an
+    arrow table, dataset, record batch reader or an iterable of dataframes, which
+    are streamed to the file batch_size rows at a time. The avro schema is
+    inferred from the first batch when avsc isn't provided.
+
+    Returns the filepath written.
+    """
+
+    accepts_arrow = True
+
+    def __init__(
+        self,
+        filepath: str = None,
+        avsc: dict = None,
+        codec: str = "null",
+        sync_interval: int = DEFAULT_SYNC_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        **kwargs: Any,
+    ):
+        self.filepath = filepath
+        self.avsc = avsc
+        self.codec = codec
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("filepath", "avsc", "codec", "sync_interval", "batch_size")
+    def run(
+        self,
+        dataframe: Any,
+        filepath: str = None,
+        avsc: dict = None,
+        codec: str = "null",
+        sync_interval: int = DEFAULT_SYNC_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> str:
+
+        self.logger.info("Writing avro file %s with %s codec.", filepath, codec)
+
+        write_avro(
+            frames=iter_frames(dataframe, batch_size),
+            filepath=filepath,
+            avsc=avsc,
+            compression=codec,
+            batch_size=batch_size,
+            sync_interval=sync_interval,
+        )
+
+        return filepath
+
+
+def write_avro(
+    frames: Iterable[pd.DataFrame],
+    filepath: str,
+    avsc: dict = None,
+    compression: str = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sync_interval: int = DEFAULT_SYNC_INTERVAL,
+):
+    """
+    Write a stream of dataframes to one avro container file in blocks
+
+    compression is an avro codec, see DFToAvro. Raises ValueError for codecs
+    whose library isn't installed and for an empty stream, without writing the
+    file.
+    """
+
+    codec = _avro_codec(compression)
+
+    frames = iter(frames)
+    first_frame = next(frames, None)
+    if first_frame is None:
+        raise ValueError("No dataframes to write to avro.")
+
+    if not avsc:
+        avsc = DFInferAvroSchema().run(dataframe=first_frame)
+
+    def records():
+        for frame in chain([first_frame], frames):
+            for start in range(0, len(frame.index), batch_size):
+                chunk = frame.iloc[start : start + batch_size]
+                # missing values of any dtype are written as avro nulls
+                yield from chunk.astype(object).where(chunk.notna(), None).to_dict(
+                    orient="records"
+                )
+
+    with open(filepath, "wb") as avro_file:
+        avro.writer(
+            avro_file,
+            schema=avsc,
+            records=records(),
+            codec=codec,
+            sync_interval=sync_interval,
+        )
+
+
+def _avro_codec(compression: Optional[str]) -> str:
+    """fastavro codec name for an avro compression, checking its library is installed"""
+
+    codec = _AVRO_CODECS.get(compression, compression)
+    if codec in _AVRO_CODEC_LIBRARIES:
+        module, package = _AVRO_CODEC_LIBRARIES[codec]
+        if find_spec(module) is None:
+            raise ValueError(
+                f"The avro {codec} codec needs the {package} package, which isn't "
+                "installed. Install it or use the deflate codec."
+            )
+    return codec
+
+
+class AvroToDF(InstrumentedTask):
+    """
+    Read an avro container file into a dataframe
+
+    The file is decoded block by block. With max_workers above 1 (None for one
+    per cpu) the file is split into byte ranges which are aligned to the sync
+    markers between blocks and decoded in separate processes, then concatenated
+    in file order. columns limits the dataframe to those fields.
+
+    Returns a pd.Dataframe.
+    """
+
+    def __init__(
+        self,
+        filepath: str = None,
+        columns: List[str] = None,
+        max_workers: Optional[int] = 1,
+        **kwargs: Any,
+    ):
+        self.filepath = filepath
+        self.columns = columns
+        self.max_workers = max_workers
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("filepath", "columns", "max_workers")
+    def run(
+        self,
+        filepath: str = None,
+        columns: List[str] = None,
+        max_workers: Optional[int] = 1,
+    ) -> pd.DataFrame:
+
+        workers = max_workers or os.cpu_count() or 1
+        self.logger.info("Reading avro file %s with %s worker(s).", filepath, workers)
+
+        with open(filepath, "rb") as avro_file:
+            reader = avro.block_reader(avro_file)
+            header_end = avro_file.tell()
+            columns = columns or [
+                field["name"] for field in reader.writer_schema["fields"]
+            ]
+
+            if workers == 1:
+                frames = [
+                    pd.DataFrame.from_records(list(block), columns=columns)
+                    for block in reader
+                ]
+                return _concat_frames(frames, columns)
+
+        offsets = _split_offsets(filepath, header_end, workers)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(
+                executor.map(
+                    _read_avro_split,
+                    [filepath] * workers,
+                    [header_end] * workers,
+                    offsets[:-1],
+                    offsets[1:],
+                    [columns] * workers,
+                )
+            )
+
+        return _concat_frames(frames, columns)
+
+
+def _split_offsets(filepath: str, header_end: int, splits: int) -> List[int]:
+    """byte offsets splitting the blocks of an avro file into ranges"""
+    size = os.path.getsize(filepath)
+    split_size = -(-(size - header_end) // splits)
+    return [header_end + split * split_size for split in range(splits)] + [size]
+
+
+def _concat_frames(frames: List[pd.DataFrame], columns: List[str]) -> pd.DataFrame:
+    """concatenate non-empty frames, or an empty frame with columns"""
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _next_block(avro_file: BinaryIO, sync: bytes, offset: int, header_end: int) -> int:
+    """position of the first block starting at or after offset"""
+
+    if offset <= header_end:
+        return header_end
+
+    # a block starts right after each sync marker
+    avro_file.seek(offset - _SYNC_SIZE)
+    position, buffer = offset - _SYNC_SIZE, b""
+    while True:
+        data = avro_file.read(1024 * 64)
+        if not data:
+            return position + len(buffer)
+
+        buffer += data
+        index = buffer.find(sync)
+        if index >= 0:
+            return position + index + _SYNC_SIZE
+
+        # keep a marker's worth of bytes in case it spans reads
+        position += len(buffer) - (_SYNC_SIZE - 1)
+        buffer = buffer[-(_SYNC_SIZE - 1) :]
+
+
+def _read_avro_split(
+    filepath: str,
+    header_end: int,
+    start: int,
+    end: int,
+    columns: List[str],
+    schema: pa.lib.Schema = None,
+) -> Optional[Union[pd.DataFrame, pa.Table]]:
+    """
+    decode the blocks starting between start and end of an avro file, into
+    a pyarrow.Table when an arrow schema is provided
+    """
+
+    with open(filepath, "rb") as avro_file:
+        header = avro_file.read(header_end)
+        sync = header[-_SYNC_SIZE:]
+
+        start = _next_block(avro_file, sync, start, header_end)
+        end = _next_block(avro_file, sync, end, header_end)
+        if start >= end:
+            return None
+
+        avro_file.seek(start)
+        blocks = avro_file.read(end - start)
+
+    # the header followed by whole blocks is itself a valid container file
+    if schema is not None:
+        reader = avro.block_reader(io.BytesIO(header + blocks))
+        converter = _uuid_converter(reader.writer_schema)
+        return pa.Table.from_batches(
+            [_records_to_batch(block, schema, converter) for block in reader],
+            schema=schema,
+        )
+
+    return pd.DataFrame.from_records(
+        list(avro.reader(io.BytesIO(header + blocks))), columns=columns
+    )
+
+
+# arrow types for avro primitive types
+_AVRO_ARROW_TYPES = {
+    "null": pa.null(),
+    "boolean": pa.bool_(),
+    "int": pa.int32(),
+    "long": pa.int64(),
+    "float": pa.float32(),
+    "double": pa.float64(),
+    "bytes": pa.binary(),
+    "string": pa.string(),
+}
+
+# arrow types for avro logical types
+_AVRO_ARROW_LOGICAL_TYPES = {
+    "date": pa.date32(),
+    "time-millis": pa.time32("ms"),
+    "time-micros": pa.time64("us"),
+    "timestamp-millis": pa.timestamp("ms", tz="UTC"),
+    "timestamp-micros": pa.timestamp("us", tz="UTC"),
+    "local-timestamp-millis": pa.timestamp("ms"),
+    "local-timestamp-micros": pa.timestamp("us"),
+}
+
+
+def avro_to_arrow_type(avro_type: Any, named_types: dict = None) -> pa.DataType:
+    """
+    Arrow type for an avro type
+
+    Records map to structs, arrays to lists, maps to string keyed maps, enums to
+    dictionary encoded strings and fixed to fixed size binary. Unions are only
+    supported as a nullable type, i.e. null and one other type.
+    """
+
+    named_types = {} if named_types is None else named_types
+
+    if isinstance(avro_type, list):
+        branches = [branch for branch in avro_type if branch != "null"]
+        if len(branches) != 1:
+            raise ValueError(f"Unsupported avro union {avro_type}.")
+        return avro_to_arrow_type(branches[0], named_types)
+
+    if isinstance(avro_type, str):
+        if avro_type in _AVRO_ARROW_TYPES:
+            return _AVRO_ARROW_TYPES[avro_type]
+        if avro_type in named_types:
+            return named_types[avro_type]
+        raise ValueError(f"Unknown avro type {avro_type}.")
+
+    logical_type = avro_type.get("logicalType")
+    if logical_type in _AVRO_ARROW_LOGICAL_TYPES:
+        return _AVRO_ARROW_LOGICAL_TYPES[logical_type]
+    if logical_type == "decimal":
+        return pa.decimal128(avro_type["precision"], avro_type.get("scale", 0))
+
+    kind = avro_type["type"]
+    if kind == "record":
+        arrow_type = pa.struct(
+            [_avro_to_arrow_field(field, named_types) for field in avro_type["fields"]]
+        )
+    elif kind == "array":
+        arrow_type = pa.list_(avro_to_arrow_type(avro_type["items"], named_types))
+    elif kind == "map":
+        arrow_type = pa.map_(
+            pa.string(), avro_to_arrow_type(avro_type["values"], named_types)
+        )
+    elif kind == "enum":
+        arrow_type = pa.dictionary(pa.int32(), pa.string())
+    elif kind == "fixed":
+        arrow_type = pa.binary(avro_type["size"])
+    else:
+        return avro_to_arrow_type(kind, named_types)
+
+    if "name" in avro_type:
+        named_types[avro_type["name"]] = arrow_type
+        if "namespace" in avro_type:
+            named_types[f"{avro_type['namespace']}.{avro_type['name']}"] = arrow_type
+
+    return arrow_type
+
+
+def _avro_to_arrow_field(field: dict, named_types: dict) -> pa.Field:
+    """arrow field for an avro record field"""
+    field_type = field["type"]
+    nullable = field_type == "null" or (
+        isinstance(field_type, list) and "null" in field_type
+    )
+    return pa.field(
+        field["name"], avro_to_arrow_type(field_type, named_types), nullable=nullable
+    )
+
+
+def avro_to_arrow_schema(avsc: dict) -> pa.lib.Schema:
+    """Arrow schema for an avro record schema, see avro_to_arrow_type"""
+    return pa.schema(avro_to_arrow_type(avsc))
+
+
+def _uuid_converter(
+    avro_type: Any, named_types: dict = None
+) -> Optional[Callable[[Any], Any]]:
+    """
+    function converting the uuid.UUID values fastavro decodes uuid logical types
+    to, which arrow doesn't convert, to strings; None for types without uuids
+    """
+
+    named_types = {} if named_types is None else named_types
+
+    if isinstance(avro_type, list):
+        # only nullable unions are supported, as in avro_to_arrow_type
+        branches = [_uuid_converter(branch, named_types) for branch in avro_type]
+        branch = next(filter(None, branches), None)
+        if branch is None:
+            return None
+
+        def convert_union(value: Any) -> Any:
+            return None if value is None else branch(value)
+
+        return convert_union
+
+    if isinstance(avro_type, str):
+        return named_types.get(avro_type)
+
+    if avro_type.get("logicalType") == "uuid":
+        return str
+
+    kind = avro_type["type"]
+    if kind == "record":
+        fields = [
+            (field["name"], _uuid_converter(field["type"], named_types))
+            for field in avro_type["fields"]
+        ]
+        fields = [(name, convert) for name, convert in fields if convert]
+
+        def convert_record(record: dict) -> dict:
+            record = dict(record)
+            for name, convert in fields:
+                record[name] = convert(record[name])
+            return record
+
+        converter = convert_record if fields else None
+
+    elif kind in ("array", "map"):
+        convert = _uuid_converter(
+            avro_type["items" if kind == "array" else "values"], named_types
+        )
+
+        def convert_array(values: list) -> list:
+            return [convert(value) for value in values]
+
+        def convert_map(values: dict) -> dict:
+            return {key: convert(value) for key, value in values.items()}
+
+        converter = (
+            (convert_array if kind == "array" else convert_map) if convert else None
+        )
+
+    else:
+        converter = _uuid_converter(kind, named_types)
+
+    if "name" in avro_type and converter:
+        named_types[avro_type["name"]] = converter
+        if "namespace" in avro_type:
+            named_types[f"{avro_type['namespace']}.{avro_type['name']}"] = converter
+
+    return converter
+
+
+def _records_to_batch(
+    records: Iterable[dict],
+    schema: pa.lib.Schema,
+    converter: Callable[[dict], dict] = None,
+) -> pa.RecordBatch:
+    """
+    record batch from the dicts fastavro decodes a block's records to, converted
+    by arrow's struct converter rather than through a dataframe
+    """
+    if converter:
+        records = map(converter, records)
+    array = pa.array(list(records), type=pa.struct(schema))
+    return pa.RecordBatch.from_arrays(array.flatten(), schema=schema)
+
+
+class AvroSchemaToArrow(InstrumentedTask):
+    """
+    Convert avro schema (e.g. from AvroSchema) to arrow schema
+
+    Returns a pyarrow.Schema.
+    """
+
+    def __init__(
+        self,
+        avsc: dict = None,
+        **kwargs: Any,
+    ):
+        self.avsc = avsc
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("avsc")
+    def run(self, avsc: dict = None) -> pa.lib.Schema:
+
+        logging.info("Converting avro schema to arrow schema")
+
+        return avro_to_arrow_schema(avsc)
+
+
+class AvroToArrow(InstrumentedTask):
+    """
+    Read an avro container file into an arrow table
+
+    fastavro decodes each block's records to dicts, which arrow converts into a
+    record batch of the arrow schema mapped from the file's avro schema (see
+    AvroSchemaToArrow), without building a dataframe or inferring types. uuids
+    are read as strings. columns limits the table to those fields and
+    max_workers splits decoding across processes as in AvroToDF.
+
+    Returns a pyarrow.Table.
+    """
+
+    def __init__(
+        self,
+        filepath: str = None,
+        columns: List[str] = None,
+        max_workers: Optional[int] = 1,
+        **kwargs: Any,
+    ):
+        self.filepath = filepath
+        self.columns = columns
+        self.max_workers = max_workers
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("filepath", "columns", "max_workers")
+    def run(
+        self,
+        filepath: str = None,
+        columns: List[str] = None,
+        max_workers: Optional[int] = 1,
+    ) -> pa.Table:
+
+        workers = max_workers or os.cpu_count() or 1
+        self.logger.info(
+            "Reading avro file %s to arrow with %s worker(s).", filepath, workers
+        )
+
+        with open(filepath, "rb") as avro_file:
+            reader = avro.block_reader(avro_file)
+            header_end = avro_file.tell()
+
+            schema = avro_to_arrow_schema(reader.writer_schema)
+            if columns:
+                schema = pa.schema([schema.field(column) for column in columns])
+
+            if workers == 1:
+                converter = _uuid_converter(reader.writer_schema)
+                return pa.Table.from_batches(
+                    [_records_to_batch(block, schema, converter) for block in reader],
+                    schema=schema,
+                )
+
+        offsets = _split_offsets(filepath, header_end, workers)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            tables = executor.map(
+                _read_avro_split,
+                [filepath] * workers,
+                [header_end] * workers,
+                offsets[:-1],
+                offsets[1:],
+                [columns] * workers,
+                [schema] * workers,
+            )
+            tables = [table for table in tables if table is not None]
+
+        return pa.concat_tables(tables) if tables else schema.empty_table()
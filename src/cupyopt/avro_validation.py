@@ -0,0 +1,203 @@
+""" Avro validation of dataframe values """
+import datetime
+import decimal
+import os
+import uuid
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import Any, Iterator, List, Union
+
+import fastavro as avro
+import numpy as np
+import pandas as pd
+
+# pylint: disable=too-many-branches, too-many-locals
+
+
+def validate_avro_frame(
+    dataframe: pd.DataFrame, avsc: dict, engine: str = "records"
+) -> Union[bool, pd.DataFrame]:
+    """validate a single frame, a report frame for columns or bool for records"""
+    if engine == "columns":
+        return validate_avro_columns(dataframe, avsc)
+
+    return avro.validation.validate_many(
+        records=dataframe.replace(pd.NA, "").to_dict(orient="records"), schema=avsc
+    )
+
+
+def validate_avro_chunks(
+    frames: Iterator[pd.DataFrame],
+    avsc: dict,
+    engine: str = "records",
+    max_workers: int = None,
+) -> List[Union[bool, pd.DataFrame]]:
+    """validate frames across processes, stopping at the first failing frame"""
+
+    def failed(result: Union[bool, pd.DataFrame]) -> bool:
+        return not result.empty if engine == "columns" else not result
+
+    workers = max_workers or os.cpu_count() or 1
+    results, pending = [], set()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for frame in frames:
+                pending.add(executor.submit(validate_avro_frame, frame, avsc, engine))
+
+                # bound the chunks in flight so lazy inputs aren't read all at once
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                    if any(failed(result) for result in results):
+                        return results
+
+            for future in as_completed(pending):
+                results.append(future.result())
+                if failed(results[-1]):
+                    return results
+        finally:
+            # early exit, skip chunks which haven't started
+            for future in pending:
+                future.cancel()
+
+    return results
+
+
+# value ranges of the avro integer types
+_AVRO_INT_RANGES = {
+    "int": (-(2**31), 2**31 - 1),
+    "long": (-(2**63), 2**63 - 1),
+}
+
+# pandas inferred types (pd.api.types.infer_dtype) valid for avro primitive types
+_AVRO_INFERRED_TYPES = {
+    "boolean": {"boolean"},
+    "int": {"integer"},
+    "long": {"integer"},
+    "float": {"integer", "floating", "mixed-integer-float"},
+    "double": {"integer", "floating", "mixed-integer-float"},
+    "string": {"string"},
+    "bytes": {"bytes"},
+}
+
+# python types fastavro converts for avro logical types, other values are checked
+# against the underlying type
+_AVRO_LOGICAL_PYTHON_TYPES = {
+    "date": (datetime.date,),
+    "time-millis": (datetime.time,),
+    "time-micros": (datetime.time,),
+    "timestamp-millis": (datetime.datetime,),
+    "timestamp-micros": (datetime.datetime,),
+    "local-timestamp-millis": (datetime.datetime,),
+    "local-timestamp-micros": (datetime.datetime,),
+    "decimal": (decimal.Decimal,),
+    "uuid": (uuid.UUID,),
+}
+
+# python types valid for avro primitive types, used to find offending values
+_AVRO_PYTHON_TYPES = {
+    "boolean": (bool, np.bool_),
+    "int": (int, np.integer),
+    "long": (int, np.integer),
+    "float": (int, float, np.integer, np.floating),
+    "double": (int, float, np.integer, np.floating),
+    "string": (str,),
+    "bytes": (bytes,),
+}
+
+
+def validate_avro_columns(dataframe: pd.DataFrame, avsc: dict) -> pd.DataFrame:
+    """validate dataframe columns against avro record fields, returning failures"""
+
+    failures = []
+
+    for field in avsc["fields"]:
+        name, field_type = field["name"], field["type"]
+
+        # split optional fields into nullability and the single non-null type
+        nullable = isinstance(field_type, list) and "null" in field_type
+        if isinstance(field_type, list):
+            branches = [branch for branch in field_type if branch != "null"]
+            field_type = branches[0] if len(branches) == 1 else field_type
+
+        if name not in dataframe:
+            if not nullable:
+                failures.append((None, name, "missing column"))
+            continue
+
+        column = dataframe[name]
+        nulls = column.isna()
+
+        if not nullable:
+            failures.extend(
+                (row, name, "null value") for row in column.index[nulls.to_numpy()]
+            )
+
+        values = column[~nulls]
+        if values.empty:
+            continue
+
+        # logical type values (dates, times, decimals...) are converted by fastavro,
+        # any other values are checked against the underlying type
+        if isinstance(field_type, dict) and "logicalType" in field_type:
+            if pd.api.types.is_datetime64_any_dtype(values):
+                continue
+            logical_types = _AVRO_LOGICAL_PYTHON_TYPES.get(field_type["logicalType"])
+            if logical_types:
+                values = values[
+                    ~values.map(
+                        lambda value, types=logical_types: isinstance(value, types)
+                    ).to_numpy(dtype=bool)
+                ]
+                if values.empty:
+                    continue
+            field_type = field_type["type"]
+
+        if not isinstance(field_type, str) or field_type not in _AVRO_PYTHON_TYPES:
+            # complex types fall back to validating each value
+            failures.extend(
+                (row, name, f"invalid {_avro_type_name(field_type)} value")
+                for row, value in values.items()
+                if not avro.validation.validate(value, field_type, raise_errors=False)
+            )
+            continue
+
+        inferred = pd.api.types.infer_dtype(values, skipna=True)
+        if inferred not in _AVRO_INFERRED_TYPES[field_type]:
+            python_types = _AVRO_PYTHON_TYPES[field_type]
+            # booleans are ints in python but not valid avro numbers
+            invalid = values.map(
+                lambda value, types=python_types: not isinstance(value, types)
+                or (isinstance(value, (bool, np.bool_)) and bool not in types)
+            )
+            failures.extend(
+                (row, name, f"not a {field_type}")
+                for row in values.index[invalid.to_numpy()]
+            )
+            values = values[~invalid]
+
+        if field_type in _AVRO_INT_RANGES and not values.empty:
+            low, high = _AVRO_INT_RANGES[field_type]
+            if not pd.api.types.is_numeric_dtype(values):
+                values = pd.to_numeric(values)
+            out_of_range = (values < low) | (values > high)
+            failures.extend(
+                (row, name, f"out of {field_type} range")
+                for row in values.index[out_of_range.to_numpy()]
+            )
+
+    return pd.DataFrame(failures, columns=["Row", "Field", "Reason"])
+
+
+def _avro_type_name(field_type: Any) -> str:
+    """readable name of an avro type for validation reports"""
+    if isinstance(field_type, dict):
+        return field_type.get("type", "complex")
+    if isinstance(field_type, list):
+        return "union"
+    return str(field_type)
@@ -0,0 +1,80 @@
+""" Batch helpers for data which doesn't fit in memory """
+from typing import Any, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+DEFAULT_BATCH_SIZE = 1024 * 64
+
+
+def is_lazy(data: Any) -> bool:
+    """True for arrow dataset handles and batch readers, which are read in batches"""
+    return isinstance(data, (ds.Dataset, pa.RecordBatchReader))
+
+
+def _iter_items(data: Any, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Any]:
+    """iterate over the frames, tables or record batches which make up data"""
+    if isinstance(data, (pd.DataFrame, pa.Table, pa.RecordBatch)):
+        yield data
+    elif isinstance(data, ds.Dataset):
+        yield from data.to_batches(batch_size=batch_size)
+    else:
+        # batch readers and any other iterable of frames, tables or batches
+        yield from data
+
+
+def iter_frames(
+    data: Any, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over data as pandas dataframes
+
+    data may be a dataframe, arrow table, arrow dataset, record batch reader or an
+    iterable of dataframes, tables or record batches. Only one batch is held in
+    memory at a time unless data is already materialized.
+    """
+    for item in _iter_items(data, batch_size):
+        yield item if isinstance(item, pd.DataFrame) else item.to_pandas()
+
+
+def iter_tables(
+    data: Any, index: bool = True, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[pa.Table]:
+    """Iterate over data as arrow tables, see iter_frames for the types of data"""
+    for item in _iter_items(data, batch_size):
+        if isinstance(item, pd.DataFrame):
+            yield pa.Table.from_pandas(item, preserve_index=index)
+        elif isinstance(item, pa.RecordBatch):
+            yield pa.Table.from_batches([item])
+        else:
+            yield item
+
+
+def to_reader(
+    data: Any, index: bool = True, batch_size: int = DEFAULT_BATCH_SIZE
+) -> pa.RecordBatchReader:
+    """
+    Arrow record batch reader over data, see iter_frames for the types of data
+
+    The schema is taken from the first batch and later batches are cast to it, so
+    empty iterables raise a ValueError.
+    """
+    if isinstance(data, pa.RecordBatchReader):
+        return data
+
+    if isinstance(data, ds.Dataset):
+        return data.scanner(batch_size=batch_size).to_reader()
+
+    tables = iter_tables(data, index=index, batch_size=batch_size)
+    first_table = next(tables, None)
+    if first_table is None:
+        raise ValueError("No dataframes, tables or batches to read.")
+    schema = first_table.schema
+
+    def batches():
+        yield from first_table.to_batches()
+        for table in tables:
+            yield from table.cast(schema).to_batches()
+
+    return pa.RecordBatchReader.from_batches(schema, batches())
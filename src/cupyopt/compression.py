@@ -0,0 +1,197 @@
+""" Streaming compression and archive extraction for transferred files """
+import contextlib
+import gzip
+import io
+import os
+import shutil
+import tarfile
+import zipfile
+import zlib
+from typing import IO, Iterator, Optional
+
+# pylint: disable=consider-using-with
+
+CHUNK_SIZE = 1024 * 1024
+
+# file suffixes of each format, tar first so .tar.gz isn't taken for gzip
+_SUFFIXES = {
+    "tar": (".tar.gz", ".tgz", ".tar"),
+    "gzip": (".gz", ".gzip"),
+    "zip": (".zip",),
+}
+
+COMPRESSIONS = tuple(_SUFFIXES)
+
+
+def infer_compression(path: str, compression: Optional[str] = "infer") -> Optional[str]:
+    """
+    Compression or archive format of path, one of COMPRESSIONS or None
+
+    The format is inferred from the suffix of path when compression is 'infer'.
+    """
+
+    if compression == "infer":
+        lower = path.lower()
+        for name, suffixes in _SUFFIXES.items():
+            if lower.endswith(suffixes):
+                return name
+        return None
+
+    if compression is not None and compression not in COMPRESSIONS:
+        raise ValueError(
+            f"compression must be one of {COMPRESSIONS}, 'infer' or None, "
+            f"got {compression!r}."
+        )
+    return compression
+
+
+def strip_suffix(path: str, compression: str) -> str:
+    """path without the suffix of its compression or archive format"""
+
+    lower = path.lower()
+    for suffix in _SUFFIXES[compression]:
+        if lower.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+def _member_path(dir_name: str, member_name: str) -> str:
+    """local path of an archive member, refusing members outside dir_name"""
+
+    root = os.path.realpath(dir_name)
+    member_path = os.path.realpath(os.path.join(root, member_name))
+    if os.path.commonpath([root, member_path]) != root:
+        raise ValueError(f"Archive member {member_name} is outside {dir_name}.")
+    return member_path
+
+
+def extract(fileobj: IO[bytes], compression: str, path: str) -> str:
+    """
+    Decompress fileobj to the file path, or extract an archive into directory path
+
+    gzip and tar are streamed in a single pass, zip needs a seekable fileobj.
+    Only regular files and directories are extracted from tar archives, and
+    archive members outside path raise a ValueError.
+
+    Returns path
+    """
+
+    if compression == "gzip":
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as source, open(
+            path, "wb"
+        ) as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        return path
+
+    os.makedirs(path, exist_ok=True)
+
+    if compression == "zip":
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                member_path = _member_path(path, info.filename)
+                if info.is_dir():
+                    os.makedirs(member_path, exist_ok=True)
+                else:
+                    os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                    with archive.open(info) as source, open(
+                        member_path, "wb"
+                    ) as target:
+                        shutil.copyfileobj(source, target, CHUNK_SIZE)
+        return path
+
+    if compression == "tar":
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                member_path = _member_path(path, member.name)
+                if member.isdir():
+                    os.makedirs(member_path, exist_ok=True)
+                elif member.isfile():
+                    os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                    with archive.extractfile(member) as source, open(
+                        member_path, "wb"
+                    ) as target:
+                        shutil.copyfileobj(source, target, CHUNK_SIZE)
+        return path
+
+    raise ValueError(f"compression must be one of {COMPRESSIONS}, got {compression!r}.")
+
+
+@contextlib.contextmanager
+def open_decompressed(
+    fileobj: IO[bytes], compression: Optional[str]
+) -> Iterator[IO[bytes]]:
+    """
+    Readable stream of fileobj's content, decompressed as it's read
+
+    Archives are read from their first file. zip needs a seekable fileobj. The
+    stream and any archive opened for it are closed with the context, fileobj
+    is left open.
+    """
+
+    if compression is None:
+        yield fileobj
+        return
+
+    if compression == "gzip":
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as stream:
+            yield stream
+        return
+
+    if compression == "zip":
+        with zipfile.ZipFile(fileobj) as archive:
+            for member in archive.infolist():
+                if not member.is_dir():
+                    with archive.open(member) as stream:
+                        yield stream
+                    return
+
+    elif compression == "tar":
+        with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    with archive.extractfile(member) as stream:
+                        yield stream
+                    return
+
+    else:
+        raise ValueError(
+            f"compression must be one of {COMPRESSIONS}, got {compression!r}."
+        )
+
+    raise ValueError("The archive has no files.")
+
+
+class GzipReader(io.RawIOBase):
+    """
+    Readable gzip stream of fileobj, compressed as it's read
+
+    For uploading compressed data without writing a compressed copy first.
+    """
+
+    def __init__(
+        self, fileobj: IO[bytes], compresslevel: int = 6, chunk_size: int = CHUNK_SIZE
+    ):
+        super().__init__()
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        # wbits of 31 writes the gzip header and trailer
+        self.compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 31)
+        self.buffer = bytearray()
+        self.eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray) -> int:
+        while len(self.buffer) < len(buffer) and not self.eof:
+            chunk = self.fileobj.read(self.chunk_size)
+            if chunk:
+                self.buffer += self.compressor.compress(chunk)
+            else:
+                self.buffer += self.compressor.flush()
+                self.eof = True
+
+        size = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        return size
@@ -1,22 +1,58 @@
 """ Dataframe functions """
 import os
-from tempfile import mkstemp
-from typing import Any
+import time
+from tempfile import mkdtemp, mkstemp
+from typing import Any, Iterable, List, Union
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from box import Box
-from prefect import Task
+from minio import Minio
+from prefect.utilities.tasks import defaults_from_attrs
 
-# pylint: disable=arguments-differ, too-many-arguments, too-many-instance-attributes
+from .avro_tasks import write_avro
+from .batches import DEFAULT_BATCH_SIZE, is_lazy, iter_frames, to_reader
+from .instrumentation import InstrumentedTask
 
+# pylint: disable=arguments-differ, too-many-arguments, too-many-instance-attributes, too-many-locals
+# pylint: disable=no-member, too-many-branches, too-many-return-statements
+# pylint: disable=import-outside-toplevel
 
-class DFExport(Task):
+
+class DFExport(InstrumentedTask):
     """
     Exports dataframe to file formats using various options
 
+    With dataset=True and export_type="parquet" a hive-partitioned parquet dataset
+    directory is written instead of a single file, optionally synced into object
+    store when a client and bucket_name are provided.
+
+    With export_type="csv" the dataframe may also be an iterable of dataframes
+    (e.g. chunks from pd.read_sql) which are appended to the one file. Setting
+    csv_engine="arrow" writes through pyarrow's csv writer in batches, and
+    compression (e.g. "gzip" or "zstd") compresses the csv as it is written.
+
+    export_type="feather" writes an arrow IPC (feather v2) file, compressed with
+    "lz4" or "zstd" if requested. Uncompressed files can be reopened memory-mapped
+    without copying, e.g. pyarrow.feather.read_table(filepath, memory_map=True).
+
+    export_type="avro" writes an avro container file in blocks of batch_size rows
+    using avsc, or the schema from DFInferAvroSchema when not provided. The index
+    is not exported. compression sets the avro codec (e.g. "deflate"), see DFToAvro.
+
+    Every export type also accepts data larger than memory, as an arrow dataset,
+    record batch reader or iterable of dataframes / record batches, which is
+    written batch by batch.
+
     Return a filepaths for the exported Dataframe
     """
 
+    accepts_arrow = True
+
     def __init__(
         self,
         **kwargs: Any,
@@ -25,7 +61,7 @@ class DFExport(Task):
 
     def run(
         self,
-        dataframe: pd.DataFrame,
+        dataframe: Union[pd.DataFrame, pa.Table, ds.Dataset, Iterable[Any]],
         export_type: str,
         df_name: str,
         temp_name: bool = False,
@@ -35,9 +71,29 @@ class DFExport(Task):
         config_box: Box = None,
         index=True,
         header=True,
+        dataset: bool = False,
+        partition_cols: List[str] = None,
+        max_rows_per_file: int = 0,
+        row_group_size: int = None,
+        compression: str = None,
+        use_dictionary: bool = True,
+        client: Minio = None,
+        bucket_name: str = None,
+        object_prefix: str = "",
+        csv_engine: str = "pandas",
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        avsc: dict = None,
     ) -> str:
 
-        if temp_name and dir_name != "":
+        if export_type not in ("parquet", "csv", "feather", "avro"):
+            raise ValueError(f"Unsupported export_type {export_type}.")
+
+        if temp_name and dir_name != "" and dataset:
+            filepath = mkdtemp(
+                suffix=df_name_suffix, prefix=df_name_prefix, dir=dir_name
+            )
+
+        elif temp_name and dir_name != "":
             filepath = mkstemp(
                 suffix=df_name_suffix, prefix=df_name_prefix, dir=dir_name
             )[1]
@@ -53,15 +109,201 @@ class DFExport(Task):
 
         self.logger.info("Creating %s file %s from dataframe.", export_type, filepath)
 
-        if export_type == "parquet":
-            dataframe.to_parquet(path=filepath, index=index)
+        if export_type == "parquet" and dataset:
+            _write_parquet_dataset(
+                data=to_reader(dataframe, index=index, batch_size=batch_size),
+                base_dir=filepath,
+                partition_cols=partition_cols,
+                max_rows_per_file=max_rows_per_file,
+                row_group_size=row_group_size,
+                compression=compression or "snappy",
+                use_dictionary=use_dictionary,
+            )
+
+            if client and bucket_name:
+                # only flows syncing datasets need the object store tasks
+                from .objectstore_tasks import ObjstrSync
+
+                object_prefix = f"{object_prefix}{os.path.basename(filepath)}/"
+                ObjstrSync().run(
+                    client=client,
+                    bucket_name=bucket_name,
+                    dir_name=filepath,
+                    prefix=object_prefix,
+                )
+                return object_prefix
+
+        elif export_type == "parquet" and not isinstance(dataframe, pd.DataFrame):
+            _write_parquet(
+                reader=to_reader(dataframe, index=index, batch_size=batch_size),
+                filepath=filepath,
+                row_group_size=row_group_size,
+                compression=compression or "snappy",
+                use_dictionary=use_dictionary,
+            )
+        elif export_type == "parquet":
+            dataframe.to_parquet(
+                path=filepath,
+                index=index,
+                compression=compression or "snappy",
+                row_group_size=row_group_size,
+                use_dictionary=use_dictionary,
+            )
         elif export_type == "csv":
-            dataframe.to_csv(filepath, index=index, header=header)
+            if csv_engine == "arrow":
+                _write_csv_arrow(
+                    reader=to_reader(dataframe, index=index, batch_size=batch_size),
+                    filepath=filepath,
+                    header=header,
+                    compression=compression,
+                    batch_size=batch_size,
+                )
+            else:
+                count = -1
+                for count, frame in enumerate(iter_frames(dataframe, batch_size)):
+                    frame.to_csv(
+                        filepath,
+                        index=index,
+                        header=header and count == 0,
+                        mode="w" if count == 0 else "a",
+                        compression=compression,
+                    )
+                if count < 0:
+                    raise ValueError("No dataframes to write to csv.")
+        elif export_type == "feather":
+            _write_feather(
+                reader=to_reader(dataframe, index=index, batch_size=batch_size),
+                filepath=filepath,
+                compression=compression,
+            )
+        elif export_type == "avro":
+            write_avro(
+                frames=iter_frames(dataframe, batch_size),
+                filepath=filepath,
+                avsc=avsc,
+                compression=compression,
+                batch_size=batch_size,
+            )
 
         return filepath
 
 
-class DFColumnUpdate(Task):
+def _write_feather(
+    reader: pa.RecordBatchReader,
+    filepath: str,
+    compression: str = None,
+):
+    """write a stream of record batches to one arrow IPC (feather v2) file"""
+
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+
+    with pa.ipc.new_file(filepath, reader.schema, options=options) as writer:
+        for batch in reader:
+            writer.write_batch(batch)
+
+
+def _write_parquet(
+    reader: pa.RecordBatchReader,
+    filepath: str,
+    row_group_size: int = None,
+    compression: str = "snappy",
+    use_dictionary: bool = True,
+):
+    """write a stream of record batches to one parquet file"""
+
+    with pq.ParquetWriter(
+        filepath,
+        reader.schema,
+        compression=compression,
+        use_dictionary=use_dictionary,
+    ) as writer:
+        for batch in reader:
+            writer.write_table(
+                pa.Table.from_batches([batch]), row_group_size=row_group_size
+            )
+
+
+def _write_csv_arrow(
+    reader: pa.RecordBatchReader,
+    filepath: str,
+    header: bool = True,
+    compression: str = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+):
+    """write a stream of record batches to one (optionally compressed) csv"""
+
+    # index columns lead the row with blank headers if unnamed, as pandas
+    pandas_metadata = reader.schema.pandas_metadata or {}
+    index_cols = [
+        col for col in pandas_metadata.get("index_columns", []) if isinstance(col, str)
+    ]
+    columns = index_cols + [col for col in reader.schema.names if col not in index_cols]
+    names = ["" if name.startswith("__index_level_") else name for name in columns]
+
+    sink = pa.OSFile(filepath, "wb")
+    if compression:
+        sink = pa.CompressedOutputStream(sink, compression)
+
+    try:
+        with pacsv.CSVWriter(
+            sink,
+            pa.schema(
+                [
+                    reader.schema.field(col).with_name(name)
+                    for col, name in zip(columns, names)
+                ]
+            ),
+            write_options=pacsv.WriteOptions(
+                include_header=header, batch_size=batch_size
+            ),
+        ) as writer:
+            for batch in reader:
+                writer.write_table(
+                    pa.Table.from_batches([batch]).select(columns).rename_columns(names)
+                )
+    finally:
+        sink.close()
+
+
+def _write_parquet_dataset(
+    data: pa.RecordBatchReader,
+    base_dir: str,
+    partition_cols: List[str] = None,
+    max_rows_per_file: int = 0,
+    row_group_size: int = None,
+    compression: str = "snappy",
+    use_dictionary: bool = True,
+):
+    """write record batches as a (optionally hive-partitioned) parquet dataset"""
+
+    partitioning = None
+    if partition_cols:
+        partitioning = ds.partitioning(
+            pa.schema([data.schema.field(col) for col in partition_cols]),
+            flavor="hive",
+        )
+
+    # row groups can't be larger than the files which contain them
+    row_group_size = row_group_size or 1024 * 1024
+    if max_rows_per_file:
+        row_group_size = min(row_group_size, max_rows_per_file)
+
+    parquet_format = ds.ParquetFileFormat()
+    ds.write_dataset(
+        data=data,
+        base_dir=base_dir,
+        format=parquet_format,
+        file_options=parquet_format.make_write_options(
+            compression=compression, use_dictionary=use_dictionary
+        ),
+        partitioning=partitioning,
+        max_rows_per_file=max_rows_per_file,
+        max_rows_per_group=row_group_size,
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+class DFColumnUpdate(InstrumentedTask):
     """
     Rename and filter Pandas Dataframe columns using python dictionary.
 
@@ -69,10 +311,20 @@ class DFColumnUpdate(Task):
     pd.DataFrame.rename(columns=dict). For example: {"current":"new", "current2":"new2"}
 
     Columns in returned dataframe are filtered by those provided to be renamed.
+    Without a coldict all columns are kept. Columns named in drop are removed and
+    dtypes casts columns, keyed by their new names, in the same step.
+
+    With copy=False the returned dataframe shares column data with the original
+    instead of copying it, so modifying one in place affects the other. A
+    pyarrow.Table may be provided instead, which is never copied. An arrow
+    dataset or record batch reader is updated lazily, batch by batch, as the
+    returned record batch reader is read.
 
-    Returns a modified pd.Dataframe copy
+    Returns a modified pd.Dataframe copy (or pyarrow.Table / RecordBatchReader)
     """
 
+    accepts_arrow = True
+
     def __init__(
         self,
         **kwargs: Any,
@@ -80,16 +332,248 @@ class DFColumnUpdate(Task):
 
         super().__init__(**kwargs)
 
-    def run(self, dataframe: pd.DataFrame, coldict: dict) -> pd.DataFrame:
+    def run(
+        self,
+        dataframe: Union[pd.DataFrame, pa.Table, ds.Dataset, pa.RecordBatchReader],
+        coldict: dict = None,
+        copy: bool = True,
+        dtypes: dict = None,
+        drop: List[str] = None,
+    ) -> Union[pd.DataFrame, pa.Table, pa.RecordBatchReader]:
 
         self.logger.info(
             "Renaming and filtering dataframe columns using coldict key:values."
         )
 
-        # Remap column names
-        dataframe = dataframe.rename(columns=coldict)
+        if is_lazy(dataframe):
+            dataframe = to_reader(dataframe)
+
+        if coldict is None:
+            coldict = {col: col for col in _column_names(dataframe)}
+
+        if drop:
+            coldict = {key: val for key, val in coldict.items() if key not in drop}
+
+        if isinstance(dataframe, pa.Table):
+            return _update_table(dataframe, coldict, dtypes)
+
+        if isinstance(dataframe, pa.RecordBatchReader):
+            reader = dataframe
+            schema = _update_table(reader.schema.empty_table(), coldict, dtypes).schema
+
+            def batches():
+                for batch in reader:
+                    yield from _update_table(
+                        pa.Table.from_batches([batch]), coldict, dtypes
+                    ).to_batches()
 
-        # Filter columns based on the new names
-        dataframe = dataframe[[val for key, val in coldict.items()]].copy()
+            return pa.RecordBatchReader.from_batches(schema, batches())
+
+        if copy:
+            # Remap column names
+            dataframe = dataframe.rename(columns=coldict)
+
+            # Filter columns based on the new names
+            dataframe = dataframe[[val for key, val in coldict.items()]].copy()
+        else:
+            # select and rename in one pass, reusing the existing column data
+            dataframe = pd.DataFrame(
+                {val: dataframe[key] for key, val in coldict.items()}, copy=False
+            )
+
+        # only the cast columns are replaced, others are left as they are
+        for col, dtype in (dtypes or {}).items():
+            dataframe[col] = dataframe[col].astype(dtype)
 
         return dataframe
+
+
+def _update_table(table: pa.Table, coldict: dict, dtypes: dict = None) -> pa.Table:
+    """select, rename and cast arrow table columns for DFColumnUpdate"""
+    # select and rename_columns only reference the existing buffers
+    table = table.select(list(coldict.keys())).rename_columns(list(coldict.values()))
+    if dtypes:
+        table = _cast_table(table, dtypes)
+    return table
+
+
+def _column_names(
+    dataframe: Union[pd.DataFrame, pa.Table, pa.RecordBatchReader]
+) -> List[str]:
+    """column names of a pandas dataframe, arrow table or record batch reader"""
+    if isinstance(dataframe, pa.Table):
+        return dataframe.column_names
+    if isinstance(dataframe, pa.RecordBatchReader):
+        return dataframe.schema.names
+    return list(dataframe.columns)
+
+
+def _arrow_type(dtype: Union[str, pa.DataType]) -> pa.DataType:
+    """arrow type from an arrow type or its string alias, e.g. "int32" """
+    if isinstance(dtype, pa.DataType):
+        return dtype
+    return pa.type_for_alias(dtype)
+
+
+def _cast_table(table: pa.Table, dtypes: dict) -> pa.Table:
+    """cast the arrow table columns named in dtypes, leaving the others as they are"""
+    return table.cast(
+        pa.schema(
+            [
+                field.with_type(_arrow_type(dtypes[field.name]))
+                if field.name in dtypes
+                else field
+                for field in table.schema
+            ]
+        )
+    )
+
+
+# comparison operators usable in DFTransform filter conditions
+_FILTER_OPS = {
+    "==": pc.equal,
+    "!=": pc.not_equal,
+    ">": pc.greater,
+    ">=": pc.greater_equal,
+    "<": pc.less,
+    "<=": pc.less_equal,
+}
+
+
+class DFTransform(InstrumentedTask):
+    """
+    Apply a declarative list of transform steps to a Pandas Dataframe in one task.
+
+    The dataframe is converted to an arrow table once and every step runs as
+    vectorized arrow compute kernels over whole columns. Each step is a dict with
+    an "op" key, applied in order:
+
+    {"op": "rename", "columns": {"current": "new"}}
+    {"op": "cast", "columns": {"col": "int32"}}
+    {"op": "filter", "conditions": [{"column": "col", "op": ">=", "value": 3}]}
+        ops are ==, !=, >, >=, <, <=, in, isnull and notnull, combined with and
+    {"op": "derive", "name": "new", "func": "add", "args": ["col", 1]}
+        func is any arrow compute function, str args are column names and
+        {"literal": value} args are passed as scalars
+    {"op": "dedupe", "columns": ["col"]}
+        keeps the first row for each distinct value of columns (default all)
+    {"op": "trim", "columns": ["col"]}
+        strips whitespace from columns (default all string columns)
+
+    The time taken by each step is logged.
+
+    Returns a transformed pd.Dataframe (with a new index), or pyarrow.Table when
+    one is provided.
+    """
+
+    accepts_arrow = True
+
+    def __init__(
+        self,
+        steps: List[dict] = None,
+        **kwargs: Any,
+    ):
+        self.steps = steps
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("steps")
+    def run(
+        self, dataframe: Union[pd.DataFrame, pa.Table], steps: List[dict]
+    ) -> Union[pd.DataFrame, pa.Table]:
+
+        self.logger.info("Transforming dataframe using %s steps.", len(steps))
+
+        if isinstance(dataframe, pa.Table):
+            table = dataframe
+        else:
+            table = pa.Table.from_pandas(dataframe, preserve_index=False)
+
+        for count, step in enumerate(steps):
+            start = time.perf_counter()
+            table = _transform_step(table, step)
+
+            self.logger.info(
+                "Step %s (%s) took %.3fs leaving %s rows.",
+                count,
+                step["op"],
+                time.perf_counter() - start,
+                table.num_rows,
+            )
+
+        if isinstance(dataframe, pa.Table):
+            return table
+
+        return table.to_pandas()
+
+
+def _transform_step(table: pa.Table, step: dict) -> pa.Table:
+    """apply a single DFTransform step to an arrow table"""
+
+    operation = step["op"]
+
+    if operation == "rename":
+        return table.rename_columns(
+            [step["columns"].get(name, name) for name in table.column_names]
+        )
+
+    if operation == "cast":
+        return _cast_table(table, step["columns"])
+
+    if operation == "filter":
+        mask = None
+        for condition in step["conditions"]:
+            column = table[condition["column"]]
+
+            if condition["op"] == "in":
+                condition_mask = pc.is_in(
+                    column, value_set=pa.array(condition["value"])
+                )
+            elif condition["op"] == "isnull":
+                condition_mask = pc.is_null(column)
+            elif condition["op"] == "notnull":
+                condition_mask = pc.is_valid(column)
+            else:
+                condition_mask = _FILTER_OPS[condition["op"]](
+                    column, pa.scalar(condition["value"])
+                )
+
+            mask = condition_mask if mask is None else pc.and_(mask, condition_mask)
+
+        # nulls in the mask drop the row, same as a pandas comparison would
+        return table.filter(pc.fill_null(mask, False)) if mask is not None else table
+
+    if operation == "derive":
+        args = [
+            table[arg]
+            if isinstance(arg, str)
+            else pa.scalar(arg["literal"] if isinstance(arg, dict) else arg)
+            for arg in step["args"]
+        ]
+        derived = pc.call_function(step["func"], args)
+
+        if step["name"] in table.column_names:
+            return table.set_column(
+                table.column_names.index(step["name"]), step["name"], derived
+            )
+        return table.append_column(step["name"], derived)
+
+    if operation == "dedupe":
+        columns = step.get("columns") or table.column_names
+        duplicated = table.select(columns).to_pandas().duplicated(keep="first")
+        return table.filter(pa.array(~duplicated.to_numpy()))
+
+    if operation == "trim":
+        columns = step.get("columns") or [
+            field.name
+            for field in table.schema
+            if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+        ]
+        for column in columns:
+            table = table.set_column(
+                table.column_names.index(column),
+                column,
+                pc.utf8_trim_whitespace(table[column]),
+            )
+        return table
+
+    raise ValueError(f"Unsupported transform step op {operation}.")
@@ -0,0 +1,104 @@
+""" Memory-mapped arrow IPC handoff of task results """
+import os
+import sys
+import tempfile
+import uuid
+from typing import Any
+
+# pylint: disable=import-outside-toplevel
+
+# environment variable setting the directory handoff files are written to
+HANDOFF_DIR_ENV = "CUPYOPT_HANDOFF_DIR"
+
+
+class ArrowHandoff:
+    """
+    Reference to a task result held in an arrow IPC file on local disk
+
+    Only the reference is passed between tasks and pickled into prefect results.
+    table() memory maps the uncompressed file, so the data isn't copied or
+    deserialized and its pages are shared by every task opening it. The file is
+    left for the flow to clean up, e.g. with remove() or a per-run handoff_dir.
+    """
+
+    def __init__(self, path: str, num_rows: int, nbytes: int, pandas: bool = False):
+        self.path = path
+        self.num_rows = num_rows
+        self.nbytes = nbytes
+        self.pandas = pandas
+
+    def __repr__(self) -> str:
+        return f"ArrowHandoff({self.path!r}, num_rows={self.num_rows})"
+
+    def table(self) -> Any:
+        """the result as a pyarrow.Table over the memory-mapped file"""
+        import pyarrow as pa
+
+        # the table's buffers keep the mapping alive after the file is closed
+        with pa.memory_map(self.path) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def to_pandas(self) -> Any:
+        """the result as a pd.DataFrame, converted from the memory-mapped table"""
+        return self.table().to_pandas()
+
+    def load(self, arrow: bool = False) -> Any:
+        """
+        the result as a pyarrow.Table if arrow or it was one, else a pd.DataFrame
+
+        Tables loaded from a dataframe leave out the columns holding its index,
+        which are only kept for converting back to the dataframe.
+        """
+        if not arrow and self.pandas:
+            return self.to_pandas()
+
+        table = self.table()
+        if self.pandas:
+            index_cols = (table.schema.pandas_metadata or {}).get("index_columns", [])
+            table = table.select(
+                [name for name in table.schema.names if name not in index_cols]
+            )
+        return table
+
+    def remove(self):
+        """delete the handoff file, tables already mapped from it stay readable"""
+        os.remove(self.path)
+
+
+def to_handoff(value: Any, dir_name: str = None) -> Any:
+    """
+    Write a dataframe, arrow table or record batch reader to a handoff file
+
+    Files go to dir_name, the CUPYOPT_HANDOFF_DIR environment variable or the
+    temp directory. Batch readers are written batch by batch. Any other value is
+    returned as it is.
+
+    Returns an ArrowHandoff
+    """
+
+    # checking sys.modules keeps results like paths from importing pyarrow
+    pandas, pyarrow = sys.modules.get("pandas"), sys.modules.get("pyarrow")
+    is_pandas = bool(pandas) and isinstance(value, pandas.DataFrame)
+    if not is_pandas and not (
+        pyarrow and isinstance(value, (pyarrow.Table, pyarrow.RecordBatchReader))
+    ):
+        return value
+
+    import pyarrow as pa
+
+    if is_pandas:
+        value = pa.Table.from_pandas(value)
+
+    dir_name = dir_name or os.environ.get(HANDOFF_DIR_ENV) or tempfile.gettempdir()
+    path = os.path.join(dir_name, f"cupyopt-{uuid.uuid4().hex}.arrow")
+
+    # uncompressed, so the file can be mapped without decoding it
+    num_rows = nbytes = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, value.schema) as writer:
+        batches = value.to_batches() if isinstance(value, pa.Table) else value
+        for batch in batches:
+            writer.write_batch(batch)
+            num_rows += batch.num_rows
+            nbytes += batch.nbytes
+
+    return ArrowHandoff(path, num_rows, nbytes, pandas=is_pandas)
@@ -0,0 +1,229 @@
+""" Task instrumentation """
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from prefect import Task
+
+from .handoff import ArrowHandoff, to_handoff
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on windows, the process peak rss isn't reported there
+    resource = None
+
+# environment variables which enable the metrics sinks when not configured
+JSONL_PATH_ENV = "CUPYOPT_METRICS_JSONL"
+PROMETHEUS_PATH_ENV = "CUPYOPT_METRICS_PROM"
+
+_SINKS = {"jsonl": None, "prometheus": None}
+_SINK_LOCK = threading.Lock()
+
+# running totals per (metric, task) written to the prometheus text file
+_PROMETHEUS_TOTALS = defaultdict(float)
+
+# metrics of the task run in progress on each thread, tasks run inside another
+# task's run (e.g. ObjstrSync in DFExport) record to it rather than their own
+_RUNNING = threading.local()
+
+
+def configure_metrics(jsonl_path: str = None, prometheus_path: str = None):
+    """
+    Set the metrics sinks for instrumented tasks
+
+    Each task run is appended as a json line to jsonl_path, and the running
+    totals per task are rewritten to prometheus_path in the prometheus text
+    format (e.g. for the node exporter textfile collector). Without a path the
+    CUPYOPT_METRICS_JSONL and CUPYOPT_METRICS_PROM environment variables are used.
+    """
+    _SINKS["jsonl"] = jsonl_path
+    _SINKS["prometheus"] = prometheus_path
+
+
+def record_metric(key: str, value: float):
+    """add value to a metric of the task run in progress on this thread"""
+    running = getattr(_RUNNING, "metrics", None)
+    if running is not None:
+        running[key] = running.get(key, 0) + value
+
+
+@contextmanager
+def measure(key: str) -> Iterator[None]:
+    """record the seconds spent in the block to a metric, e.g. connect_seconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_metric(key, time.perf_counter() - start)
+
+
+def _size(value: Any) -> tuple:
+    """(rows, bytes) of a dataframe, arrow table or batch, handoff, bytes or local file"""
+    # pandas and pyarrow values can only exist once those modules are imported,
+    # checking sys.modules keeps instrumentation from importing them itself
+    pandas, pyarrow = sys.modules.get("pandas"), sys.modules.get("pyarrow")
+    if pandas and isinstance(value, pandas.DataFrame):
+        return len(value.index), int(value.memory_usage(index=False).sum())
+    if pyarrow and isinstance(value, (pyarrow.Table, pyarrow.RecordBatch)):
+        return value.num_rows, value.nbytes
+    if isinstance(value, ArrowHandoff):
+        return value.num_rows, value.nbytes
+    if isinstance(value, bytes):
+        return 0, len(value)
+    if isinstance(value, str) and os.path.isfile(value):
+        return 0, os.path.getsize(value)
+    return 0, 0
+
+
+def _process_peak_rss() -> int:
+    """peak resident set size of the process over its lifetime in bytes"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes everywhere except macos
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _instrument(run: Callable) -> Callable:
+    """wrap a task's run method to measure and emit its metrics"""
+
+    @functools.wraps(run)
+    def instrumented_run(self: Task, *args: Any, **kwargs: Any) -> Any:
+        # open results handed off by upstream tasks as the types this task takes
+        args = [_load_handoff(value, self.accepts_arrow) for value in args]
+        kwargs = {
+            key: _load_handoff(value, self.accepts_arrow)
+            for key, value in kwargs.items()
+        }
+
+        # only the outermost run is measured and emitted
+        if getattr(_RUNNING, "metrics", None) is not None:
+            return run(self, *args, **kwargs)
+
+        metrics = {"task": type(self).__name__, "status": "success"}
+        for value in list(args) + list(kwargs.values()):
+            rows, size = _size(value)
+            metrics["rows_in"] = metrics.get("rows_in", 0) + rows
+            metrics["bytes_in"] = metrics.get("bytes_in", 0) + size
+
+        _RUNNING.metrics = metrics
+
+        start = time.perf_counter()
+        try:
+            result = run(self, *args, **kwargs)
+            metrics["rows_out"], metrics["bytes_out"] = _size(result)
+            if self.handoff:
+                with measure("handoff_seconds"):
+                    result = to_handoff(result, self.handoff_dir)
+            return result
+        except Exception:
+            metrics["status"] = "failed"
+            raise
+        finally:
+            metrics["wall_seconds"] = time.perf_counter() - start
+            metrics["process_peak_rss_bytes"] = _process_peak_rss()
+            _RUNNING.metrics = None
+            _emit(self, metrics)
+
+    return instrumented_run
+
+
+def _load_handoff(value: Any, arrow: bool) -> Any:
+    """the result a handoff refers to, other values as they are"""
+    return value.load(arrow) if isinstance(value, ArrowHandoff) else value
+
+
+def _emit(task: Task, metrics: dict):
+    """
+    log metrics as a structured record and write them to the sinks, failing
+    sinks are logged rather than failing the task or hiding its exception
+    """
+
+    task.logger.info("Task metrics %s", json.dumps(metrics), extra={"metrics": metrics})
+
+    jsonl_path = _SINKS["jsonl"] or os.environ.get(JSONL_PATH_ENV)
+    prometheus_path = _SINKS["prometheus"] or os.environ.get(PROMETHEUS_PATH_ENV)
+    if not jsonl_path and not prometheus_path:
+        return
+
+    try:
+        with _SINK_LOCK:
+            if jsonl_path:
+                with open(jsonl_path, "a", encoding="utf-8") as jsonl_file:
+                    jsonl_file.write(
+                        json.dumps({"time": time.time(), **metrics}) + "\n"
+                    )
+
+            if prometheus_path:
+                _write_prometheus(prometheus_path, metrics)
+    except Exception as err:  # pylint: disable=broad-except
+        task.logger.warning("Couldn't write task metrics: %s", err)
+
+
+def _write_prometheus(filepath: str, metrics: dict):
+    """add metrics to the running totals and rewrite the prometheus text file"""
+
+    task = metrics["task"]
+    _PROMETHEUS_TOTALS[("runs", task)] += 1
+    _PROMETHEUS_TOTALS[("failures", task)] += metrics["status"] == "failed"
+    for key, value in metrics.items():
+        if key not in ("task", "status", "process_peak_rss_bytes") and value:
+            _PROMETHEUS_TOTALS[(key, task)] += value
+
+    lines = []
+    for key in sorted({key for key, _ in _PROMETHEUS_TOTALS}):
+        lines.append(f"# TYPE cupyopt_task_{key}_total counter")
+        for (total_key, total_task), value in sorted(_PROMETHEUS_TOTALS.items()):
+            if total_key == key:
+                lines.append(f'cupyopt_task_{key}_total{{task="{total_task}"}} {value}')
+
+    if metrics["process_peak_rss_bytes"] is not None:
+        lines.append("# TYPE cupyopt_process_peak_rss_bytes gauge")
+        lines.append(
+            f"cupyopt_process_peak_rss_bytes {metrics['process_peak_rss_bytes']}"
+        )
+
+    # replace the file whole so collectors never read a partial file
+    with open(f"{filepath}.tmp", "w", encoding="utf-8") as prometheus_file:
+        prometheus_file.write("\n".join(lines) + "\n")
+    os.replace(f"{filepath}.tmp", filepath)
+
+
+class InstrumentedTask(Task):
+    """
+    Prefect Task which measures each run
+
+    The run method of every subclass records its wall time, rows and bytes of
+    dataframe, arrow and local file arguments (in) and result (out), the peak
+    RSS of the process so far (not of the run) and any metrics added during the
+    run with record_metric or measure (e.g. connect_seconds). Metrics are logged
+    at info level as a structured record (the "metrics" attribute) and written
+    to the sinks set by configure_metrics. Tasks run inside another task's run
+    aren't measured separately, their recorded metrics add to the outer run's.
+
+    With handoff=True a dataframe, arrow table or record batch reader result is
+    written to an arrow IPC file in handoff_dir and an ArrowHandoff reference is
+    returned instead, so prefect doesn't pickle and copy large results. Handoff
+    arguments are opened memory-mapped: as the pyarrow.Table for subclasses
+    setting accepts_arrow, otherwise as the type of the original result.
+    """
+
+    # subclasses which take pyarrow tables set this to receive handoffs unconverted
+    accepts_arrow = False
+
+    def __init__(self, handoff: bool = False, handoff_dir: str = None, **kwargs: Any):
+        self.handoff = handoff
+        self.handoff_dir = handoff_dir
+        super().__init__(**kwargs)
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        if "run" in cls.__dict__:
+            cls.run = _instrument(cls.run)
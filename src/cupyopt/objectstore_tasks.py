@@ -1,27 +1,45 @@
 """ object store functions """
 
+import contextlib
+import hashlib
+import io
 import os
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Iterator, List, Union
 from typing_extensions import Literal
 
-import pandas as pd
 import urllib3
 from box import Box
 from minio import Minio
-from prefect import Task
+from minio.commonconfig import ComposeSource, CopySource
+from minio.deleteobjects import DeleteObject
 from prefect.utilities.tasks import defaults_from_attrs
 
-# pylint: disable=arguments-differ, too-many-arguments
+from .compression import (
+    CHUNK_SIZE,
+    GzipReader,
+    extract,
+    infer_compression,
+    open_decompressed,
+)
+from .instrumentation import InstrumentedTask
+from .polling import wait_for_files
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-class ObjstrClient(Task):
+# pylint: disable=arguments-differ, too-many-arguments, too-many-instance-attributes, too-many-locals
+# pylint: disable=import-outside-toplevel
+
+
+class ObjstrClient(InstrumentedTask):
     """setup object storage client via minio"""
 
     def __init__(
         self,
         config_box: Box = None,
         http_client: urllib3.poolmanager.PoolManager = None,
-        **kwargs: Any
+        **kwargs: Any,
     ):
         self.config_box = config_box
         self.http_client = http_client
@@ -46,7 +64,7 @@ class ObjstrClient(Task):
         return client
 
 
-class ObjstrMakeBucket(Task):
+class ObjstrMakeBucket(InstrumentedTask):
     """attempts to make a bucket if not already available"""
 
     def __init__(self, client: Minio = None, bucket_name: str = None, **kwargs: Any):
@@ -69,7 +87,7 @@ class ObjstrMakeBucket(Task):
         return bucket_name
 
 
-class ObjstrPut(Task):
+class ObjstrPut(InstrumentedTask):
     """put data as object in object store"""
 
     def __init__(
@@ -80,7 +98,7 @@ class ObjstrPut(Task):
         data: object = None,
         length: int = -1,
         part_size: int = 5 * 1024 * 1024,
-        **kwargs: Any
+        **kwargs: Any,
     ):
 
         self.client = client
@@ -124,7 +142,7 @@ class ObjstrPut(Task):
         return object_name
 
 
-class ObjstrGet(Task):
+class ObjstrGet(InstrumentedTask):
     """get object as data from object store"""
 
     def __init__(
@@ -132,7 +150,7 @@ class ObjstrGet(Task):
         client: Minio = None,
         bucket_name: str = None,
         object_name: str = None,
-        **kwargs: Any
+        **kwargs: Any,
     ):
         self.client = client
         self.bucket_name = bucket_name
@@ -161,8 +179,34 @@ class ObjstrGet(Task):
         return data
 
 
-class ObjstrGetAsDF(Task):
-    """get object and return as pandas.dataframe from object store"""
+@contextlib.contextmanager
+def _open_object(
+    client: Minio, bucket_name: str, object_name: str, compression: str = None
+) -> Iterator[io.IOBase]:
+    """readable stream of an object, seekable when zip extraction needs it"""
+
+    if compression == "zip":
+        with io.BufferedReader(
+            ObjstrRangeReader(client, bucket_name, object_name), CHUNK_SIZE
+        ) as reader:
+            yield reader
+        return
+
+    response = client.get_object(bucket_name=bucket_name, object_name=object_name)
+    try:
+        yield response
+    finally:
+        response.close()
+        response.release_conn()
+
+
+class ObjstrGetAsDF(InstrumentedTask):
+    """
+    get object and return as pandas.dataframe from object store
+
+    With decompress ('gzip', 'zip', 'tar' or 'infer' from the object name) the
+    object is decompressed on the fly, archives are read from their first file.
+    """
 
     def __init__(
         self,
@@ -170,30 +214,49 @@ class ObjstrGetAsDF(Task):
         bucket_name: str = None,
         object_name: str = None,
         dftype: Literal["csv", "parquet", "excel"] = None,
-        **kwargs: Any
+        decompress: str = None,
+        **kwargs: Any,
     ):
         self.client = client
         self.bucket_name = bucket_name
         self.object_name = object_name
         self.dftype = dftype
+        self.decompress = decompress
 
         super().__init__(**kwargs)
 
-    @defaults_from_attrs("client", "bucket_name", "object_name", "dftype")
+    @defaults_from_attrs("client", "bucket_name", "object_name", "dftype", "decompress")
     def run(
         self,
         client: Minio,
         bucket_name: str,
         object_name: str,
         dftype: Literal["csv", "parquet", "excel"],
-        **kwargs: Any
+        decompress: str = None,
+        **kwargs: Any,
     ) -> Any:
 
+        # pandas is slow to import, so it's only imported by the tasks using it
+        import pandas as pd
+
+        if dftype not in ("csv", "parquet", "excel"):
+            raise ValueError("dftype must be one of 'csv', 'parquet' or 'excel'.")
+
+        compression = infer_compression(object_name, decompress)
+
         # get object as file
-        data = client.get_object(
-            bucket_name=bucket_name,
-            object_name=object_name,
-        )
+        with _open_object(
+            client, bucket_name, object_name, compression
+        ) as response, open_decompressed(response, compression) as data:
+            if dftype == "csv":
+                pd_dataframe = pd.read_csv(data, **kwargs)
+            else:
+                # parquet and excel readers seek, which http responses can't
+                data = io.BytesIO(data.read())
+                if dftype == "parquet":
+                    pd_dataframe = pd.read_parquet(data, **kwargs)
+                else:
+                    pd_dataframe = pd.read_excel(data, **kwargs)
 
         self.logger.info(
             "Retrieved object %s under %s",
@@ -201,16 +264,16 @@ class ObjstrGetAsDF(Task):
             bucket_name,
         )
 
-        if dftype == "csv":
-            pd_dataframe = pd.read_csv(filepath_or_buffer=data, **kwargs)
-        elif dftype == "parquet":
-            pd_dataframe = pd.read_parquet(filepath_or_buffer=data, **kwargs)
-
         return pd_dataframe
 
 
-class ObjstrFPut(Task):
-    """put file as object in object store"""
+class ObjstrFPut(InstrumentedTask):
+    """
+    put file as object in object store
+
+    With compress='gzip' the file is compressed as it's uploaded, object_name
+    defaults to the file name with a .gz suffix.
+    """
 
     def __init__(
         self,
@@ -218,35 +281,58 @@ class ObjstrFPut(Task):
         bucket_name: str = None,
         file_path: str = None,
         object_name: str = None,
-        **kwargs: Any
+        compress: str = None,
+        part_size: int = 5 * 1024 * 1024,
+        **kwargs: Any,
     ):
 
         self.client = client
         self.bucket_name = bucket_name
         self.file_path = file_path
         self.object_name = object_name
+        self.compress = compress
+        self.part_size = part_size
 
         super().__init__(**kwargs)
 
-    @defaults_from_attrs("client", "bucket_name", "file_path", "object_name")
+    @defaults_from_attrs(
+        "client", "bucket_name", "file_path", "object_name", "compress", "part_size"
+    )
     def run(
         self,
         client: Minio,
         bucket_name: str,
         file_path: str,
         object_name: str = None,
+        compress: str = None,
+        part_size: int = 5 * 1024 * 1024,
     ):
 
+        if compress and compress != "gzip":
+            raise ValueError("compress must be 'gzip' or None.")
+
         # if no object_name is provided, default to file_path basename
         if not object_name:
-            object_name = os.path.basename(file_path)
+            object_name = os.path.basename(file_path) + (".gz" if compress else "")
 
         # upload file as object
-        client.fput_object(
-            bucket_name=bucket_name,
-            object_name=object_name,
-            file_path=file_path,
-        )
+        if compress:
+            # compressed size isn't known up front, so it's uploaded in parts
+            with open(file_path, "rb") as open_file:
+                client.put_object(
+                    bucket_name=bucket_name,
+                    object_name=object_name,
+                    data=GzipReader(open_file),
+                    length=-1,
+                    part_size=part_size,
+                    content_type="application/gzip",
+                )
+        else:
+            client.fput_object(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                file_path=file_path,
+            )
 
         self.logger.info(
             "Put file %s under %s as %s", file_path, bucket_name, object_name
@@ -255,8 +341,14 @@ class ObjstrFPut(Task):
         return object_name
 
 
-class ObjstrFGet(Task):
-    """get object as file from object store"""
+class ObjstrFGet(InstrumentedTask):
+    """
+    get object as file from object store
+
+    With decompress ('gzip', 'zip', 'tar' or 'infer' from the object name) the
+    object is decompressed on the fly to file_path, archives are extracted into
+    file_path as a directory.
+    """
 
     def __init__(
         self,
@@ -264,26 +356,43 @@ class ObjstrFGet(Task):
         bucket_name: str = None,
         object_name: str = None,
         file_path: str = None,
-        **kwargs: Any
+        decompress: str = None,
+        **kwargs: Any,
     ):
         self.client = client
         self.bucket_name = bucket_name
         self.object_name = object_name
         self.file_path = file_path
+        self.decompress = decompress
 
         super().__init__(**kwargs)
 
-    @defaults_from_attrs("client", "bucket_name", "object_name", "file_path")
+    @defaults_from_attrs(
+        "client", "bucket_name", "object_name", "file_path", "decompress"
+    )
     def run(
-        self, client: Minio, bucket_name: str, object_name: str, file_path: str
+        self,
+        client: Minio,
+        bucket_name: str,
+        object_name: str,
+        file_path: str,
+        decompress: str = None,
     ) -> str:
 
+        compression = infer_compression(object_name, decompress)
+
         # get object as file
-        client.fget_object(
-            bucket_name=bucket_name,
-            object_name=object_name,
-            file_path=file_path,
-        )
+        if compression:
+            with _open_object(
+                client, bucket_name, object_name, compression
+            ) as response:
+                extract(response, compression, file_path)
+        else:
+            client.fget_object(
+                bucket_name=bucket_name,
+                object_name=object_name,
+                file_path=file_path,
+            )
 
         self.logger.info(
             "Retrieved object %s under %s as file %s",
@@ -293,3 +402,514 @@ class ObjstrFGet(Task):
         )
 
         return file_path
+
+
+class ObjstrCopy(InstrumentedTask):
+    """server-side copy objects within or between buckets in object store"""
+
+    def __init__(
+        self,
+        client: Minio = None,
+        bucket_name: str = None,
+        object_names: Union[str, List[str]] = None,
+        target_bucket_name: str = None,
+        target_prefix: str = "",
+        max_workers: int = 8,
+        **kwargs: Any,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_names = object_names
+        self.target_bucket_name = target_bucket_name
+        self.target_prefix = target_prefix
+        self.max_workers = max_workers
+
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "client",
+        "bucket_name",
+        "object_names",
+        "target_bucket_name",
+        "target_prefix",
+        "max_workers",
+    )
+    def run(
+        self,
+        client: Minio,
+        bucket_name: str,
+        object_names: Union[str, List[str]],
+        target_bucket_name: str = None,
+        target_prefix: str = "",
+        target_object_names: List[str] = None,
+        max_workers: int = 8,
+    ) -> Union[str, List[str]]:
+
+        # a single object name is copied and returned as a single name
+        single = isinstance(object_names, str)
+        if single:
+            object_names = [object_names]
+
+        # default to copying within the source bucket
+        if not target_bucket_name:
+            target_bucket_name = bucket_name
+
+        if (
+            target_bucket_name == bucket_name
+            and not target_prefix
+            and target_object_names is None
+        ):
+            raise ValueError(
+                "A target bucket, prefix or object names is required to copy objects."
+            )
+
+        if target_object_names is None:
+            target_object_names = [
+                f"{target_prefix}{object_name}" for object_name in object_names
+            ]
+        elif len(target_object_names) != len(object_names):
+            raise ValueError(
+                "target_object_names must be the same length as object_names."
+            )
+
+        def copy(object_name: str, target_object_name: str) -> str:
+            # copy happens on the server, data never passes through this worker
+            client.copy_object(
+                bucket_name=target_bucket_name,
+                object_name=target_object_name,
+                source=CopySource(bucket_name=bucket_name, object_name=object_name),
+            )
+            return target_object_name
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            copied = list(executor.map(copy, object_names, target_object_names))
+
+        self.logger.info(
+            "Copied %s objects from %s to %s",
+            len(copied),
+            bucket_name,
+            target_bucket_name,
+        )
+
+        return copied[0] if single else copied
+
+
+class ObjstrCompose(InstrumentedTask):
+    """server-side compose many objects into a single object in object store"""
+
+    def __init__(
+        self,
+        client: Minio = None,
+        bucket_name: str = None,
+        object_name: str = None,
+        source_object_names: List[str] = None,
+        source_bucket_name: str = None,
+        **kwargs: Any,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        self.source_object_names = source_object_names
+        self.source_bucket_name = source_bucket_name
+
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "client",
+        "bucket_name",
+        "object_name",
+        "source_object_names",
+        "source_bucket_name",
+    )
+    def run(
+        self,
+        client: Minio,
+        bucket_name: str,
+        object_name: str,
+        source_object_names: List[str],
+        source_bucket_name: str = None,
+    ) -> str:
+
+        if not source_object_names:
+            raise ValueError("At least one source object name is required.")
+
+        # default to composing from objects within the target bucket
+        if not source_bucket_name:
+            source_bucket_name = bucket_name
+
+        # objects are concatenated in the order provided, all but the last
+        # source must be at least 5MiB as per the S3 multipart rules
+        client.compose_object(
+            bucket_name=bucket_name,
+            object_name=object_name,
+            sources=[
+                ComposeSource(bucket_name=source_bucket_name, object_name=source)
+                for source in source_object_names
+            ],
+        )
+
+        self.logger.info(
+            "Composed %s objects from %s under %s as %s",
+            len(source_object_names),
+            source_bucket_name,
+            bucket_name,
+            object_name,
+        )
+
+        return object_name
+
+
+class ObjstrRangeReader(io.RawIOBase):
+    """
+    Seekable, read-only file over an object in object store
+
+    Each read fetches only the requested byte range, so readers which seek to
+    the parts of a file they need (e.g. parquet or arrow IPC footers) don't
+    download the whole object. Wrap in pyarrow.PythonFile to use with pyarrow.
+    """
+
+    def __init__(
+        self, client: Minio, bucket_name: str, object_name: str, size: int = None
+    ):
+        super().__init__()
+        self.client = client
+        self.bucket_name = bucket_name
+        self.object_name = object_name
+        if size is None:
+            size = client.stat_object(
+                bucket_name=bucket_name, object_name=object_name
+            ).size
+        self.size = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        self.position = max(0, min(offset, self.size))
+        return self.position
+
+    def readinto(self, buffer: Any) -> int:
+        length = min(len(buffer), self.size - self.position)
+        if length <= 0:
+            return 0
+
+        response = self.client.get_object(
+            bucket_name=self.bucket_name,
+            object_name=self.object_name,
+            offset=self.position,
+            length=length,
+        )
+        try:
+            data = response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+        buffer[: len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+
+def _file_md5(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """md5 hex digest of a local file, read in chunks"""
+    digest = hashlib.md5()  # nosec - used to compare against object ETags
+    with open(file_path, "rb") as open_file:
+        for chunk in iter(lambda: open_file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ObjstrSync(InstrumentedTask):
+    """
+    Sync a local directory with a bucket prefix in object store
+
+    Only files which differ by size, ETag (md5 for single-part objects) or mtime are
+    transferred, optionally removing files which don't exist on the source side.
+    prefix is treated as a folder, a missing trailing "/" is added.
+
+    Returns a pd.DataFrame describing the action taken for each file
+    """
+
+    def __init__(
+        self,
+        client: Minio = None,
+        bucket_name: str = None,
+        dir_name: str = None,
+        prefix: str = "",
+        direction: Literal["put", "get"] = "put",
+        delete: bool = False,
+        checksum: bool = True,
+        max_workers: int = 8,
+        **kwargs: Any,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.dir_name = dir_name
+        self.prefix = prefix
+        self.direction = direction
+        self.delete = delete
+        self.checksum = checksum
+        self.max_workers = max_workers
+
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "client",
+        "bucket_name",
+        "dir_name",
+        "prefix",
+        "direction",
+        "delete",
+        "checksum",
+        "max_workers",
+    )
+    def run(
+        self,
+        client: Minio,
+        bucket_name: str,
+        dir_name: str,
+        prefix: str = "",
+        direction: Literal["put", "get"] = "put",
+        delete: bool = False,
+        checksum: bool = True,
+        max_workers: int = 8,
+    ) -> "pd.DataFrame":
+
+        import pandas as pd
+
+        if direction not in ("put", "get"):
+            raise ValueError("direction must be one of 'put' or 'get'.")
+
+        # relative keys only line up with the local paths under a folder prefix
+        if prefix and not prefix.endswith("/"):
+            prefix = f"{prefix}/"
+
+        # gather local files keyed by their path relative to dir_name
+        local_files = {}
+        for root, _, filenames in os.walk(dir_name):
+            for filename in filenames:
+                file_path = os.path.join(root, filename)
+                relpath = os.path.relpath(file_path, dir_name).replace(os.sep, "/")
+                local_files[relpath] = os.stat(file_path)
+
+        # gather remote objects keyed by their name relative to prefix
+        remote_objects = {
+            obj.object_name[len(prefix) :]: obj
+            for obj in client.list_objects(
+                bucket_name=bucket_name, prefix=prefix, recursive=True
+            )
+            if not obj.is_dir
+        }
+
+        def differs(relpath: str) -> bool:
+            local_stat = local_files[relpath]
+            obj = remote_objects[relpath]
+
+            if local_stat.st_size != obj.size:
+                return True
+
+            # multipart ETags aren't an md5 of the content, fall back to mtime
+            etag = (obj.etag or "").strip('"')
+            if checksum and etag and "-" not in etag:
+                return _file_md5(os.path.join(dir_name, relpath)) != etag
+
+            if direction == "put":
+                return local_stat.st_mtime > obj.last_modified.timestamp()
+            return obj.last_modified.timestamp() > local_stat.st_mtime
+
+        if direction == "put":
+            sources, targets = local_files, remote_objects
+        else:
+            sources, targets = remote_objects, local_files
+
+        to_delete = [relpath for relpath in targets if relpath not in sources]
+
+        def transfer(relpath: str) -> bool:
+            # compared in the pool too, so md5 hashing runs alongside transfers
+            if relpath in targets and not differs(relpath):
+                return False
+
+            file_path = os.path.join(dir_name, *relpath.split("/"))
+            object_name = f"{prefix}{relpath}"
+
+            if direction == "put":
+                client.fput_object(
+                    bucket_name=bucket_name,
+                    object_name=object_name,
+                    file_path=file_path,
+                )
+            else:
+                client.fget_object(
+                    bucket_name=bucket_name,
+                    object_name=object_name,
+                    file_path=file_path,
+                )
+                # keep the object's mtime so the next sync compares like for like
+                mtime = remote_objects[relpath].last_modified.timestamp()
+                os.utime(file_path, (mtime, mtime))
+
+            return True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            to_transfer = [
+                relpath
+                for relpath, transferred in zip(
+                    sources, executor.map(transfer, list(sources))
+                )
+                if transferred
+            ]
+
+        deleted = []
+        if delete and to_delete:
+            if direction == "put":
+                errors = list(
+                    client.remove_objects(
+                        bucket_name=bucket_name,
+                        delete_object_list=[
+                            DeleteObject(f"{prefix}{relpath}") for relpath in to_delete
+                        ],
+                    )
+                )
+                failed = {error.name for error in errors}
+                deleted = [
+                    relpath
+                    for relpath in to_delete
+                    if f"{prefix}{relpath}" not in failed
+                ]
+            else:
+                for relpath in to_delete:
+                    os.remove(os.path.join(dir_name, *relpath.split("/")))
+                deleted = to_delete
+
+        self.logger.info(
+            "Synced %s %s %s under %s, transferred %s and deleted %s files.",
+            dir_name,
+            "to" if direction == "put" else "from",
+            prefix,
+            bucket_name,
+            len(to_transfer),
+            len(deleted),
+        )
+
+        transferred = set(to_transfer)
+        sync_data = [
+            {
+                "File Name": relpath,
+                "Object Name": f"{prefix}{relpath}",
+                "Action": "transferred" if relpath in transferred else "unchanged",
+            }
+            for relpath in sources
+        ] + [
+            {
+                "File Name": relpath,
+                "Object Name": f"{prefix}{relpath}",
+                "Action": "deleted",
+            }
+            for relpath in deleted
+        ]
+
+        return pd.DataFrame(sync_data, columns=["File Name", "Object Name", "Action"])
+
+
+class ObjstrSensor(InstrumentedTask):
+    """
+    Waits for objects to arrive under a bucket prefix in object store
+
+    Polling reuses the client's pooled connection and backs off from poll_interval
+    up to max_interval while the prefix is idle. Returns as soon as min_count
+    objects matching regex_search have gone quiescence seconds without changing.
+
+    Returns a pd.DataFrame of 'Object Name' and 'MTime', empty if max_wait seconds
+    pass first
+    """
+
+    def __init__(
+        self,
+        client: Minio = None,
+        bucket_name: str = None,
+        prefix: str = "",
+        regex_search: str = None,
+        min_count: int = 1,
+        quiescence: float = 0,
+        poll_interval: float = 5,
+        max_interval: float = 300,
+        backoff: float = 2,
+        max_wait: float = None,
+        **kwargs: Any,
+    ):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.regex_search = regex_search
+        self.min_count = min_count
+        self.quiescence = quiescence
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_wait = max_wait
+
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "client",
+        "bucket_name",
+        "prefix",
+        "regex_search",
+        "min_count",
+        "quiescence",
+        "poll_interval",
+        "max_interval",
+        "backoff",
+        "max_wait",
+    )
+    def run(
+        self,
+        client: Minio,
+        bucket_name: str,
+        prefix: str = "",
+        regex_search: str = None,
+        min_count: int = 1,
+        quiescence: float = 0,
+        poll_interval: float = 5,
+        max_interval: float = 300,
+        backoff: float = 2,
+        max_wait: float = None,
+    ) -> "pd.DataFrame":
+
+        import pandas as pd
+
+        def list_files() -> dict:
+            return {
+                obj.object_name: (obj.last_modified, (obj.size, obj.etag))
+                for obj in client.list_objects(
+                    bucket_name=bucket_name, prefix=prefix, recursive=True
+                )
+                if not obj.is_dir
+            }
+
+        ready = wait_for_files(
+            list_files,
+            regex_search=regex_search,
+            min_count=min_count,
+            quiescence=quiescence,
+            poll_interval=poll_interval,
+            max_interval=max_interval,
+            backoff=backoff,
+            timeout=max_wait,
+            logger=self.logger,
+        )
+
+        return pd.DataFrame(
+            list(ready.items()), columns=["Object Name", "MTime"]
+        ).sort_values(by="MTime", ignore_index=True)
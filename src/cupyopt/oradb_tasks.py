@@ -6,14 +6,15 @@ from typing import Any
 import pandas as pd
 import sqlalchemy
 from box import Box
-from prefect import Task
 from prefect.utilities.tasks import defaults_from_attrs
 from sqlalchemy import create_engine
 
+from .instrumentation import InstrumentedTask, measure
+
 # pylint: disable=arguments-differ
 
 
-class ORADBGetEngine(Task):
+class ORADBGetEngine(InstrumentedTask):
     """
     Configure an sqlalchemy engine with cx_Oracle
 
@@ -80,7 +81,7 @@ class ORADBGetEngine(Task):
         return engine
 
 
-class ORADBSelectToDataFrame(Task):
+class ORADBSelectToDataFrame(InstrumentedTask):
     """
     Runs select statement against database using SQLAlchemy engine.
 
@@ -108,6 +109,12 @@ class ORADBSelectToDataFrame(Task):
             "Running select statement using SQLAlchemy engine to Pandas DataFrame."
         )
 
-        dataframe = pd.read_sql(sql=select_stmt, con=engine)
+        with measure("connect_seconds"):
+            connection = engine.connect()
+
+        try:
+            dataframe = pd.read_sql(sql=select_stmt, con=connection)
+        finally:
+            connection.close()
 
         return dataframe
@@ -0,0 +1,90 @@
+""" Adaptive back-off polling for file and object arrivals """
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# pylint: disable=too-many-arguments, too-many-locals
+
+
+def wait_for_files(
+    list_files: Callable[[], Dict[str, Tuple[Any, Hashable]]],
+    regex_search: str = None,
+    min_count: int = 1,
+    quiescence: float = 0,
+    poll_interval: float = 5,
+    max_interval: float = 300,
+    backoff: float = 2,
+    timeout: float = None,
+    logger: logging.Logger = None,
+) -> Dict[str, Any]:
+    """
+    Poll list_files until enough matching files have arrived and settled
+
+    list_files returns {name: (mtime, signature)} for the files present, where
+    the signature (e.g. size and mtime) changes while a file is being written. A
+    file matching regex_search is ready once its signature hasn't changed for
+    quiescence seconds, and polling stops when min_count files are ready.
+
+    The interval between polls starts at poll_interval and grows by backoff up
+    to max_interval while nothing changes, and drops back to poll_interval when
+    matching files appear or change.
+
+    Returns {name: mtime} of the ready files, empty if timeout seconds pass first.
+    """
+
+    logger = logger or logging.getLogger(__name__)
+    pattern = re.compile(regex_search) if regex_search else None
+
+    start = time.monotonic()
+    interval = poll_interval
+    # signature of each matching file and when it was first seen with it
+    seen: Dict[str, Tuple[Hashable, float]] = {}
+
+    while True:
+        now = time.monotonic()
+        files = {
+            name: details
+            for name, details in list_files().items()
+            if not pattern or pattern.search(name)
+        }
+
+        changed = False
+        for name, (_, signature) in files.items():
+            if name not in seen or seen[name][0] != signature:
+                seen[name] = (signature, now)
+                changed = True
+        seen = {name: seen[name] for name in files}
+
+        ready = {
+            name: files[name][0]
+            for name, (_, since) in seen.items()
+            if now - since >= quiescence
+        }
+        if len(ready) >= min_count:
+            logger.info("Found %s ready files after %.1fs.", len(ready), now - start)
+            return ready
+
+        # poll quickly while files are arriving, back off while nothing happens
+        interval = poll_interval if changed else min(interval * backoff, max_interval)
+
+        # wake up when the next file still settling settles
+        settling = [
+            since + quiescence - now
+            for _, since in seen.values()
+            if since + quiescence > now
+        ]
+        if settling:
+            interval = min(interval, *settling)
+
+        if timeout is not None:
+            remaining = start + timeout - now
+            if remaining <= 0:
+                logger.info("No ready files after %.1fs.", now - start)
+                return {}
+            interval = min(interval, remaining)
+
+        logger.debug(
+            "%s of %s files ready, sleeping %.1fs.", len(ready), min_count, interval
+        )
+        time.sleep(interval)
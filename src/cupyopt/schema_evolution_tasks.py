@@ -0,0 +1,250 @@
+""" Schema evolution functions """
+import json
+import logging
+from typing import Any, List, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from prefect.utilities.tasks import defaults_from_attrs
+
+from .avro_tasks import avro_to_arrow_type
+from .batches import is_lazy, to_reader
+from .instrumentation import InstrumentedTask
+from .schema_tasks import arrow_type_compatible
+
+# pylint: disable=arguments-differ, too-many-arguments, no-member
+
+# avro primitive types which data written as the key type may be read as
+_AVRO_PROMOTIONS = {
+    "int": {"long", "float", "double"},
+    "long": {"float", "double"},
+    "float": {"double"},
+    "string": {"bytes"},
+    "bytes": {"string"},
+}
+
+
+class SchemaCompatibility(InstrumentedTask):
+    """
+    Check compatibility between an older and a newer avro or arrow schema
+
+    Backward compatible means the newer schema can read data written with the
+    older one, forward compatible means the older schema can read data written
+    with the newer one. Avro schemas follow the avro schema resolution rules
+    (type promotions, defaults for added fields). Arrow schemas accept safe type
+    promotions and fill added nullable fields with nulls.
+
+    Returns a dict with "backward" and "forward" bools, the "issues" found in
+    either direction and the projection "plan" which reads older data with the
+    newer schema, for use with DFProjectSchema.
+    """
+
+    def __init__(
+        self,
+        old_schema: Union[dict, pa.lib.Schema] = None,
+        new_schema: Union[dict, pa.lib.Schema] = None,
+        **kwargs: Any,
+    ):
+        self.old_schema = old_schema
+        self.new_schema = new_schema
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("old_schema", "new_schema")
+    def run(
+        self,
+        old_schema: Union[dict, pa.lib.Schema],
+        new_schema: Union[dict, pa.lib.Schema],
+    ) -> dict:
+
+        logging.info("Checking compatibility between schemas")
+
+        if isinstance(old_schema, pa.lib.Schema) != isinstance(
+            new_schema, pa.lib.Schema
+        ):
+            raise ValueError("Both schemas must be avro or both must be arrow.")
+
+        resolve = (
+            _resolve_arrow if isinstance(new_schema, pa.lib.Schema) else _resolve_avro
+        )
+
+        plan, backward_issues = resolve(reader=new_schema, writer=old_schema)
+        _, forward_issues = resolve(reader=old_schema, writer=new_schema)
+
+        return {
+            "backward": not backward_issues,
+            "forward": not forward_issues,
+            "issues": [f"backward: {issue}" for issue in backward_issues]
+            + [f"forward: {issue}" for issue in forward_issues],
+            "plan": plan,
+        }
+
+
+def _resolve_arrow(
+    reader: pa.lib.Schema, writer: pa.lib.Schema
+) -> Tuple[List[dict], List[str]]:
+    """projection plan and issues for reading data written with writer as reader"""
+
+    plan, issues = [], []
+
+    for field in reader:
+        if field.name not in writer.names:
+            if not field.nullable:
+                issues.append(f"field {field.name} is added and not nullable")
+            plan.append({"name": field.name, "action": "add", "type": field.type})
+            continue
+
+        writer_field = writer.field(field.name)
+        if writer_field.type.equals(field.type):
+            plan.append({"name": field.name, "action": "keep", "type": field.type})
+        else:
+            if not arrow_type_compatible(writer_field.type, field.type):
+                issues.append(
+                    f"field {field.name} type {writer_field.type} "
+                    f"can't be read as {field.type}"
+                )
+            plan.append({"name": field.name, "action": "cast", "type": field.type})
+
+        if writer_field.nullable and not field.nullable:
+            issues.append(f"field {field.name} is nullable but read as not nullable")
+
+    return plan, issues
+
+
+def _avro_field_type(field: dict) -> Tuple[Any, bool]:
+    """the non-null type of an avro field and whether it's nullable"""
+    field_type = field["type"]
+    if isinstance(field_type, list):
+        branches = [branch for branch in field_type if branch != "null"]
+        nullable = len(branches) < len(field_type)
+        return (branches[0] if len(branches) == 1 else branches), nullable
+    return field_type, field_type == "null"
+
+
+def _avro_type_key(field_type: Any) -> str:
+    """comparable form of an avro type"""
+    if isinstance(field_type, str):
+        return field_type
+    return json.dumps(field_type, sort_keys=True, default=str)
+
+
+def _resolve_avro(reader: dict, writer: dict) -> Tuple[List[dict], List[str]]:
+    """projection plan and issues for reading data written with writer as reader"""
+
+    plan, issues = [], []
+    writer_fields = {field["name"]: field for field in writer["fields"]}
+
+    for field in reader["fields"]:
+        reader_type, reader_nullable = _avro_field_type(field)
+        try:
+            arrow_type = avro_to_arrow_type(reader_type)
+        except ValueError:
+            # e.g. references to named types, which are kept as they are
+            arrow_type = None
+
+        if field["name"] not in writer_fields:
+            if "default" not in field:
+                issues.append(f"field {field['name']} is added without a default")
+            plan.append(
+                {
+                    "name": field["name"],
+                    "action": "add",
+                    "type": arrow_type,
+                    "default": field.get("default"),
+                }
+            )
+            continue
+
+        writer_type, writer_nullable = _avro_field_type(writer_fields[field["name"]])
+
+        if _avro_type_key(writer_type) == _avro_type_key(reader_type):
+            plan.append({"name": field["name"], "action": "keep", "type": arrow_type})
+        else:
+            if not (
+                isinstance(writer_type, str)
+                and reader_type in _AVRO_PROMOTIONS.get(writer_type, set())
+            ):
+                issues.append(
+                    f"field {field['name']} type {_avro_type_key(writer_type)} "
+                    f"can't be read as {_avro_type_key(reader_type)}"
+                )
+            plan.append({"name": field["name"], "action": "cast", "type": arrow_type})
+
+        if writer_nullable and not reader_nullable:
+            issues.append(f"field {field['name']} is nullable but read as not nullable")
+
+    return plan, issues
+
+
+class DFProjectSchema(InstrumentedTask):
+    """
+    Project data written with an older schema onto a newer one using a plan
+    from SchemaCompatibility
+
+    Columns are selected in the newer schema's order, cast where their type
+    changed and added (as nulls or the field's default) where missing, all as
+    arrow compute operations over whole columns. Arrow datasets and record batch
+    readers are projected lazily, batch by batch.
+
+    Returns a projected pd.Dataframe, or pyarrow.Table / RecordBatchReader when
+    one is provided.
+    """
+
+    accepts_arrow = True
+
+    def __init__(
+        self,
+        plan: List[dict] = None,
+        **kwargs: Any,
+    ):
+        self.plan = plan
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("plan")
+    def run(
+        self,
+        dataframe: Union[pd.DataFrame, pa.Table, ds.Dataset, pa.RecordBatchReader],
+        plan: List[dict],
+    ) -> Union[pd.DataFrame, pa.Table, pa.RecordBatchReader]:
+
+        self.logger.info("Projecting dataframe using %s step plan.", len(plan))
+
+        if is_lazy(dataframe):
+            reader = to_reader(dataframe)
+            schema = _project_table(reader.schema.empty_table(), plan).schema
+
+            def batches():
+                for batch in reader:
+                    yield from _project_table(
+                        pa.Table.from_batches([batch]), plan
+                    ).to_batches()
+
+            return pa.RecordBatchReader.from_batches(schema, batches())
+
+        if isinstance(dataframe, pa.Table):
+            return _project_table(dataframe, plan)
+
+        return _project_table(
+            pa.Table.from_pandas(dataframe, preserve_index=False), plan
+        ).to_pandas()
+
+
+def _project_table(table: pa.Table, plan: List[dict]) -> pa.Table:
+    """apply a projection plan to an arrow table"""
+
+    columns, names = [], []
+    for step in plan:
+        if step["action"] == "add":
+            column = pa.nulls(table.num_rows, type=step["type"] or pa.null())
+            if step.get("default") is not None:
+                column = pc.fill_null(column, step["default"])
+        elif step["action"] == "cast" and step["type"] is not None:
+            column = table[step["name"]].cast(step["type"])
+        else:
+            column = table[step["name"]]
+
+        columns.append(column)
+        names.append(step["name"])
+
+    return pa.Table.from_arrays(columns, names=names)
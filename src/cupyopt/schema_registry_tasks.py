@@ -0,0 +1,236 @@
+""" Schema registry functions """
+import abc
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Tuple, Union
+
+import fastavro as avro
+import pyarrow as pa
+from minio import Minio
+from prefect.utilities.tasks import defaults_from_attrs
+
+from .instrumentation import InstrumentedTask
+from .schema_tasks import arrow_fingerprint, avro_fingerprint, cached_schema
+
+# pylint: disable=arguments-differ, too-many-arguments
+
+# schema files are stored under the name as <version>-<fingerprint>.arrow or
+# <version>-<fingerprint>-<digest>.avsc, the digest covering the full avro schema
+_SCHEMA_FILE = re.compile(r"^(\d+)-([0-9a-f]{64})(?:-([0-9a-f]{64}))?\.(avsc|arrow)$")
+
+
+class SchemaRegistry(abc.ABC):
+    """
+    Versioned store of avro and arrow schemas
+
+    Each distinct schema registered under a name gets the next version number.
+    Schemas are fingerprinted (sha256 of the avro parsing canonical form or the
+    arrow IPC serialization). The avro fingerprint ignores defaults, logical
+    types and docs, so avro schemas are told apart by a digest of their full
+    normalized json instead. Parsed schemas are cached in memory by digest, so
+    repeated reads of a version only list the registry. Avro schemas are
+    returned as copies of the cached schema.
+
+    Subclasses provide the storage through _list, _read and _write.
+    """
+
+    @abc.abstractmethod
+    def _list(self, name: str) -> List[str]:
+        """filenames stored under a schema name"""
+
+    @abc.abstractmethod
+    def _read(self, name: str, filename: str) -> bytes:
+        """read a stored schema file"""
+
+    @abc.abstractmethod
+    def _write(self, name: str, filename: str, data: bytes):
+        """store a schema file"""
+
+    def versions(self, name: str) -> Dict[int, Tuple[str, str]]:
+        """(fingerprint, schema type) of each version registered under name"""
+        return {
+            int(match.group(1)): (match.group(2), match.group(4))
+            for match in self._matches(name)
+        }
+
+    def _matches(self, name: str) -> List[re.Match]:
+        """schema filename matches stored under name"""
+        return list(filter(None, map(_SCHEMA_FILE.match, self._list(name))))
+
+    def register(self, name: str, schema: Union[dict, pa.lib.Schema]) -> int:
+        """register a schema under name, returning its (possibly existing) version"""
+
+        if isinstance(schema, pa.lib.Schema):
+            fingerprint = digest = arrow_fingerprint(schema)
+            suffix = f"{fingerprint}.arrow"
+            data = schema.serialize().to_pybytes()
+        else:
+            fingerprint, digest = avro_fingerprint(schema), _avro_digest(schema)
+            suffix = f"{fingerprint}-{digest}.avsc"
+            data = json.dumps(_avro_schema_dict(schema), indent=4).encode("utf-8")
+
+        matches = self._matches(name)
+        for match in matches:
+            if (match.group(3) or match.group(2)) == digest:
+                return int(match.group(1))
+
+        version = max((int(match.group(1)) for match in matches), default=0) + 1
+        self._write(name, f"{version:06d}-{suffix}", data)
+
+        return version
+
+    def get(self, name: str, version: int = None) -> Union[dict, pa.lib.Schema]:
+        """parsed schema of a version registered under name, by default the latest"""
+
+        versions = {int(match.group(1)): match for match in self._matches(name)}
+        if not versions:
+            raise KeyError(f"No schemas registered under {name}.")
+
+        if version is None:
+            version = max(versions)
+        elif version not in versions:
+            raise KeyError(f"No version {version} registered under {name}.")
+
+        match = versions[version]
+        filename, kind = match.group(0), match.group(4)
+
+        def load() -> Union[dict, pa.lib.Schema]:
+            data = self._read(name, filename)
+            if kind == "arrow":
+                return pa.ipc.read_schema(pa.py_buffer(data))
+            return avro.schema.parse_schema(json.loads(data.decode("utf-8")))
+
+        return cached_schema((kind, match.group(3) or match.group(2)), load)
+
+
+class LocalSchemaRegistry(SchemaRegistry):
+    """Schema registry stored in a local (or mounted) directory"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+
+    def _list(self, name: str) -> List[str]:
+        schema_dir = os.path.join(self.root_dir, name)
+        return os.listdir(schema_dir) if os.path.isdir(schema_dir) else []
+
+    def _read(self, name: str, filename: str) -> bytes:
+        with open(os.path.join(self.root_dir, name, filename), "rb") as schema_file:
+            return schema_file.read()
+
+    def _write(self, name: str, filename: str, data: bytes):
+        os.makedirs(os.path.join(self.root_dir, name), exist_ok=True)
+        with open(os.path.join(self.root_dir, name, filename), "wb") as schema_file:
+            schema_file.write(data)
+
+
+class ObjstrSchemaRegistry(SchemaRegistry):
+    """Schema registry stored under a bucket prefix in object store"""
+
+    def __init__(self, client: Minio, bucket_name: str, prefix: str = "schemas/"):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def _list(self, name: str) -> List[str]:
+        return [
+            os.path.basename(obj.object_name)
+            for obj in self.client.list_objects(
+                bucket_name=self.bucket_name, prefix=f"{self.prefix}{name}/"
+            )
+        ]
+
+    def _read(self, name: str, filename: str) -> bytes:
+        response = self.client.get_object(
+            bucket_name=self.bucket_name, object_name=f"{self.prefix}{name}/{filename}"
+        )
+        try:
+            return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+
+    def _write(self, name: str, filename: str, data: bytes):
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=f"{self.prefix}{name}/{filename}",
+            data=io.BytesIO(data),
+            length=len(data),
+        )
+
+
+def _avro_schema_dict(avsc: dict) -> dict:
+    """avro schema dict without the additional keys fastavro places in it"""
+    return {
+        key: val
+        for key, val in avsc.items()
+        if key not in ("__named_schemas", "__fastavro_parsed")
+    }
+
+
+def _avro_digest(avsc: dict) -> str:
+    """sha256 of the full avro schema json, normalized through fastavro parsing"""
+    normalized = _avro_schema_dict(avro.schema.parse_schema(avsc))
+    return hashlib.sha256(
+        json.dumps(normalized, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+
+
+class SchemaRegistryRegister(InstrumentedTask):
+    """Register avro or arrow schema under a name in a schema registry"""
+
+    def __init__(
+        self,
+        registry: SchemaRegistry = None,
+        schema_name: str = None,
+        **kwargs: Any,
+    ):
+        self.registry = registry
+        self.schema_name = schema_name
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("registry", "schema_name")
+    def run(
+        self,
+        schema: Union[dict, pa.lib.Schema],
+        registry: SchemaRegistry = None,
+        schema_name: str = None,
+    ) -> int:
+
+        version = registry.register(schema_name, schema)
+        logging.info("Registered schema %s as version %s", schema_name, version)
+
+        return version
+
+
+class SchemaRegistryGet(InstrumentedTask):
+    """Get avro or arrow schema by name and version from a schema registry"""
+
+    def __init__(
+        self,
+        registry: SchemaRegistry = None,
+        schema_name: str = None,
+        schema_version: int = None,
+        **kwargs: Any,
+    ):
+        self.registry = registry
+        self.schema_name = schema_name
+        self.schema_version = schema_version
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs("registry", "schema_name", "schema_version")
+    def run(
+        self,
+        registry: SchemaRegistry = None,
+        schema_name: str = None,
+        schema_version: int = None,
+    ) -> Union[dict, pa.lib.Schema]:
+
+        logging.info(
+            "Getting schema %s version %s", schema_name, schema_version or "latest"
+        )
+
+        return registry.get(schema_name, schema_version)
@@ -1,35 +1,236 @@
 """ Schema functions """
+import copy
+import hashlib
 import json
 import logging
-from typing import Any, Union
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Iterator, Union
 
 import fastavro as avro
+import numpy as np
 import pandas as pd
 import pandavro as pda
 import pyarrow as pa
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
-from prefect import Task
+from minio import Minio
 from prefect.utilities.tasks import defaults_from_attrs
+from typing_extensions import Literal
 
-# pylint: disable=arguments-differ, too-many-arguments
+from .batches import DEFAULT_BATCH_SIZE, is_lazy, iter_frames
+from .avro_validation import validate_avro_chunks, validate_avro_frame
+from .instrumentation import InstrumentedTask
+from .objectstore_tasks import ObjstrRangeReader
 
+# pylint: disable=arguments-differ, too-many-arguments, too-many-locals, too-many-instance-attributes
+# pylint: disable=too-many-return-statements, too-many-lines
 
-class DFInferArrowSchema(Task):
-    """Infer arrow schema from pandas dataframe"""
 
-    def __init__(self, **kwargs: Any):
+# parsed schemas shared by every task run in this process, least recently used first
+_SCHEMA_CACHE: OrderedDict = OrderedDict()
+_SCHEMA_CACHE_LOCK = threading.Lock()
+SCHEMA_CACHE_SIZE = 256
+
+_AVRO_PRIMITIVES = (
+    "null",
+    "boolean",
+    "int",
+    "long",
+    "float",
+    "double",
+    "bytes",
+    "string",
+)
+_AVRO_NAMED = ("record", "error", "enum", "fixed")
+
+
+def cached_schema(key: Hashable, loader: Callable[[], Any]) -> Any:
+    """
+    Return the schema cached under key, loading and caching it if not yet cached
+
+    The SCHEMA_CACHE_SIZE most recently used schemas are kept. Avro schema dicts
+    are returned as copies, so callers can't modify the cached schema.
+    """
+    with _SCHEMA_CACHE_LOCK:
+        schema = _SCHEMA_CACHE.get(key)
+        if schema is not None:
+            _SCHEMA_CACHE.move_to_end(key)
+
+    if schema is None:
+        schema = loader()
+        with _SCHEMA_CACHE_LOCK:
+            schema = _SCHEMA_CACHE.setdefault(key, schema)
+            while len(_SCHEMA_CACHE) > SCHEMA_CACHE_SIZE:
+                _SCHEMA_CACHE.popitem(last=False)
+
+    # arrow schemas are immutable
+    return copy.deepcopy(schema) if isinstance(schema, dict) else schema
+
+
+def avro_fingerprint(avsc: dict) -> str:
+    """sha256 fingerprint of the parsing canonical form of an avro schema"""
+    canonical = json.dumps(
+        _avro_canonical(avsc, None, set()), separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _avro_canonical(schema: Any, namespace: str, named: set) -> Any:
+    """
+    avro schema in parsing canonical form: full names, only the attributes that
+    affect parsing in their canonical order, named types defined only once
+    """
+
+    if isinstance(schema, str):
+        if schema in _AVRO_PRIMITIVES or "." in schema or not namespace:
+            return schema
+        return f"{namespace}.{schema}"
+
+    if isinstance(schema, list):
+        return [_avro_canonical(branch, namespace, named) for branch in schema]
+
+    kind = schema["type"]
+    if not isinstance(kind, str) or kind in _AVRO_PRIMITIVES:
+        return _avro_canonical(kind, namespace, named)
+
+    canonical = {}
+    if kind in _AVRO_NAMED:
+        name = schema["name"]
+        namespace = schema.get("namespace", namespace)
+        if "." not in name and namespace:
+            name = f"{namespace}.{name}"
+        if name in named:
+            return name
+        named.add(name)
+        namespace = name.rpartition(".")[0]
+        canonical["name"] = name
+
+    canonical["type"] = "record" if kind == "error" else kind
+    if "fields" in schema:
+        canonical["fields"] = [
+            {
+                "name": field["name"],
+                "type": _avro_canonical(field["type"], namespace, named),
+            }
+            for field in schema["fields"]
+        ]
+    if "symbols" in schema:
+        canonical["symbols"] = list(schema["symbols"])
+    for key in ("items", "values"):
+        if key in schema:
+            canonical[key] = _avro_canonical(schema[key], namespace, named)
+    if "size" in schema:
+        canonical["size"] = int(schema["size"])
+
+    return canonical
+
+
+def arrow_fingerprint(arsc: pa.lib.Schema) -> str:
+    """sha256 fingerprint of the IPC serialization of an arrow schema"""
+    return hashlib.sha256(arsc.serialize().to_pybytes()).hexdigest()
+
+
+def _file_key(kind: str, path: str) -> tuple:
+    """cache key for a schema file, which changes when the file does"""
+    stat = os.stat(path)
+    return (kind, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+class DFInferArrowSchema(InstrumentedTask):
+    """
+    Infer arrow schema from pandas dataframe
+
+    Arrow datasets and record batch readers already carry a schema, which is
+    returned without reading any data.
+
+    sample limits the rows inspected, so the cost doesn't grow with the data:
+
+    "full" inspects every row.
+    "head" inspects the first sample_size rows.
+    "random" inspects a random sample of sample_size rows.
+    "batches" inspects every row in batches of sample_size rows, unifying the
+        schemas of each batch.
+
+    Iterables of dataframes or record batches are inferred batch by batch. With
+    confidence_check, a schema inferred from a sample of a dataframe is checked
+    against a second random sample and widened if that sample doesn't fit it.
+
+    preserve_index includes the index as fields whatever the sample. By default
+    (None) it is included when a dataframe has an index other than a RangeIndex,
+    judged on the whole dataframe rather than the rows sampled from it.
+    """
+
+    def __init__(
+        self,
+        sample: Literal["full", "head", "random", "batches"] = "full",
+        sample_size: int = 10000,
+        confidence_check: bool = True,
+        random_state: int = None,
+        preserve_index: bool = None,
+        **kwargs: Any,
+    ):
+        self.sample = sample
+        self.sample_size = sample_size
+        self.confidence_check = confidence_check
+        self.random_state = random_state
+        self.preserve_index = preserve_index
         super().__init__(**kwargs)
 
-    def run(self, dataframe: pd.DataFrame) -> pa.lib.Schema:
+    @defaults_from_attrs(
+        "sample", "sample_size", "confidence_check", "random_state", "preserve_index"
+    )
+    def run(
+        self,
+        dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader, Iterable[Any]],
+        sample: Literal["full", "head", "random", "batches"] = "full",
+        sample_size: int = 10000,
+        confidence_check: bool = True,
+        random_state: int = None,
+        preserve_index: bool = None,
+    ) -> pa.lib.Schema:
 
         logging.info("Inferring arrow schema from dataframe")
-        # infer the schema using pyarrow
-        arsc = pa.Schema.from_pandas(df=dataframe)
+        if is_lazy(dataframe):
+            return dataframe.schema
+
+        # sampled rows don't keep a RangeIndex, so decide from the whole dataframe
+        if preserve_index is None:
+            preserve_index = isinstance(dataframe, pd.DataFrame) and not isinstance(
+                dataframe.index, pd.RangeIndex
+            )
+
+        if isinstance(dataframe, pd.DataFrame) and sample == "full":
+            # infer the schema using pyarrow
+            return pa.Schema.from_pandas(df=dataframe, preserve_index=preserve_index)
+
+        arsc = None
+        for frame in _inference_frames(dataframe, sample, sample_size, random_state):
+            frame_arsc = pa.Schema.from_pandas(df=frame, preserve_index=preserve_index)
+            arsc = (
+                frame_arsc if arsc is None else _unify_arrow_schemas(arsc, frame_arsc)
+            )
+
+        if confidence_check and isinstance(dataframe, pd.DataFrame):
+            check_arsc = _unify_arrow_schemas(
+                arsc,
+                pa.Schema.from_pandas(
+                    df=_check_frame(dataframe, sample_size, random_state),
+                    preserve_index=preserve_index,
+                ),
+            )
+            if not check_arsc.equals(arsc):
+                logging.warning(
+                    "Arrow schema inferred from sample didn't fit a second sample, "
+                    "consider a larger sample_size."
+                )
+                arsc = check_arsc
 
         return arsc
 
 
-class ArrowSchemaToParquet(Task):
+class ArrowSchemaToParquet(InstrumentedTask):
     """Export arrow schema to parquet file"""
 
     def __init__(
@@ -57,32 +258,85 @@ class ArrowSchemaToParquet(Task):
         return filepath
 
 
-class ArrowSchemaFromParquet(Task):
-    """Import arrow schema from parquet file"""
+class ArrowSchemaFromParquet(InstrumentedTask):
+    """
+    Import arrow schema from parquet file
+
+    Only the file footer is read, never the data. Arrow IPC (feather) files and
+    streams are also read, detected from the file's magic bytes. With a client
+    and bucket_name the source is an object name in object store, of which only
+    the footer byte ranges are fetched.
+
+    Schemas read from files are cached in memory until the file changes.
+    """
 
     def __init__(
         self,
         source: Union[pa.lib.Table, str] = None,
+        client: Minio = None,
+        bucket_name: str = None,
         **kwargs: Any,
     ):
         self.source = source
+        self.client = client
+        self.bucket_name = bucket_name
         super().__init__(**kwargs)
 
-    @defaults_from_attrs("source")
-    def run(self, source: Union[pa.lib.Table, str]) -> pa.lib.Schema:
+    @defaults_from_attrs("source", "client", "bucket_name")
+    def run(
+        self,
+        source: Union[pa.lib.Table, str],
+        client: Minio = None,
+        bucket_name: str = None,
+    ) -> pa.lib.Schema:
 
         logging.info("Importing arrow schema from parquet")
         if isinstance(source, pa.lib.Table):
             schema = source.schema
 
+        elif isinstance(source, str) and client and bucket_name:
+            stat = client.stat_object(bucket_name=bucket_name, object_name=source)
+            schema = cached_schema(
+                ("objstr", bucket_name, source, stat.etag),
+                lambda: _read_file_schema(
+                    pa.PythonFile(
+                        ObjstrRangeReader(client, bucket_name, source, size=stat.size),
+                        mode="r",
+                    )
+                ),
+            )
+
         elif isinstance(source, str):
-            schema = pq.read_table(source=source).schema
+            schema = cached_schema(
+                _file_key("parquet", source),
+                lambda: _read_file_schema(pa.memory_map(source)),
+            )
 
         return schema
 
 
-class AvroSchema(Task):
-    """Create avro schema from dictionary or filepath string"""
+def _read_file_schema(source: pa.NativeFile) -> pa.lib.Schema:
+    """schema from the footer of a parquet or arrow IPC file, or an IPC stream"""
+    try:
+        magic = source.read(6)
+        source.seek(0)
+
+        if magic.startswith(b"PAR1"):
+            return pq.read_schema(source)
+        if magic == b"ARROW1":
+            return pa.ipc.open_file(source).schema
+        # IPC streams start with their schema message
+        return pa.ipc.open_stream(source).schema
+    finally:
+        source.close()
+
+
+class AvroSchema(InstrumentedTask):
+    """
+    Create avro schema from dictionary or filepath string
+
+    Schemas loaded from file are cached in memory until the file changes.
+    """
 
     def __init__(
         self,
@@ -94,36 +348,94 @@ class AvroSchema(Task):
 
         # if a dictionary type, parse from dict
         logging.info("Parsing avro schema")
-        if isinstance(avsc, dict):
+        if isinstance(avsc, dict) and "__fastavro_parsed" not in avsc:
+            # parsing a dict costs less than keying and copying a cached one
             avsc = avro.schema.parse_schema(avsc)
 
         # if a str type, load from file
         elif isinstance(avsc, str):
-            avsc = avro.schema.load_schema(avsc)
+            path = avsc
+            avsc = cached_schema(
+                _file_key("avsc", path), lambda: avro.schema.load_schema(path)
+            )
 
         return avsc
 
 
-class DFInferAvroSchema(Task):
-    """Infer avro schema from pandas dataframe"""
+class DFInferAvroSchema(InstrumentedTask):
+    """
+    Infer avro schema from pandas dataframe
+
+    For arrow datasets and record batch readers the schema is inferred from the
+    first batch, unless sampled otherwise.
+
+    sample, sample_size and confidence_check limit the rows inspected the same as
+    for DFInferArrowSchema, with int, long, float and double fields widened
+    when unifying the schemas of several batches.
+    """
 
     def __init__(
         self,
+        sample: Literal["full", "head", "random", "batches"] = "full",
+        sample_size: int = 10000,
+        confidence_check: bool = True,
+        random_state: int = None,
         **kwargs: Any,
     ):
+        self.sample = sample
+        self.sample_size = sample_size
+        self.confidence_check = confidence_check
+        self.random_state = random_state
         super().__init__(**kwargs)
 
+    @defaults_from_attrs("sample", "sample_size", "confidence_check", "random_state")
     def run(
         self,
-        dataframe: pd.DataFrame,
+        dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader, Iterable[Any]],
         schemaname: str = None,
         namespace: str = None,
         times_as_micros: bool = True,
+        sample: Literal["full", "head", "random", "batches"] = "full",
+        sample_size: int = 10000,
+        confidence_check: bool = True,
+        random_state: int = None,
     ) -> dict:
 
         logging.info("Inferring avro schema from dataframe")
-        # infer the schema using pandavro
-        schema = pda.schema_infer(df=dataframe, times_as_micros=times_as_micros)
+        if is_lazy(dataframe) and sample == "full":
+            dataframe = next(iter_frames(dataframe))
+
+        if isinstance(dataframe, pd.DataFrame) and sample == "full":
+            # infer the schema using pandavro
+            schema = pda.schema_infer(df=dataframe, times_as_micros=times_as_micros)
+        else:
+            schema = None
+            for frame in _inference_frames(
+                dataframe, sample, sample_size, random_state
+            ):
+                frame_schema = pda.schema_infer(
+                    df=frame, times_as_micros=times_as_micros
+                )
+                schema = (
+                    frame_schema
+                    if schema is None
+                    else _unify_avro_schemas(schema, frame_schema)
+                )
+
+            if confidence_check and isinstance(dataframe, pd.DataFrame):
+                check_schema = _unify_avro_schemas(
+                    schema,
+                    pda.schema_infer(
+                        df=_check_frame(dataframe, sample_size, random_state),
+                        times_as_micros=times_as_micros,
+                    ),
+                )
+                if check_schema != schema:
+                    logging.warning(
+                        "Avro schema inferred from sample didn't fit a second "
+                        "sample, consider a larger sample_size."
+                    )
+                    schema = check_schema
 
         # add custom schema name if exists (by default "Root")
         if schemaname:
@@ -135,7 +447,96 @@ class DFInferAvroSchema(Task):
         return AvroSchema().run(schema)
 
 
-class AvroSchemaToFile(Task):
+def _inference_frames(
+    dataframe: Any,
+    sample: str = "full",
+    sample_size: int = 10000,
+    random_state: int = None,
+) -> Iterator[pd.DataFrame]:
+    """the frames schema inference inspects for a given sample"""
+
+    if sample not in ("full", "head", "random", "batches"):
+        raise ValueError(f"Unsupported schema inference sample {sample}.")
+
+    # sampling strategies are shared with DFValidateSchemaAvro
+    return _sample_frames(
+        dataframe,
+        strategy={"random": "sample", "batches": "chunked"}.get(sample, sample),
+        sample_size=sample_size,
+        chunk_size=sample_size,
+        random_state=random_state,
+    )
+
+
+def _check_frame(
+    dataframe: pd.DataFrame, sample_size: int = 10000, random_state: int = None
+) -> pd.DataFrame:
+    """a random sample of a dataframe to check a sampled schema against"""
+    return dataframe.sample(
+        n=min(sample_size, len(dataframe.index)), random_state=random_state
+    )
+
+
+def _unify_arrow_schemas(left: pa.lib.Schema, right: pa.lib.Schema) -> pa.lib.Schema:
+    """unify arrow schemas inferred from batches, widening compatible types"""
+
+    fields = {field.name: field for field in left}
+    for field in right:
+        if field.name not in fields:
+            fields[field.name] = field
+            continue
+
+        current = fields[field.name]
+        if current.type.equals(field.type) or pa.types.is_null(field.type):
+            continue
+
+        if pa.types.is_null(current.type) or arrow_type_compatible(
+            current.type, field.type
+        ):
+            fields[field.name] = current.with_type(field.type)
+        elif not arrow_type_compatible(field.type, current.type):
+            raise ValueError(
+                f"Conflicting types {current.type} and {field.type} "
+                f"for field {field.name}."
+            )
+
+    return pa.schema(list(fields.values()), metadata=left.metadata)
+
+
+# avro numeric types in order of width, for widening when unifying schemas
+_AVRO_NUMERIC_ORDER = ["int", "long", "float", "double"]
+
+
+def _unify_avro_schemas(left: dict, right: dict) -> dict:
+    """unify pandavro inferred avro schemas from batches, widening numeric types"""
+
+    fields = {field["name"]: dict(field) for field in left["fields"]}
+    for field in right["fields"]:
+        if field["name"] not in fields:
+            fields[field["name"]] = dict(field)
+            continue
+
+        current = fields[field["name"]]
+        if current["type"] == field["type"]:
+            continue
+
+        # pandavro types are ["null", type]
+        current_type, field_type = current["type"][-1], field["type"][-1]
+        if current_type in _AVRO_NUMERIC_ORDER and field_type in _AVRO_NUMERIC_ORDER:
+            current["type"] = [
+                "null",
+                max(current_type, field_type, key=_AVRO_NUMERIC_ORDER.index),
+            ]
+        else:
+            raise ValueError(
+                f"Conflicting types {current_type} and {field_type} "
+                f"for field {field['name']}."
+            )
+
+    return {**left, "fields": list(fields.values())}
+
+
+class AvroSchemaToFile(InstrumentedTask):
     """Export avro schema to file"""
 
     def __init__(
@@ -174,39 +575,453 @@ class AvroSchemaToFile(Task):
         return filepath
 
 
-class DFValidateSchemaArrow(Task):
-    """Validate Pandas dataframe against arrow schema"""
+class DFValidateSchemaArrow(InstrumentedTask):
+    """
+    Validate Pandas dataframe against arrow schema
+
+    Arrow datasets and record batch readers are validated by their schema alone.
+
+    With mode="dtypes" only field names, types and nullability are compared, with
+    the dataframe's types taken from its dtypes rather than inferred from its
+    data. Object columns are typed from a sample of up to sample_size of their
+    values, and columns with no values to sample are logged and left out.
+    Unless compatible=False, safe promotions (e.g. int32 data for an int64
+    field, string for large_string) are accepted. Instead of a bool, a
+    pd.DataFrame with "Field", "Expected", "Actual" and "Status" columns is
+    returned for each difference, which is empty when the dataframe is valid.
+    """
 
     def __init__(
         self,
+        mode: Literal["equals", "dtypes"] = "equals",
+        compatible: bool = True,
+        sample_size: int = 1000,
         **kwargs: Any,
     ):
-
+        self.mode = mode
+        self.compatible = compatible
+        self.sample_size = sample_size
         super().__init__(**kwargs)
 
-    def run(self, dataframe: pd.DataFrame, arsc: pa.lib.Schema) -> bool:
+    @defaults_from_attrs("mode", "compatible", "sample_size")
+    def run(
+        self,
+        dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader],
+        arsc: pa.lib.Schema,
+        mode: Literal["equals", "dtypes"] = "equals",
+        compatible: bool = True,
+        sample_size: int = 1000,
+    ) -> Union[bool, pd.DataFrame]:
 
         self.logger.info("Validating dataframe against arrow schema")
+
+        if mode == "dtypes":
+            if is_lazy(dataframe):
+                actual = {
+                    field.name: (field.type, field.nullable)
+                    for field in dataframe.schema
+                }
+            else:
+                actual = {
+                    str(name): (
+                        _arrow_type_from_dtype(dtype)
+                        or _arrow_type_from_values(dataframe[name], sample_size),
+                        _dtype_nullable(dtype),
+                    )
+                    for name, dtype in dataframe.dtypes.items()
+                }
+
+            unchecked = [name for name, (type_, _) in actual.items() if type_ is None]
+            if unchecked:
+                self.logger.info("Not checking types of empty columns %s.", unchecked)
+
+            diff = _diff_arrow_fields(actual, arsc, compatible=compatible)
+            self.logger.info("Found %s schema differences.", len(diff.index))
+            return diff
+
+        if is_lazy(dataframe):
+            return arsc.equals(dataframe.schema)
+
         return arsc.equals(pa.Schema.from_pandas(dataframe))
 
 
-class DFValidateSchemaAvro(Task):
-    """Validate Pandas dataframe against avro schema dict"""
+def _arrow_type_from_dtype(dtype: Any) -> pa.DataType:
+    """arrow type of a pandas dtype without looking at data, None for object"""
+
+    if isinstance(dtype, pd.CategoricalDtype):
+        value_type = _arrow_type_from_dtype(dtype.categories.dtype)
+        return pa.dictionary(pa.int8(), value_type) if value_type else None
+
+    if isinstance(dtype, pd.StringDtype):
+        return pa.string()
+
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return pa.timestamp(dtype.unit, tz=str(dtype.tz))
+
+    if hasattr(dtype, "pyarrow_dtype"):
+        return dtype.pyarrow_dtype
+
+    # nullable extension dtypes such as Int64 and boolean wrap a numpy dtype
+    if pd.api.types.is_extension_array_dtype(dtype):
+        numpy_dtype = getattr(dtype, "numpy_dtype", None)
+        return pa.from_numpy_dtype(numpy_dtype) if numpy_dtype is not None else None
+
+    if dtype == object:
+        return None
+
+    return pa.from_numpy_dtype(dtype)
+
+
+def _arrow_type_from_values(
+    column: pd.Series, sample_size: int
+) -> Union[pa.DataType, str]:
+    """
+    arrow type inferred from a sample of a column's values, None if it has none
+    and "mixed" if they don't share a type
+    """
+
+    values = column.dropna()
+    if values.empty:
+        return None
+
+    values = values.sample(n=min(sample_size, len(values.index)), random_state=0)
+    try:
+        # by position, infer_type looks series values up by index label
+        return pa.infer_type(values.tolist())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return "mixed"
+
+
+def _dtype_nullable(dtype: Any) -> bool:
+    """whether a pandas dtype can hold missing values"""
+    return not (
+        isinstance(dtype, np.dtype) and (dtype.kind in "iub")  # ints, uints and bools
+    )
+
+
+def arrow_type_compatible(actual: pa.DataType, expected: pa.DataType) -> bool:
+    """whether actual data can be safely promoted to the expected arrow type"""
+
+    if actual.equals(expected):
+        return True
+
+    if pa.types.is_integer(actual) and pa.types.is_integer(expected):
+        if pa.types.is_signed_integer(expected):
+            if pa.types.is_signed_integer(actual):
+                return actual.bit_width <= expected.bit_width
+            return actual.bit_width < expected.bit_width
+        return (
+            pa.types.is_unsigned_integer(actual)
+            and actual.bit_width <= expected.bit_width
+        )
+
+    if pa.types.is_floating(actual) and pa.types.is_floating(expected):
+        return actual.bit_width <= expected.bit_width
+
+    # integers which fit in the float's mantissa
+    if pa.types.is_integer(actual) and pa.types.is_floating(expected):
+        return actual.bit_width < expected.bit_width
+
+    for same_kind in (
+        (pa.types.is_string, pa.types.is_large_string),
+        (pa.types.is_binary, pa.types.is_large_binary),
+    ):
+        if any(check(actual) for check in same_kind) and any(
+            check(expected) for check in same_kind
+        ):
+            return True
+
+    if pa.types.is_timestamp(actual) and pa.types.is_timestamp(expected):
+        return actual.tz == expected.tz
+
+    if pa.types.is_dictionary(actual) or pa.types.is_dictionary(expected):
+        return arrow_type_compatible(
+            getattr(actual, "value_type", actual),
+            getattr(expected, "value_type", expected),
+        )
+
+    return False
+
+
+def _diff_arrow_fields(
+    actual: dict, arsc: pa.lib.Schema, compatible: bool = True
+) -> pd.DataFrame:
+    """differences between (type, nullable) by field name and an arrow schema"""
+
+    diff = []
+
+    for field in arsc:
+        if field.name not in actual:
+            diff.append((field.name, str(field.type), None, "missing"))
+            continue
+
+        actual_type, actual_nullable = actual[field.name]
+
+        if actual_type is None:
+            continue
+        if isinstance(actual_type, str):
+            status = "type mismatch"
+        elif actual_type.equals(field.type):
+            status = None
+        elif compatible and arrow_type_compatible(actual_type, field.type):
+            status = None
+        else:
+            status = "type mismatch"
+
+        if status is None and actual_nullable and not field.nullable:
+            status = "nullability"
+
+        if status:
+            diff.append(
+                (
+                    field.name,
+                    str(field.type),
+                    str(actual_type),
+                    status,
+                )
+            )
+
+    diff.extend(
+        (name, None, str(actual_type or "object"), "unexpected")
+        for name, (actual_type, _) in actual.items()
+        if name not in arsc.names
+    )
+
+    return pd.DataFrame(diff, columns=["Field", "Expected", "Actual", "Status"])
+
+
+class DFValidateSchemaAvro(InstrumentedTask):
+    """
+    Validate Pandas dataframe against avro schema dict
+
+    Arrow datasets and record batch readers are validated batch by batch.
+
+    With engine="columns" each avro field is checked against its whole column at
+    once (dtype, nullability and int/long ranges), falling back to validating
+    individual values only for complex field types (records, arrays, maps, enums,
+    fixed and multi-type unions). Instead of a bool, a pd.DataFrame with "Row",
+    "Field" and "Reason" columns describing each offending value is returned,
+    which is empty when the dataframe is valid.
+
+    strategy trades thoroughness for latency:
+
+    "full" validates every row.
+    "head" validates the first sample_size rows.
+    "sample" validates a random sample of sample_size rows drawn across all
+        batches (or a fraction of each batch if a float).
+    "stratified" samples the same fraction from each group of stratify_by values,
+        about sample_size rows in all drawn across all batches (or a fraction
+        of each batch if a float).
+    "chunked" validates every row in chunks of chunk_size rows across
+        max_workers processes, stopping at the first chunk which fails.
+    """
 
     def __init__(
         self,
-        dataframe: pd.DataFrame = None,
+        dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader] = None,
         avsc: dict = None,
+        engine: Literal["records", "columns"] = "records",
+        strategy: Literal["full", "head", "sample", "stratified", "chunked"] = "full",
+        sample_size: Union[int, float] = 10000,
+        stratify_by: str = None,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = None,
+        random_state: int = None,
         **kwargs: Any,
     ):
         self.dataframe = dataframe
         self.avsc = avsc
+        self.engine = engine
+        self.strategy = strategy
+        self.sample_size = sample_size
+        self.stratify_by = stratify_by
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.random_state = random_state
         super().__init__(**kwargs)
 
-    @defaults_from_attrs("dataframe", "avsc")
-    def run(self, dataframe: pd.DataFrame, avsc: dict) -> bool:
+    @defaults_from_attrs(
+        "dataframe",
+        "avsc",
+        "engine",
+        "strategy",
+        "sample_size",
+        "stratify_by",
+        "chunk_size",
+        "max_workers",
+        "random_state",
+    )
+    def run(
+        self,
+        dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader],
+        avsc: dict,
+        engine: Literal["records", "columns"] = "records",
+        strategy: Literal["full", "head", "sample", "stratified", "chunked"] = "full",
+        sample_size: Union[int, float] = 10000,
+        stratify_by: str = None,
+        chunk_size: int = DEFAULT_BATCH_SIZE,
+        max_workers: int = None,
+        random_state: int = None,
+    ) -> Union[bool, pd.DataFrame]:
+
+        self.logger.info(
+            "Validating dataframe against avro schema dict using %s strategy.",
+            strategy,
+        )
+
+        if strategy not in ("full", "head", "sample", "stratified", "chunked"):
+            raise ValueError(f"Unsupported validation strategy {strategy}.")
+
+        if strategy == "stratified" and not stratify_by:
+            raise ValueError("stratify_by is required for stratified validation.")
+
+        frames = _sample_frames(
+            dataframe,
+            strategy=strategy,
+            sample_size=sample_size,
+            stratify_by=stratify_by,
+            chunk_size=chunk_size,
+            random_state=random_state,
+        )
+
+        if strategy == "chunked":
+            results = validate_avro_chunks(frames, avsc, engine, max_workers)
+        else:
+            results = (validate_avro_frame(frame, avsc, engine) for frame in frames)
+
+        if engine == "columns":
+            report = pd.concat(
+                [pd.DataFrame(columns=["Row", "Field", "Reason"]), *results],
+                ignore_index=True,
+            )
+            self.logger.info("Found %s invalid values.", len(report.index))
+            return report
+
+        return all(results)
+
+
+def _sample_frames(
+    dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader],
+    strategy: str = "full",
+    sample_size: Union[int, float] = 10000,
+    stratify_by: str = None,
+    chunk_size: int = DEFAULT_BATCH_SIZE,
+    random_state: int = None,
+) -> Iterator[pd.DataFrame]:
+    """the frames to validate or infer schemas from for a given sampling strategy"""
 
-        self.logger.info("Validating dataframe against avro schema dict.")
-        return avro.validation.validate_many(
-            records=dataframe.replace(pd.NA, "").to_dict(orient="records"), schema=avsc
+    if strategy == "head" and isinstance(sample_size, float):
+        raise ValueError("The head strategy takes a number of rows, not a fraction.")
+
+    if isinstance(dataframe, pd.DataFrame) and strategy == "chunked":
+        frames = (
+            dataframe.iloc[start : start + chunk_size]
+            for start in range(0, len(dataframe.index), chunk_size)
+        )
+    else:
+        frames = _numbered_frames(dataframe, chunk_size)
+
+    if strategy in ("sample", "stratified") and not isinstance(sample_size, float):
+        # a number of rows is sampled across all batches rather than from each
+        sampled = (
+            _sample_rows(frames, sample_size, random_state)
+            if strategy == "sample"
+            else _sample_strata(frames, sample_size, stratify_by, random_state)
         )
+        if sampled is not None:
+            yield sampled
+        return
+
+    # one generator, so each batch draws different rows for the same random_state
+    random_state = np.random.default_rng(random_state)
+
+    remaining = sample_size
+    for frame in frames:
+        if strategy == "head":
+            frame = frame.iloc[:remaining]
+            remaining -= len(frame.index)
+            yield frame
+            if remaining <= 0:
+                return
+        elif strategy == "sample":
+            yield frame.sample(frac=sample_size, random_state=random_state)
+        elif strategy == "stratified" and not frame.empty:
+            yield frame.groupby(stratify_by, dropna=False, group_keys=False).sample(
+                frac=sample_size, random_state=random_state
+            )
+        else:
+            yield frame
+
+
+def _sample_rows(
+    frames: Iterator[pd.DataFrame], sample_size: int, random_state: int = None
+) -> pd.DataFrame:
+    """
+    uniform random sample of sample_size rows across frames, in their original
+    order, holding at most sample_size rows and one frame in memory
+    """
+
+    # keep the rows with the smallest random keys seen so far
+    rng = np.random.default_rng(random_state)
+    sampled, sampled_keys = None, np.empty(0)
+    for frame in frames:
+        keys = np.concatenate([sampled_keys, rng.random(len(frame.index))])
+        frame = frame if sampled is None else pd.concat([sampled, frame])
+        positions = np.sort(np.argsort(keys, kind="stable")[:sample_size])
+        sampled, sampled_keys = frame.iloc[positions], keys[positions]
+
+    return sampled
+
+
+def _sample_strata(
+    frames: Iterator[pd.DataFrame],
+    sample_size: int,
+    stratify_by: str,
+    random_state: int = None,
+) -> pd.DataFrame:
+    """
+    random sample of about sample_size rows across frames, in their original
+    order, with each group of stratify_by values sampled in proportion to its
+    rows, holding about sample_size rows and one frame in memory
+    """
+
+    # keep the rows with the smallest random keys in each group, as many as the
+    # group's share of the sample of the rows seen so far
+    rng = np.random.default_rng(random_state)
+    sampled, sampled_keys = None, np.empty(0)
+    strata, counts, seen = pd.Series([], dtype=object), np.empty(0, dtype=int), 0
+    for frame in frames:
+        seen += len(frame.index)
+        keys = np.concatenate([sampled_keys, rng.random(len(frame.index))])
+        frame = frame if sampled is None else pd.concat([sampled, frame])
+
+        # group codes consistent across frames, the groups seen so far first
+        codes, uniques = pd.factorize(
+            pd.concat([strata, frame[stratify_by].astype(object)]),
+            use_na_sentinel=False,
+        )
+        codes, strata = codes[len(strata) :], pd.Series(uniques, dtype=object)
+        counts = np.pad(counts, (0, len(strata) - len(counts))) + np.bincount(
+            codes[len(sampled_keys) :], minlength=len(strata)
+        )
+
+        quotas = np.round(counts * min(1.0, sample_size / seen))
+        ranks = pd.Series(keys).groupby(codes).rank(method="first").to_numpy()
+        positions = np.flatnonzero(ranks <= quotas[codes])
+        sampled, sampled_keys = frame.iloc[positions], keys[positions]
+
+    return sampled
+
+
+def _numbered_frames(
+    dataframe: Union[pd.DataFrame, ds.Dataset, pa.RecordBatchReader],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """iterate over frames, numbering the rows of lazy batches from the first batch"""
+    offset = 0
+    for frame in iter_frames(dataframe, batch_size):
+        # batches are numbered from zero, continue on from the last batch
+        if is_lazy(dataframe):
+            frame.index = frame.index + offset
+            offset += len(frame.index)
+        yield frame
@@ -1,18 +1,50 @@
 """ SFTP related Prefect tasks """
 import datetime
 import os
+import stat
 from typing import Any
 
 import pandas as pd
+import paramiko
 import prefect
 import pysftp
 from box import Box
-from prefect import Task
+from prefect.utilities.tasks import defaults_from_attrs
 
-# pylint: disable=arguments-differ, no-member, logging-too-many-args
+from .compression import GzipReader, extract, infer_compression, strip_suffix
+from .instrumentation import InstrumentedTask, measure
+from .polling import wait_for_files
 
+# pylint: disable=arguments-differ, no-member, logging-too-many-args, too-many-arguments
 
-class SFTPExists(Task):
+
+def _connect(config_box: Box, cnopts: pysftp.CnOpts = None) -> pysftp.Connection:
+    """open an sftp connection with the config's private key or password"""
+
+    with measure("connect_seconds"):
+        # We have to handle either a password or a key
+        if config_box.get("private_key_path"):
+            return pysftp.Connection(
+                host=config_box["hostname"],
+                port=config_box.get("port", 22),
+                username=config_box["username"],
+                private_key=config_box["private_key_path"],
+                private_key_pass=config_box.get("private_key_passphrase"),
+                cnopts=cnopts,
+            )
+        if config_box.get("password"):
+            return pysftp.Connection(
+                host=config_box["hostname"],
+                port=config_box.get("port", 22),
+                username=config_box["username"],
+                password=config_box["password"],
+                cnopts=cnopts,
+            )
+
+    raise ValueError("The configuration must have a private_key_path or password")
+
+
+class SFTPExists(InstrumentedTask):
     """
     Checks filename from FTP server
 
@@ -35,34 +67,7 @@ class SFTPExists(Task):
                 if data.parameters.get("cnopts"):
                     cnopts = data.parameters["cnopts"]
 
-            # We have to handle either a password or a key
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            sftp = _connect(config_box, cnopts)
 
             try:
                 with sftp.cd(config_box["target_dir"]):
@@ -73,10 +78,14 @@ class SFTPExists(Task):
             return result
 
 
-class SFTPGet(Task):
+class SFTPGet(InstrumentedTask):
     """
     Fetch filename from FTP server
 
+    With decompress ('gzip', 'zip', 'tar' or 'infer' from the file name) the file
+    is decompressed as it's fetched, to a file without the compression suffix
+    or, for archives, a directory named after the archive.
+
     Return a file_location_name
     """
 
@@ -89,6 +98,7 @@ class SFTPGet(Task):
         config_box: Box,
         cnopts: pysftp.CnOpts = None,
         tempfolderpath: str = None,
+        decompress: str = None,
         **format_kwargs: Any,
     ) -> str:
         with prefect.context(**format_kwargs) as data:
@@ -99,40 +109,23 @@ class SFTPGet(Task):
                 if data.parameters.get("cache"):
                     tempfolderpath = data.parameters["cache"]
 
+            compression = infer_compression(workfile, decompress)
+
             localtmpfile = os.path.join(tempfolderpath, workfile)
-            self.logger.debug("Working on %s", os.path.join(tempfolderpath, workfile))
-
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            if compression:
+                localtmpfile = strip_suffix(localtmpfile, compression)
+            self.logger.debug("Working on %s", localtmpfile)
+
+            sftp = _connect(config_box, cnopts)
 
             try:
                 with sftp.cd(config_box["target_dir"]):
-                    sftp.get(workfile, localpath=localtmpfile, preserve_mtime=False)
+                    if compression:
+                        with sftp.open(workfile, "rb") as remote:
+                            remote.prefetch()
+                            extract(remote, compression, localtmpfile)
+                    else:
+                        sftp.get(workfile, localpath=localtmpfile, preserve_mtime=False)
             finally:
                 sftp.close()
 
@@ -141,11 +134,14 @@ class SFTPGet(Task):
             return localtmpfile
 
 
-class SFTPPut(Task):
+class SFTPPut(InstrumentedTask):
     """
     Put a file on the FTP server
 
     Leave remotepath off, or None and the workfile and the remote file are the same.
+
+    With compress='gzip' the file is compressed as it's sent, to remotepath or the
+    workfile name with a .gz suffix.
     """
 
     def __init__(self, **kwargs: Any):
@@ -157,6 +153,7 @@ class SFTPPut(Task):
         config_box: Box,
         cnopts: pysftp.CnOpts = None,
         remotepath: str = None,
+        compress: str = None,
         **format_kwargs: Any,
     ):
         with prefect.context(**format_kwargs) as data:
@@ -165,40 +162,25 @@ class SFTPPut(Task):
                 if data.parameters.get("cnopts"):
                     cnopts = data.parameters["cnopts"]
 
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            if compress and compress != "gzip":
+                raise ValueError("compress must be 'gzip' or None.")
+
+            sftp = _connect(config_box, cnopts)
 
             try:
                 if not sftp.isdir(config_box["target_dir"]):
                     sftp.mkdir(config_box["target_dir"])
 
                 with sftp.cd(config_box["target_dir"]):
-                    sftp.put(workfile, preserve_mtime=False, remotepath=remotepath)
+                    if compress:
+                        with open(workfile, "rb") as local:
+                            sftp.putfo(
+                                GzipReader(local),
+                                remotepath=remotepath
+                                or os.path.basename(workfile) + ".gz",
+                            )
+                    else:
+                        sftp.put(workfile, preserve_mtime=False, remotepath=remotepath)
             finally:
                 sftp.close()
 
@@ -207,7 +189,7 @@ class SFTPPut(Task):
             return workfile
 
 
-class SFTPRemove(Task):
+class SFTPRemove(InstrumentedTask):
     """
     Remove file from the FTP server
     """
@@ -230,33 +212,7 @@ class SFTPRemove(Task):
                 if data.parameters.get("cnopts"):
                     cnopts = data.parameters["cnopts"]
 
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            sftp = _connect(config_box, cnopts)
 
             # Pick out the oldest file in the dataframe
             try:
@@ -271,7 +227,7 @@ class SFTPRemove(Task):
             return workfile
 
 
-class SFTPRename(Task):
+class SFTPRename(InstrumentedTask):
     """
     Rename (move) file on the FTP server
     """
@@ -295,33 +251,7 @@ class SFTPRename(Task):
             if data.parameters.get("cnopts"):
                 cnopts = data.parameters["cnopts"]
 
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            sftp = _connect(config_box, cnopts)
 
             # "root" is special
             remotesourcepath = (
@@ -364,7 +294,7 @@ class SFTPRename(Task):
             return target
 
 
-class SFTPPoll(Task):
+class SFTPPoll(InstrumentedTask):
     """
     Polls for SFTP files
     """
@@ -381,33 +311,7 @@ class SFTPPoll(Task):
                 if data.parameters.get("cnopts"):
                     cnopts = data.parameters["cnopts"]
 
-            if config_box.get("private_key_path"):
-                private_key = config_box["private_key_path"]
-                if config_box.get("private_key_passphrase"):
-                    # has a passphrase, use it
-                    private_key_passphrase = config_box["private_key_passphrase"]
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        private_key_pass=private_key_passphrase,
-                        cnopts=cnopts,
-                    )
-                else:
-                    sftp = pysftp.Connection(
-                        host=config_box["hostname"],
-                        username=config_box["username"],
-                        private_key=private_key,
-                        cnopts=cnopts,
-                    )
-            elif config_box.get("password"):
-                password = config_box["password"]
-                sftp = pysftp.Connection(
-                    host=config_box["hostname"],
-                    username=config_box["username"],
-                    password=password,
-                    cnopts=cnopts,
-                )
+            sftp = _connect(config_box, cnopts)
 
             files_data = []
 
@@ -440,7 +344,109 @@ class SFTPPoll(Task):
             return files_df
 
 
-class DFGetOldestFile(Task):
+class SFTPSensor(InstrumentedTask):
+    """
+    Waits for SFTP files to arrive, polling over a single connection
+
+    Polling backs off from poll_interval up to max_interval while the directory is
+    idle. Returns as soon as min_count files matching regex_search have gone
+    quiescence seconds without changing size or mtime.
+
+    Returns a pd.DataFrame like SFTPPoll's, empty if max_wait seconds pass first
+    """
+
+    def __init__(
+        self,
+        regex_search: str = None,
+        min_count: int = 1,
+        quiescence: float = 0,
+        poll_interval: float = 5,
+        max_interval: float = 300,
+        backoff: float = 2,
+        max_wait: float = None,
+        **kwargs: Any,
+    ):
+        self.regex_search = regex_search
+        self.min_count = min_count
+        self.quiescence = quiescence
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_wait = max_wait
+        super().__init__(**kwargs)
+
+    @defaults_from_attrs(
+        "regex_search",
+        "min_count",
+        "quiescence",
+        "poll_interval",
+        "max_interval",
+        "backoff",
+        "max_wait",
+    )
+    def run(
+        self,
+        config_box: Box,
+        cnopts: pysftp.CnOpts = None,
+        regex_search: str = None,
+        min_count: int = 1,
+        quiescence: float = 0,
+        poll_interval: float = 5,
+        max_interval: float = 300,
+        backoff: float = 2,
+        max_wait: float = None,
+        **format_kwargs: Any,
+    ) -> pd.DataFrame:
+        with prefect.context(**format_kwargs) as data:
+
+            if data.get("parameters"):
+                if data.parameters.get("cnopts"):
+                    cnopts = data.parameters["cnopts"]
+
+            sftp = _connect(config_box, cnopts)
+
+            def list_files() -> dict:
+                nonlocal sftp
+
+                try:
+                    attrs = sftp.listdir_attr(config_box["target_dir"])
+                except (EOFError, OSError, paramiko.SSHException) as err:
+                    # servers drop idle sessions, reconnect once and carry on
+                    self.logger.warning("Reconnecting after listing failed: %s", err)
+                    sftp.close()
+                    sftp = _connect(config_box, cnopts)
+                    attrs = sftp.listdir_attr(config_box["target_dir"])
+
+                return {
+                    attr.filename: (
+                        datetime.datetime.fromtimestamp(attr.st_mtime),
+                        (attr.st_size, attr.st_mtime),
+                    )
+                    for attr in attrs
+                    if stat.S_ISREG(attr.st_mode)
+                }
+
+            try:
+                ready = wait_for_files(
+                    list_files,
+                    regex_search=regex_search,
+                    min_count=min_count,
+                    quiescence=quiescence,
+                    poll_interval=poll_interval,
+                    max_interval=max_interval,
+                    backoff=backoff,
+                    timeout=max_wait,
+                    logger=self.logger,
+                )
+            finally:
+                sftp.close()
+
+            return pd.DataFrame(
+                list(ready.items()), columns=["File Name", "MTime"]
+            ).sort_values(by="MTime", ignore_index=True)
+
+
+class DFGetOldestFile(InstrumentedTask):
     """
     Pick the oldest file off the top of the given dataframe.
     The dataframe requires columns called 'File Name' and 'MTime'
@@ -0,0 +1,43 @@
+""" Fixtures for tests against local stand-ins of the sftp and object store services """
+
+import os
+import uuid
+
+import pytest
+from box import Box
+
+# the stand-in fixtures are shared with the benchmarks
+# pylint: disable=unused-import
+from .standins import (
+    fixture_cnopts,
+    fixture_known_hosts,
+    fixture_s3_client,
+    fixture_s3_config,
+    fixture_sftp_server,
+)
+
+
+@pytest.fixture(name="sftp_config")
+def fixture_sftp_config(sftp_server):
+    """config box for the in-process sftp server with an empty target directory"""
+    target_dir = f"upload_{uuid.uuid4().hex[:8]}"
+    os.mkdir(os.path.join(sftp_server.root_dir, target_dir))
+
+    return Box(
+        {
+            "hostname": "127.0.0.1",
+            "port": sftp_server.port,
+            "username": "test",
+            "password": "test",
+            "target_dir": target_dir,
+            "root_dir": sftp_server.root_dir,
+        }
+    )
+
+
+@pytest.fixture(name="bucket_name")
+def fixture_bucket_name(s3_client):
+    """an empty bucket for each test"""
+    bucket_name = f"test-{uuid.uuid4().hex[:12]}"
+    s3_client.make_bucket(bucket_name)
+    return bucket_name
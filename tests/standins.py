@@ -0,0 +1,216 @@
+""" Local stand-ins for the services cupyopt tasks talk to, shared with benchmarks """
+import os
+import socket
+import threading
+
+import paramiko
+import pysftp
+import pytest
+from box import Box
+from minio import Minio
+
+# pylint: disable=attribute-defined-outside-init
+
+
+class _Server(paramiko.ServerInterface):
+    """ssh server accepting any password and sftp sessions"""
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    """sftp handle over a local file"""
+
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+class _SFTPServer(paramiko.SFTPServerInterface):
+    """sftp server serving a local directory as its root"""
+
+    def __init__(self, server, root_dir, *args, **kwargs):
+        self.root_dir = root_dir
+        super().__init__(server, *args, **kwargs)
+
+    def _local(self, path):
+        return os.path.join(self.root_dir, self.canonicalize(path).lstrip("/"))
+
+    def list_folder(self, path):
+        try:
+            files = []
+            for filename in os.listdir(self._local(path)):
+                attr = paramiko.SFTPAttributes.from_stat(
+                    os.stat(os.path.join(self._local(path), filename))
+                )
+                attr.filename = filename
+                files.append(attr)
+            return files
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+    lstat = stat
+
+    def open(self, path, flags, attr):
+        try:
+            file_descriptor = os.open(self._local(path), flags, 0o666)
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+
+        handle = _SFTPHandle(flags)
+        handle.filename = self._local(path)
+        handle.readfile = handle.writefile = os.fdopen(file_descriptor, mode)
+        return handle
+
+    def _call(self, func, *paths):
+        try:
+            func(*(self._local(path) for path in paths))
+        except OSError as err:
+            return paramiko.SFTPServer.convert_errno(err.errno)
+        return paramiko.SFTP_OK
+
+    def remove(self, path):
+        return self._call(os.remove, path)
+
+    def rename(self, oldpath, newpath):
+        # sftp v3 renames (e.g. OpenSSH's) fail rather than replace newpath
+        if os.path.lexists(self._local(newpath)):
+            return paramiko.SFTP_FAILURE
+        return self._call(os.rename, oldpath, newpath)
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, path)
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, path)
+
+
+class SFTPStandIn:
+    """
+    In-process sftp server on a random local port serving root_dir
+
+    Any username and password is accepted.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        self.transports = []
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.socket.accept()
+            except OSError:
+                # socket closed by stop
+                return
+
+            transport = paramiko.Transport(connection)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler(
+                "sftp", paramiko.SFTPServer, _SFTPServer, self.root_dir
+            )
+            transport.start_server(server=_Server())
+            self.transports.append(transport)
+
+    def start(self):
+        """start accepting connections on a background thread"""
+        self.socket.listen(16)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        """stop accepting connections and close open sessions"""
+        self.socket.close()
+        for transport in self.transports:
+            transport.close()
+
+
+@pytest.fixture(name="sftp_server", scope="session")
+def fixture_sftp_server(tmp_path_factory):
+    """in-process sftp server"""
+    server = SFTPStandIn(str(tmp_path_factory.mktemp("sftp")))
+    server.start()
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture(name="known_hosts", scope="session")
+def fixture_known_hosts(sftp_server, tmp_path_factory):
+    """known_hosts file trusting the in-process sftp server's host key"""
+    known_hosts = tmp_path_factory.mktemp("ssh") / "known_hosts"
+    host_key = sftp_server.host_key
+    known_hosts.write_text(
+        f"127.0.0.1 {host_key.get_name()} {host_key.get_base64()}\n"
+        f"[127.0.0.1]:{sftp_server.port} {host_key.get_name()} "
+        f"{host_key.get_base64()}\n",
+        encoding="utf-8",
+    )
+    return str(known_hosts)
+
+
+@pytest.fixture(name="cnopts")
+def fixture_cnopts(known_hosts):
+    """connection options trusting the in-process sftp server's host key"""
+    return pysftp.CnOpts(knownhosts=known_hosts)
+
+
+@pytest.fixture(name="s3_config", scope="session")
+def fixture_s3_config():
+    """config box for an in-process s3 compatible server"""
+    moto_server = pytest.importorskip("moto.server")
+
+    server = moto_server.ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+
+    yield Box(
+        {
+            "endpoint": f"{host}:{port}",
+            "key": "test",
+            "secret": "testsecret",
+            "secure": False,
+        }
+    )
+
+    server.stop()
+
+
+@pytest.fixture(name="s3_client", scope="session")
+def fixture_s3_client(s3_config):
+    """minio client for the in-process s3 compatible server"""
+    return Minio(
+        s3_config.endpoint,
+        access_key=s3_config.key,
+        secret_key=s3_config.secret,
+        secure=False,
+    )
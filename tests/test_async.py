@@ -0,0 +1,251 @@
+""" Tests asyncio batch transfer nuggets """
+
+import asyncio
+import os
+
+import pytest
+from box import Box
+from cupyopt.async_tasks import (
+    ObjstrFGetBatch,
+    ObjstrFPutBatch,
+    SFTPGetBatch,
+    SFTPPutBatch,
+    SFTPRemoveBatch,
+    SFTPRenameBatch,
+    _gather_limited,
+)
+
+from . import standins
+
+
+def write_files(dir_name, count):
+    """local files lemur_<num>.txt holding their own name"""
+    file_paths = []
+    for num in range(count):
+        file_paths.append(os.path.join(dir_name, f"lemur_{num}.txt"))
+        with open(file_paths[-1], "w", encoding="utf-8") as lemur_file:
+            lemur_file.write(f"lemur_{num}.txt")
+    return file_paths
+
+
+def statuses(status_df):
+    """status of each file name in a status frame"""
+    return dict(zip(status_df["File Name"], status_df["Status"]))
+
+
+def test_gather_limited():
+    """test transfers run concurrently up to the limit and failures are per name"""
+    in_flight = {"now": 0, "max": 0}
+
+    async def transfer(name):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        if name == "tiger":
+            raise OSError("tiger bit")
+
+    names = ["lemur"] * 9 + ["tiger"]
+    status_df = asyncio.run(_gather_limited(names, transfer, max_concurrency=3))
+
+    assert in_flight["max"] == 3
+    assert list(status_df["Status"]) == ["done"] * 9 + ["failed"]
+    assert status_df["Error"].iloc[-1] == "tiger bit"
+
+
+def test_objstr_fput_batch(tmpdir):
+    """test failed puts are reported per file"""
+    file_paths = []
+    for num in range(3):
+        file_paths.append(os.path.join(tmpdir, f"lemur_{num}.txt"))
+        with open(file_paths[-1], "w", encoding="utf-8") as lemur_file:
+            lemur_file.write("lemur")
+
+    # nothing listens on the discard port
+    config_box = Box(
+        {
+            "endpoint": "127.0.0.1:9",
+            "key": "testkey",
+            "secret": "testsecret",
+            "secure": False,
+        }
+    )
+    status_df = ObjstrFPutBatch().run(
+        file_paths=file_paths, config_box=config_box, bucket_name="bucket"
+    )
+
+    assert list(status_df["File Name"]) == file_paths
+    assert (status_df["Status"] == "failed").all()
+
+
+def test_sftp_get_batch(tmpdir):
+    """test connection failure"""
+    config_box = Box(
+        {
+            "hostname": "127.0.0.1",
+            "port": 9,
+            "username": "test",
+            "password": "test",
+            "target_dir": "upload",
+        }
+    )
+    with pytest.raises(OSError):
+        SFTPGetBatch().run(
+            workfiles=["lemur.txt"], config_box=config_box, tempfolderpath=str(tmpdir)
+        )
+
+
+def test_sftp_rename_batch():
+    """test connection failure"""
+    config_box = Box(
+        {
+            "hostname": "127.0.0.1",
+            "port": 9,
+            "username": "test",
+            "password": "test",
+            "target_dir": "upload",
+        }
+    )
+    with pytest.raises(OSError):
+        SFTPRenameBatch(target_folder="done").run(
+            workfiles=["lemur.txt"], config_box=config_box
+        )
+
+
+def test_sftp_batch_round_trip(sftp_config, known_hosts, tmpdir):
+    """test batch puts and gets against an sftp server, with one missing file"""
+    file_paths = write_files(tmpdir.mkdir("put"), 5)
+    missing_path = os.path.join(tmpdir, "missing.txt")
+
+    status_df = SFTPPutBatch(max_concurrency=2, known_hosts=known_hosts).run(
+        workfiles=file_paths + [missing_path], config_box=sftp_config
+    )
+    assert statuses(status_df) == {
+        **{file_path: "done" for file_path in file_paths},
+        missing_path: "failed",
+    }
+    assert sorted(
+        os.listdir(os.path.join(sftp_config.root_dir, sftp_config.target_dir))
+    ) == [os.path.basename(file_path) for file_path in file_paths]
+
+    workfiles = [os.path.basename(file_path) for file_path in file_paths]
+    get_dir = tmpdir.mkdir("get")
+    status_df = SFTPGetBatch(max_concurrency=2, known_hosts=known_hosts).run(
+        workfiles=workfiles + ["missing.txt"],
+        config_box=sftp_config,
+        tempfolderpath=str(get_dir),
+    )
+    assert statuses(status_df) == {
+        **{workfile: "done" for workfile in workfiles},
+        "missing.txt": "failed",
+    }
+    for workfile in workfiles:
+        assert get_dir.join(workfile).read() == workfile
+
+
+def test_objstr_batch_round_trip(s3_config, bucket_name, s3_client, tmpdir):
+    """test batch puts and gets against an s3 server, with one missing file"""
+    file_paths = write_files(tmpdir.mkdir("put"), 5)
+    missing_path = os.path.join(tmpdir, "missing.txt")
+
+    status_df = ObjstrFPutBatch(max_concurrency=2).run(
+        file_paths=file_paths + [missing_path],
+        config_box=s3_config,
+        bucket_name=bucket_name,
+        prefix="lemurs/",
+    )
+    assert statuses(status_df) == {
+        **{file_path: "done" for file_path in file_paths},
+        missing_path: "failed",
+    }
+
+    object_names = sorted(
+        obj.object_name for obj in s3_client.list_objects(bucket_name, prefix="lemurs/")
+    )
+    assert object_names == [
+        f"lemurs/{os.path.basename(file_path)}" for file_path in file_paths
+    ]
+
+    get_dir = tmpdir.mkdir("get")
+    status_df = ObjstrFGetBatch(max_concurrency=2).run(
+        object_names=object_names + ["lemurs/missing.txt"],
+        dir_name=str(get_dir),
+        config_box=s3_config,
+        bucket_name=bucket_name,
+    )
+    assert statuses(status_df) == {
+        **{object_name: "done" for object_name in object_names},
+        "lemurs/missing.txt": "failed",
+    }
+    for object_name in object_names:
+        assert get_dir.join(object_name).read() == os.path.basename(object_name)
+
+
+def test_sftp_remove_batch(sftp_config, known_hosts):
+    """test batch removes report done, missing and failed files"""
+    upload_dir = os.path.join(sftp_config.root_dir, sftp_config.target_dir)
+    workfiles = [os.path.basename(path) for path in write_files(upload_dir, 3)]
+    # a directory can't be removed as a file
+    os.mkdir(os.path.join(upload_dir, "lemurs"))
+
+    status_df = SFTPRemoveBatch(known_hosts=known_hosts).run(
+        workfiles=workfiles + ["missing.txt", "lemurs"], config_box=sftp_config
+    )
+
+    assert statuses(status_df) == {
+        **{workfile: "done" for workfile in workfiles},
+        "missing.txt": "missing",
+        "lemurs": "failed",
+    }
+    assert os.listdir(upload_dir) == ["lemurs"]
+
+
+def test_sftp_rename_batch_round_trip(sftp_config, known_hosts, monkeypatch):
+    """test batch renames create the target once and don't overwrite files"""
+    upload_dir = os.path.join(sftp_config.root_dir, sftp_config.target_dir)
+    workfiles = [os.path.basename(path) for path in write_files(upload_dir, 6)]
+
+    # lemur_0.txt is already done, with different content
+    os.mkdir(os.path.join(upload_dir, "done"))
+    done_path = os.path.join(upload_dir, "done", "lemur_0.txt")
+    with open(done_path, "w", encoding="utf-8") as done_file:
+        done_file.write("done before")
+
+    # pylint: disable=protected-access
+    mkdirs = []
+    mkdir = standins._SFTPServer.mkdir
+
+    def counting_mkdir(server, path, attr):
+        mkdirs.append(path)
+        return mkdir(server, path, attr)
+
+    monkeypatch.setattr(standins._SFTPServer, "mkdir", counting_mkdir)
+
+    # into a new folder, created once however many renames are in flight
+    status_df = SFTPRenameBatch(
+        target_folder="archive", max_concurrency=4, known_hosts=known_hosts
+    ).run(workfiles=workfiles[3:], config_box=sftp_config)
+    assert (status_df["Status"] == "done").all()
+    assert len(mkdirs) == 1
+    assert sorted(os.listdir(os.path.join(upload_dir, "archive"))) == workfiles[3:]
+
+    status_df = SFTPRenameBatch(target_folder="done", known_hosts=known_hosts).run(
+        workfiles=workfiles[:3] + ["missing.txt"], config_box=sftp_config
+    )
+    assert statuses(status_df) == {
+        "lemur_0.txt": "failed",
+        "lemur_1.txt": "done",
+        "lemur_2.txt": "done",
+        "missing.txt": "missing",
+    }
+    assert len(mkdirs) == 1
+    with open(done_path, encoding="utf-8") as done_file:
+        assert done_file.read() == "done before"
+    assert os.path.exists(os.path.join(upload_dir, "lemur_0.txt"))
+
+    # and back out of a source folder
+    status_df = SFTPRenameBatch(
+        source_folder="archive", target_folder=".", known_hosts=known_hosts
+    ).run(workfiles=workfiles[3:], config_box=sftp_config)
+    assert (status_df["Status"] == "done").all()
+    assert not os.listdir(os.path.join(upload_dir, "archive"))
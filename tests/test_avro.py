@@ -0,0 +1,127 @@
+""" Tests avro nuggets """
+
+import datetime
+import os
+import uuid
+
+import fastavro
+import pandas as pd
+import pyarrow as pa
+import pytest
+from cupyopt import avro_tasks
+from cupyopt.avro_tasks import AvroSchemaToArrow, AvroToArrow, AvroToDF, DFToAvro
+
+
+def test_avro_roundtrip(tmpdir):
+    """Tests avro nuggets: DFToAvro and AvroToDF, single and multi process"""
+    sample_df = pd.DataFrame(
+        {"A": range(20000), "B": [f"lemur {num}" for num in range(20000)]}
+    )
+    filepath = os.path.join(tmpdir, "sample.avro")
+
+    # small sync interval and batches so the file has many blocks to split
+    DFToAvro().run(
+        dataframe=sample_df,
+        filepath=filepath,
+        codec="deflate",
+        sync_interval=4000,
+        batch_size=5000,
+    )
+
+    single_df = AvroToDF().run(filepath=filepath)
+    multi_df = AvroToDF().run(filepath=filepath, max_workers=3)
+
+    pd.testing.assert_frame_equal(single_df, sample_df)
+    pd.testing.assert_frame_equal(multi_df, sample_df)
+
+    # more workers than blocks and a column selection
+    columns_df = AvroToDF().run(filepath=filepath, columns=["B"], max_workers=64)
+    assert list(columns_df.columns) == ["B"]
+    assert len(columns_df.index) == 20000
+
+
+def test_avro_to_arrow(tmpdir):
+    """Tests avro nuggets: AvroSchemaToArrow and AvroToArrow"""
+    avsc = {
+        "type": "record",
+        "name": "arrow_test",
+        "namespace": "cupyopt",
+        "fields": [
+            {"name": "A", "type": "long"},
+            {"name": "B", "type": ["null", "string"]},
+            {"name": "C", "type": {"type": "int", "logicalType": "date"}},
+            {"name": "D", "type": {"type": "array", "items": "double"}},
+            {
+                "name": "E",
+                "type": {
+                    "type": "enum",
+                    "name": "animal",
+                    "symbols": ["LEMUR", "TIGER"],
+                },
+            },
+            {"name": "F", "type": {"type": "string", "logicalType": "uuid"}},
+            {
+                "name": "G",
+                "type": {
+                    "type": "array",
+                    "items": {"type": "string", "logicalType": "uuid"},
+                },
+            },
+        ],
+    }
+
+    arsc = AvroSchemaToArrow().run(avsc=avsc)
+    assert arsc.field("A").type == pa.int64()
+    assert arsc.field("B").nullable
+    assert not arsc.field("A").nullable
+    assert arsc.field("C").type == pa.date32()
+    assert arsc.field("D").type == pa.list_(pa.float64())
+    assert arsc.field("F").type == pa.string()
+
+    records = [
+        {
+            "A": num,
+            "B": None if num % 3 else str(num),
+            "C": datetime.date(2020, 1, 1 + num % 28),
+            "D": [num / 2],
+            "E": "TIGER" if num % 2 else "LEMUR",
+            "F": uuid.UUID(int=num),
+            "G": [uuid.UUID(int=num + 1)],
+        }
+        for num in range(5000)
+    ]
+    filepath = os.path.join(tmpdir, "sample.avro")
+    with open(filepath, "wb") as avro_file:
+        fastavro.writer(avro_file, avsc, records, sync_interval=2000)
+
+    table = AvroToArrow().run(filepath=filepath)
+    assert table.schema.equals(arsc)
+    # uuids are read as strings
+    assert table.to_pydict() == dict(
+        {name: [record[name] for record in records] for name in "ABCDE"},
+        F=[str(record["F"]) for record in records],
+        G=[[str(record["G"][0])] for record in records],
+    )
+
+    multi_table = AvroToArrow().run(
+        filepath=filepath, columns=["A", "E", "F"], max_workers=3
+    )
+    assert multi_table.schema.names == ["A", "E", "F"]
+    assert multi_table.to_pydict()["A"] == list(range(5000))
+    assert multi_table.to_pydict()["F"] == table.to_pydict()["F"]
+
+
+def test_avro_write_errors(tmpdir, monkeypatch):
+    """Tests avro nuggets: DFToAvro refuses empty streams and missing codecs"""
+    filepath = os.path.join(tmpdir, "sample.avro")
+
+    with pytest.raises(ValueError, match="No dataframes"):
+        DFToAvro().run(dataframe=[], filepath=filepath)
+
+    monkeypatch.setattr(avro_tasks, "find_spec", lambda module: None)
+    with pytest.raises(ValueError, match="python-snappy"):
+        DFToAvro().run(
+            dataframe=pd.DataFrame({"A": [1]}), filepath=filepath, codec="snappy"
+        )
+
+    assert not os.path.exists(filepath)
@@ -0,0 +1,191 @@
+""" Tests streaming compression and extraction """
+
+import gzip
+import io
+import os
+import tarfile
+import zipfile
+
+import pandas as pd
+import pytest
+from cupyopt.compression import (
+    GzipReader,
+    extract,
+    infer_compression,
+    open_decompressed,
+    strip_suffix,
+)
+from cupyopt.objectstore_tasks import ObjstrFGet, ObjstrFPut, ObjstrGetAsDF
+from cupyopt.sftp_tasks import SFTPGet, SFTPPut
+
+CSV = b"animal,count\n" + b"lemur,3\ntiger,1\n" * 1000
+
+
+def tar_gz(members: dict) -> bytes:
+    """tar.gz archive of members, {name: data}"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_infer_compression():
+    """Tests compression formats are inferred from file names"""
+    assert infer_compression("drop.TAR.GZ") == "tar"
+    assert infer_compression("drop.csv.gz") == "gzip"
+    assert infer_compression("drop.zip") == "zip"
+    assert infer_compression("drop.csv") is None
+    assert infer_compression("drop.csv", "gzip") == "gzip"
+    assert strip_suffix("cache/drop.tgz", "tar") == "cache/drop"
+
+    with pytest.raises(ValueError):
+        infer_compression("drop.csv", "bz2")
+
+
+def test_gzip_round_trip(tmp_path):
+    """Tests GzipReader output decompresses back to its input"""
+    compressed = GzipReader(io.BytesIO(CSV), chunk_size=1000).read()
+    assert gzip.decompress(compressed) == CSV
+
+    extract(io.BytesIO(compressed), "gzip", str(tmp_path / "drop.csv"))
+    assert (tmp_path / "drop.csv").read_bytes() == CSV
+
+    with open_decompressed(io.BytesIO(compressed), "gzip") as data:
+        frame = pd.read_csv(data)
+    assert len(frame.index) == 2000
+
+
+def test_extract_archives(tmp_path):
+    """Tests tar.gz and zip archives are extracted and read from their first file"""
+    archive = tar_gz({"drop/a.csv": CSV, "drop/b.csv": b"x"})
+    extract(io.BytesIO(archive), "tar", str(tmp_path / "tar"))
+    assert (tmp_path / "tar" / "drop" / "a.csv").read_bytes() == CSV
+    with open_decompressed(io.BytesIO(archive), "tar") as data:
+        assert data.read() == CSV
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zip_archive:
+        zip_archive.writestr("a.csv", CSV)
+    extract(buffer, "zip", str(tmp_path / "zip"))
+    assert os.listdir(tmp_path / "zip") == ["a.csv"]
+    with open_decompressed(buffer, "zip") as data:
+        assert data.read() == CSV
+    assert data.closed
+    assert not buffer.closed
+
+    with pytest.raises(ValueError):
+        extract(io.BytesIO(tar_gz({"../escape.csv": b"x"})), "tar", str(tmp_path / "t"))
+    assert not (tmp_path / "escape.csv").exists()
+
+    extract(
+        io.BytesIO(zip_bytes({"drop/": b"", "drop/a.csv": CSV})),
+        "zip",
+        str(tmp_path / "z"),
+    )
+    assert (tmp_path / "z" / "drop" / "a.csv").read_bytes() == CSV
+    with pytest.raises(ValueError):
+        extract(
+            io.BytesIO(zip_bytes({"../escape.csv": b"x"})), "zip", str(tmp_path / "z")
+        )
+    assert not (tmp_path / "escape.csv").exists()
+
+
+def zip_bytes(members: dict) -> bytes:
+    """zip archive of members, {name: data}"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_sftp_compression(sftp_config, cnopts, tmp_path):
+    """Tests SFTPPut compresses and SFTPGet decompresses against an sftp server"""
+    local_path = tmp_path / "drop.csv"
+    local_path.write_bytes(CSV)
+    remote_dir = os.path.join(sftp_config.root_dir, sftp_config.target_dir)
+
+    SFTPPut().run(str(local_path), sftp_config, cnopts=cnopts, compress="gzip")
+    with open(os.path.join(remote_dir, "drop.csv.gz"), "rb") as remote_file:
+        assert gzip.decompress(remote_file.read()) == CSV
+
+    get_dir = tmp_path / "get"
+    get_dir.mkdir()
+    fetched = SFTPGet().run(
+        "drop.csv.gz",
+        sftp_config,
+        cnopts=cnopts,
+        tempfolderpath=str(get_dir),
+        decompress="infer",
+    )
+    assert fetched == str(get_dir / "drop.csv")
+    assert (get_dir / "drop.csv").read_bytes() == CSV
+
+    with open(os.path.join(remote_dir, "drop.tar.gz"), "wb") as remote_file:
+        remote_file.write(tar_gz({"drop/a.csv": CSV}))
+    fetched = SFTPGet().run(
+        "drop.tar.gz",
+        sftp_config,
+        cnopts=cnopts,
+        tempfolderpath=str(get_dir),
+        decompress="infer",
+    )
+    assert (get_dir / "drop" / "drop" / "a.csv").read_bytes() == CSV
+
+
+def test_objstr_compression(s3_client, bucket_name, tmp_path):
+    """Tests object store tasks compress and decompress against an s3 server"""
+    local_path = tmp_path / "drop.csv"
+    local_path.write_bytes(CSV)
+
+    object_name = ObjstrFPut().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        file_path=str(local_path),
+        compress="gzip",
+    )
+    assert object_name == "drop.csv.gz"
+
+    fetched = ObjstrFGet().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        object_name=object_name,
+        file_path=str(tmp_path / "fetched.csv"),
+        decompress="infer",
+    )
+    assert (tmp_path / "fetched.csv").read_bytes() == CSV
+    assert fetched == str(tmp_path / "fetched.csv")
+
+    frame = ObjstrGetAsDF().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        object_name=object_name,
+        dftype="csv",
+        decompress="infer",
+    )
+    assert len(frame.index) == 2000
+
+    # zip archives are read through byte ranges of the object
+    archive = zip_bytes({"drop/a.csv": CSV})
+    s3_client.put_object(bucket_name, "drop.zip", io.BytesIO(archive), len(archive))
+
+    frame = ObjstrGetAsDF().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        object_name="drop.zip",
+        dftype="csv",
+        decompress="infer",
+    )
+    assert frame["animal"].tolist()[:2] == ["lemur", "tiger"]
+
+    ObjstrFGet().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        object_name="drop.zip",
+        file_path=str(tmp_path / "extracted"),
+        decompress="infer",
+    )
+    assert (tmp_path / "extracted" / "drop" / "a.csv").read_bytes() == CSV
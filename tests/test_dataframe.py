@@ -1,7 +1,15 @@
 """ Tests dataframe nuggets """
 
+import os
+
+import fastavro
+import numpy as np
 import pandas as pd
-from cupyopt.dataframe_tasks import DFColumnUpdate
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import feather
+import pytest
+from cupyopt.dataframe_tasks import DFColumnUpdate, DFExport, DFTransform
 
 # pylint: disable=duplicate-code
 
@@ -19,3 +27,174 @@ def test_dfcolumnupdate():
 
     # test whether we have a single filtered and renamed column remaining in new df
     assert list(new_df.columns) == ["tiger"]
+
+
+def test_dfexport_parquet_dataset(tmpdir):
+    """Tests dataframe nugget: DFExport parquet dataset"""
+    sample_df = pd.DataFrame(
+        {"year": [2020, 2020, 2021, 2021], "A": [1, 2, 3, 4], "B": ["w", "x", "y", "z"]}
+    )
+
+    filepath = DFExport().run(
+        sample_df,
+        export_type="parquet",
+        df_name="sample",
+        dir_name=str(tmpdir),
+        index=False,
+        dataset=True,
+        partition_cols=["year"],
+        max_rows_per_file=1,
+        compression="zstd",
+    )
+
+    # test whether we have a hive-partitioned directory per year, a file per row
+    assert sorted(os.listdir(filepath)) == ["year=2020", "year=2021"]
+    assert len(os.listdir(os.path.join(filepath, "year=2020"))) == 2
+
+    dataset = ds.dataset(filepath, format="parquet", partitioning="hive")
+    assert dataset.to_table(filter=ds.field("year") == 2021).num_rows == 2
+
+
+def test_dfexport_csv_arrow(tmpdir):
+    """Tests dataframe nugget: DFExport arrow csv from a stream of frames"""
+    sample_df = pd.DataFrame({"A": [1, 2, 3], "B": ["x", "y", "z"]})
+
+    filepath = DFExport().run(
+        [sample_df, sample_df],
+        export_type="csv",
+        df_name="sample",
+        dir_name=str(tmpdir),
+        index=False,
+        csv_engine="arrow",
+        compression="gzip",
+    )
+
+    # test whether both chunks landed in the one compressed file under one header
+    result_df = pd.read_csv(filepath, compression="gzip")
+    assert list(result_df.columns) == ["A", "B"]
+    assert len(result_df.index) == 6
+
+
+def test_dfexport_feather_avro(tmpdir):
+    """Tests dataframe nugget: DFExport feather and avro"""
+    sample_df = pd.DataFrame({"A": [1, 2, None], "B": ["x", None, "z"]})
+
+    filepath = DFExport().run(
+        sample_df, export_type="feather", df_name="sample", dir_name=str(tmpdir)
+    )
+    table = feather.read_table(filepath, memory_map=True)
+    assert table.num_rows == 3
+
+    filepath = DFExport().run(
+        [sample_df, sample_df],
+        export_type="avro",
+        df_name="sample",
+        dir_name=str(tmpdir),
+        compression="deflate",
+    )
+    with open(filepath, "rb") as avro_file:
+        records = list(fastavro.reader(avro_file))
+    assert len(records) == 6
+    assert records[1]["B"] is None
+
+    with pytest.raises(ValueError):
+        DFExport().run(sample_df, export_type="xml", df_name="sample")
+
+
+@pytest.mark.parametrize(
+    "export_type, csv_engine",
+    [
+        ("csv", "pandas"),
+        ("csv", "arrow"),
+        ("parquet", "pandas"),
+        ("feather", "pandas"),
+        ("avro", "pandas"),
+    ],
+)
+def test_dfexport_empty(tmpdir, export_type, csv_engine):
+    """Tests dataframe nugget: DFExport refuses empty iterables"""
+    with pytest.raises(ValueError, match="No dataframes"):
+        DFExport().run(
+            iter([]),
+            export_type=export_type,
+            df_name="empty",
+            dir_name=str(tmpdir),
+            csv_engine=csv_engine,
+        )
+    assert not os.listdir(tmpdir)
+
+
+def test_dfcolumnupdate_no_copy():
+    """Tests dataframe nugget: DFColumnUpdate without copies and on arrow tables"""
+    sample_df = pd.DataFrame({"A": [1, 2, 3], "B": [4, 5, 6], "C": [7, 8, 9]})
+
+    new_df = DFColumnUpdate().run(
+        sample_df, drop=["B"], copy=False, dtypes={"C": "float64"}
+    )
+
+    # test whether uncast columns share the original data
+    assert list(new_df.columns) == ["A", "C"]
+    assert str(new_df["C"].dtype) == "float64"
+    assert np.shares_memory(new_df["A"].to_numpy(), sample_df["A"].to_numpy())
+
+    new_table = DFColumnUpdate().run(
+        pa.Table.from_pandas(sample_df, preserve_index=False),
+        coldict={"A": "tiger", "C": "lion"},
+        dtypes={"lion": "int32"},
+    )
+
+    assert new_table.column_names == ["tiger", "lion"]
+    assert new_table.schema.field("lion").type == pa.int32()
+
+
+def test_dftransform():
+    """Tests dataframe nugget: DFTransform"""
+    sample_df = pd.DataFrame(
+        {"A": [1, 2, 2, 3, None], "B": [" x", "y ", "y ", "z", "w"]}
+    )
+
+    steps = [
+        {"op": "rename", "columns": {"A": "tiger"}},
+        {"op": "trim"},
+        {"op": "filter", "conditions": [{"column": "tiger", "op": "notnull"}]},
+        {"op": "cast", "columns": {"tiger": "int64"}},
+        {"op": "dedupe"},
+        {"op": "derive", "name": "C", "func": "multiply", "args": ["tiger", 10]},
+        {"op": "filter", "conditions": [{"column": "C", "op": ">=", "value": 20}]},
+    ]
+
+    new_df = DFTransform().run(sample_df, steps=steps)
+
+    assert list(new_df.columns) == ["tiger", "B", "C"]
+    assert list(new_df["B"]) == ["y", "z"]
+    assert list(new_df["C"]) == [20, 30]
+
+    with pytest.raises(ValueError):
+        DFTransform().run(sample_df, steps=[{"op": "pivot"}])
+
+
+def test_lazy_dataset(tmpdir):
+    """Tests dataframe nuggets with an arrow dataset read batch by batch"""
+    sample_df = pd.DataFrame({"A": range(100), "B": [str(val) for val in range(100)]})
+    sample_df.to_parquet(f"{tmpdir}/sample.parquet", index=False)
+    dataset = ds.dataset(f"{tmpdir}/sample.parquet")
+
+    reader = DFColumnUpdate().run(
+        dataset, coldict={"A": "tiger"}, dtypes={"tiger": "int32"}
+    )
+    assert reader.schema.names == ["tiger"]
+
+    for export_type in ["parquet", "csv", "feather", "avro"]:
+        filepath = DFExport().run(
+            DFColumnUpdate().run(dataset, coldict={"A": "tiger"}),
+            export_type=export_type,
+            df_name="lazy",
+            dir_name=str(tmpdir),
+            index=False,
+            batch_size=10,
+        )
+        assert os.path.isfile(filepath)
+
+    result_df = pd.read_csv(f"{tmpdir}/lazy.csv")
+    assert list(result_df.columns) == ["tiger"]
+    assert len(result_df.index) == 100
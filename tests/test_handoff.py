@@ -0,0 +1,72 @@
+""" Tests memory-mapped handoff of task results """
+
+import pickle
+
+import pandas as pd
+import pyarrow as pa
+from prefect import Flow
+from cupyopt.dataframe_tasks import DFColumnUpdate, DFExport
+from cupyopt.handoff import ArrowHandoff, to_handoff
+from cupyopt.sftp_tasks import DFGetOldestFile
+
+
+def test_handoff(tmpdir):
+    """Tests results handed off between tasks through arrow IPC files"""
+    files_df = pd.DataFrame(
+        {
+            "name": ["b.csv", "a.csv"],
+            "mtime": pd.to_datetime(["2021-02-01", "2021-01-01"]),
+        }
+    )
+
+    update = DFColumnUpdate(handoff=True, handoff_dir=str(tmpdir))
+    with Flow("handoff") as flow:
+        updated = update(files_df, {"name": "File Name", "mtime": "MTime"})
+        oldest = DFGetOldestFile()(updated, regex_search=None)
+        exported = DFExport()(
+            updated,
+            export_type="csv",
+            df_name="files",
+            dir_name=str(tmpdir),
+            index=False,
+        )
+
+    state = flow.run()
+
+    handoff = state.result[updated].result
+    assert isinstance(handoff, ArrowHandoff)
+    assert handoff.num_rows == 2
+    assert len(pickle.dumps(handoff)) < 500
+
+    # arrow tasks get the mapped table, others the dataframe originally returned
+    assert isinstance(handoff.load(arrow=True), pa.Table)
+    assert state.result[oldest].result == "a.csv"
+    assert pd.read_csv(state.result[exported].result)["File Name"].tolist() == [
+        "b.csv",
+        "a.csv",
+    ]
+
+    handoff.remove()
+    assert not tmpdir.join(handoff.path).exists()
+
+
+def test_handoff_index(tmpdir):
+    """Tests the index of a filtered dataframe isn't handed to arrow tasks"""
+    animals_df = pd.DataFrame(
+        {"animal": ["lemur", "tiger", "bear"], "count": [3, 1, 2]}
+    )
+    filtered_df = animals_df[animals_df["count"] > 1]
+
+    handoff = to_handoff(filtered_df, str(tmpdir))
+
+    assert handoff.load(arrow=True).schema.names == ["animal", "count"]
+    pd.testing.assert_frame_equal(handoff.load(), filtered_df)
+
+    exported = DFExport().run(
+        handoff,
+        export_type="csv",
+        df_name="animals",
+        dir_name=str(tmpdir),
+        index=False,
+    )
+    assert pd.read_csv(exported).columns.tolist() == ["animal", "count"]
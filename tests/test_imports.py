@@ -0,0 +1,39 @@
+""" Tests lazy imports of cupyopt """
+
+import os
+import subprocess
+import sys
+
+import pytest
+import cupyopt
+
+
+def imported_modules(statement: str) -> list:
+    """heavy dependencies imported by running statement in a fresh interpreter"""
+    src_dir = os.path.dirname(os.path.dirname(cupyopt.__file__))
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"{statement}\nimport sys\n"
+            "print(' '.join(name for name in ('pandas', 'pyarrow', 'fastavro',"
+            " 'pysftp', 'sqlalchemy') if name in sys.modules))",
+        ],
+        env={**os.environ, "PYTHONPATH": src_dir},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return result.stdout.split()
+
+
+def test_lazy_imports():
+    """Tests task modules are only imported when their names are used"""
+    assert not imported_modules("import cupyopt")
+    assert not imported_modules("from cupyopt import ObjstrFPut")
+    assert "pysftp" in imported_modules("from cupyopt import SFTPGet")
+
+    assert cupyopt.DFExport.__module__ == "cupyopt.dataframe_tasks"
+    assert "DFExport" in dir(cupyopt)
+    with pytest.raises(AttributeError):
+        cupyopt.NotATask  # pylint: disable=pointless-statement
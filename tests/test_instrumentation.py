@@ -0,0 +1,100 @@
+""" Tests task instrumentation """
+
+import json
+import os
+
+import pandas as pd
+import pytest
+from cupyopt.dataframe_tasks import DFColumnUpdate
+from cupyopt.instrumentation import InstrumentedTask, configure_metrics, measure
+
+# pylint: disable=arguments-differ
+
+
+class ConnectingTask(InstrumentedTask):
+    """Task which records a connect time"""
+
+    def run(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        with measure("connect_seconds"):
+            pass
+        return dataframe.head(1)
+
+
+class OuterTask(InstrumentedTask):
+    """Task which runs another task inside its run"""
+
+    def run(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        return ConnectingTask().run(dataframe)
+
+
+class FailingTask(InstrumentedTask):
+    """Task which fails"""
+
+    def run(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        raise KeyError("tiger")
+
+
+def test_instrumentation(tmpdir):
+    """Tests instrumentation: metrics sinks"""
+    jsonl_path = os.path.join(tmpdir, "metrics.jsonl")
+    prometheus_path = os.path.join(tmpdir, "metrics.prom")
+    configure_metrics(jsonl_path=jsonl_path, prometheus_path=prometheus_path)
+
+    sample_df = pd.DataFrame({"A": [1, 2, 3], "B": [4, 5, 6]})
+    try:
+        DFColumnUpdate().run(sample_df, {"A": "tiger"})
+        ConnectingTask().run(sample_df)
+    finally:
+        configure_metrics()
+
+    with open(jsonl_path, encoding="utf-8") as jsonl_file:
+        records = [json.loads(line) for line in jsonl_file]
+
+    assert [record["task"] for record in records] == [
+        "DFColumnUpdate",
+        "ConnectingTask",
+    ]
+    assert records[0]["rows_in"] == 3
+    assert records[0]["rows_out"] == 3
+    assert records[0]["bytes_in"] > 0
+    assert records[1]["rows_out"] == 1
+    assert "connect_seconds" in records[1]
+    assert records[1]["wall_seconds"] >= records[1]["connect_seconds"]
+
+    with open(prometheus_path, encoding="utf-8") as prometheus_file:
+        prometheus = prometheus_file.read()
+
+    assert 'cupyopt_task_runs_total{task="ConnectingTask"} 1.0' in prometheus
+    assert "cupyopt_process_peak_rss_bytes" in prometheus
+
+
+def test_instrumentation_nested(tmpdir):
+    """Tests instrumentation: tasks run inside a task's run add to its metrics"""
+    jsonl_path = os.path.join(tmpdir, "metrics.jsonl")
+    configure_metrics(jsonl_path=jsonl_path)
+
+    try:
+        OuterTask().run(pd.DataFrame({"A": [1, 2, 3]}))
+    finally:
+        configure_metrics()
+
+    with open(jsonl_path, encoding="utf-8") as jsonl_file:
+        records = [json.loads(line) for line in jsonl_file]
+
+    assert [record["task"] for record in records] == ["OuterTask"]
+    assert "connect_seconds" in records[0]
+    assert records[0]["rows_out"] == 1
+
+
+def test_instrumentation_failing_sink(tmpdir):
+    """Tests instrumentation: failing sinks don't fail or hide task results"""
+    # a directory can't be opened to append metrics to
+    configure_metrics(jsonl_path=str(tmpdir))
+
+    sample_df = pd.DataFrame({"A": [1, 2, 3]})
+    try:
+        assert len(ConnectingTask().run(sample_df).index) == 1
+        with pytest.raises(KeyError, match="tiger"):
+            FailingTask().run(sample_df)
+    finally:
+        configure_metrics()
@@ -1,5 +1,6 @@
 """ Tests objectstore nuggets """
 
+import io
 import logging
 import tempfile
 
@@ -9,12 +10,15 @@ from box import Box
 from minio import Minio
 from cupyopt.objectstore_tasks import (
     ObjstrClient,
+    ObjstrCompose,
+    ObjstrCopy,
     ObjstrFGet,
     ObjstrFPut,
     ObjstrGet,
     ObjstrGetAsDF,
     ObjstrMakeBucket,
     ObjstrPut,
+    ObjstrSync,
 )
 
 logger = logging.getLogger(__name__)
@@ -122,3 +126,170 @@ def test_fget(objstr_client):
             object_name="object",
             file_path="temp.txt",
         )
+
+
+def test_copy(objstr_client):
+    """test copy"""
+    with pytest.raises(urllib3.exceptions.MaxRetryError):
+        ObjstrCopy().run(
+            client=objstr_client,
+            bucket_name="bucket",
+            object_names=["object1", "object2"],
+            target_prefix="archive/",
+        )
+
+    with pytest.raises(ValueError):
+        ObjstrCopy().run(
+            client=objstr_client,
+            bucket_name="bucket",
+            object_names=["object1", "object2"],
+            target_object_names=["object3"],
+        )
+
+    # copying objects onto themselves
+    with pytest.raises(ValueError):
+        ObjstrCopy().run(
+            client=objstr_client, bucket_name="bucket", object_names="object1"
+        )
+
+
+def test_copy_round_trip(s3_client, bucket_name):
+    """test copy within and between buckets against an s3 server"""
+    for object_name in ["object1", "object2"]:
+        ObjstrPut().run(
+            client=s3_client,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            data=io.BytesIO(object_name.encode("utf-8")),
+            length=len(object_name),
+        )
+
+    assert ObjstrCopy().run(
+        client=s3_client,
+        bucket_name=bucket_name,
+        object_names=["object1", "object2"],
+        target_prefix="archive/",
+    ) == ["archive/object1", "archive/object2"]
+
+    s3_client.make_bucket("copies")
+    assert (
+        ObjstrCopy().run(
+            client=s3_client,
+            bucket_name=bucket_name,
+            object_names="object1",
+            target_bucket_name="copies",
+        )
+        == "object1"
+    )
+
+    for target_bucket_name, object_name, data in [
+        (bucket_name, "archive/object1", b"object1"),
+        (bucket_name, "archive/object2", b"object2"),
+        ("copies", "object1", b"object1"),
+    ]:
+        response = s3_client.get_object(target_bucket_name, object_name)
+        assert response.read() == data
+        response.close()
+        response.release_conn()
+
+
+def test_compose(objstr_client):
+    """test compose"""
+    with pytest.raises(urllib3.exceptions.MaxRetryError):
+        ObjstrCompose().run(
+            client=objstr_client,
+            bucket_name="bucket",
+            object_name="object",
+            source_object_names=["part1", "part2"],
+        )
+
+
+def test_compose_round_trip(s3_client, bucket_name):
+    """test compose concatenates objects in order against an s3 server"""
+    # all but the last part must be at least 5MiB
+    parts = {"part1": b"a" * 5 * 1024 * 1024, "part2": b"bc"}
+    for object_name, data in parts.items():
+        ObjstrPut().run(
+            client=s3_client,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            data=io.BytesIO(data),
+            length=len(data),
+        )
+
+    assert (
+        ObjstrCompose().run(
+            client=s3_client,
+            bucket_name=bucket_name,
+            object_name="composed",
+            source_object_names=["part1", "part2"],
+        )
+        == "composed"
+    )
+
+    response = s3_client.get_object(bucket_name, "composed")
+    assert response.read() == parts["part1"] + parts["part2"]
+    response.close()
+    response.release_conn()
+
+
+def test_sync(objstr_client, tmpdir):
+    """test sync"""
+    with open(f"{tmpdir}/file.txt", "w", encoding="utf-8") as open_file:
+        open_file.write("some data")
+
+    with pytest.raises(urllib3.exceptions.MaxRetryError):
+        ObjstrSync().run(
+            client=objstr_client,
+            bucket_name="bucket",
+            dir_name=str(tmpdir),
+            prefix="extracts/",
+        )
+
+    with pytest.raises(ValueError):
+        ObjstrSync().run(
+            client=objstr_client,
+            bucket_name="bucket",
+            dir_name=str(tmpdir),
+            direction="sideways",
+        )
+
+
+def test_sync_round_trip(s3_client, bucket_name, tmpdir):
+    """test sync puts, skips unchanged files and deletes against an s3 server"""
+    local_dir = tmpdir.mkdir("local")
+    local_dir.join("a.csv").write("a,b\n1,2\n")
+    local_dir.mkdir("sub").join("b.csv").write("c\n3\n")
+
+    def sync(**kwargs):
+        actions = ObjstrSync().run(
+            client=s3_client, bucket_name=bucket_name, prefix="extracts", **kwargs
+        )
+        return dict(zip(actions["File Name"], actions["Action"]))
+
+    # a prefix without a trailing "/" is treated as a folder
+    assert sync(dir_name=str(local_dir)) == {
+        "a.csv": "transferred",
+        "sub/b.csv": "transferred",
+    }
+    assert sorted(
+        obj.object_name
+        for obj in s3_client.list_objects(
+            bucket_name, prefix="extracts/", recursive=True
+        )
+    ) == ["extracts/a.csv", "extracts/sub/b.csv"]
+
+    assert sync(dir_name=str(local_dir), delete=True) == {
+        "a.csv": "unchanged",
+        "sub/b.csv": "unchanged",
+    }
+
+    local_dir.join("a.csv").remove()
+    assert sync(dir_name=str(local_dir), delete=True) == {
+        "sub/b.csv": "unchanged",
+        "a.csv": "deleted",
+    }
+
+    get_dir = tmpdir.mkdir("get")
+    assert sync(dir_name=str(get_dir), direction="get") == {"sub/b.csv": "transferred"}
+    assert get_dir.join("sub", "b.csv").read() == "c\n3\n"
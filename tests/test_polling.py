@@ -0,0 +1,68 @@
+""" Tests adaptive polling for file arrivals """
+
+from cupyopt import polling
+
+
+def test_wait_for_files(monkeypatch):
+    """Tests back-off, regex, min_count and quiescence when waiting on files"""
+    clock = {"now": 0.0}
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr(polling.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(polling.time, "sleep", sleep)
+
+    # a.csv lands at 10s and is still growing at 12s, b.csv lands at 12s
+    def list_files():
+        files = {"notes.txt": (0, 1)}
+        if clock["now"] >= 10:
+            files["a.csv"] = (10, 1 if clock["now"] < 12 else 2)
+        if clock["now"] >= 12:
+            files["b.csv"] = (12, 1)
+        return files
+
+    ready = polling.wait_for_files(
+        list_files,
+        regex_search=r"\.csv$",
+        min_count=2,
+        quiescence=3,
+        poll_interval=1,
+        max_interval=4,
+    )
+
+    assert ready == {"a.csv": 10, "b.csv": 12}
+    # idle back-off, reset on arrival, then wait out the quiescence window
+    assert sleeps == [2, 4, 4, 1, 2, 1, 2]
+
+    clock["now"] = 0.0
+    assert not polling.wait_for_files(dict, poll_interval=1, timeout=5)
+    assert clock["now"] == 5
+
+
+def test_wait_for_files_settled(monkeypatch):
+    """Tests files which already settled don't stop the back-off"""
+    clock = {"now": 0.0}
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr(polling.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(polling.time, "sleep", sleep)
+
+    # a.csv settles at 3s, the second file never arrives
+    ready = polling.wait_for_files(
+        lambda: {"a.csv": (0, 1)},
+        min_count=2,
+        quiescence=3,
+        poll_interval=1,
+        max_interval=4,
+        timeout=20,
+    )
+
+    assert not ready
+    assert sleeps == [1, 2, 4, 4, 4, 4, 1]
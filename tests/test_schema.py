@@ -1,10 +1,17 @@
 """ Tests schema nuggets """
+import datetime
+import decimal
+import io
 import json
+import logging
 import os
 
 import pandas as pd
 import pyarrow as pa
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
+import pytest
+from box import Box
 from cupyopt.schema_tasks import (
     ArrowSchemaFromParquet,
     AvroSchema,
@@ -14,6 +21,7 @@ from cupyopt.schema_tasks import (
     ArrowSchemaToParquet,
     DFValidateSchemaAvro,
     DFValidateSchemaArrow,
+    _sample_frames,
 )
 
 # create a test dataframe
@@ -117,3 +125,337 @@ def test_df_arrow_validate():
     arsc = DFInferArrowSchema().run(sample_df)
 
     assert DFValidateSchemaArrow().run(sample_df, arsc)
+
+
+def test_lazy_dataset_schema(tmpdir):
+    """Tests schema tasks with an arrow dataset read batch by batch"""
+    sample_df.to_parquet(f"{tmpdir}/sample.parquet")
+    dataset = ds.dataset(f"{tmpdir}/sample.parquet")
+
+    arsc = DFInferArrowSchema().run(dataset)
+    assert arsc.names == ["C", "D", "E"]
+    assert DFValidateSchemaArrow().run(dataset, arsc)
+
+    avsc = DFInferAvroSchema().run(dataset)
+    assert [field["name"] for field in avsc["fields"]] == ["C", "D", "E"]
+    assert DFValidateSchemaAvro().run(dataframe=dataset, avsc=sample_avsc_dict)
+
+
+def test_df_avro_validate_columns():
+    """Tests column-wise avro validation"""
+    sample_df3 = pd.DataFrame(
+        {
+            "A": [1, 2, 2**40],
+            "B": [4.4, None, 6.6],
+            "C": ["Lions", 7, "Bears"],
+            "D": [[1], [2, 3], ["x"]],
+        }
+    )
+
+    sample_avsc_dict3 = {
+        "type": "record",
+        "name": "validation_test",
+        "fields": [
+            {"name": "A", "type": "int"},
+            {"name": "B", "type": "double"},
+            {"name": "C", "type": ["null", "string"]},
+            {"name": "D", "type": {"type": "array", "items": "long"}},
+        ],
+    }
+
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df3, avsc=sample_avsc_dict3, engine="columns"
+    )
+    assert list(zip(report["Row"], report["Field"])) == [
+        (2, "A"),
+        (1, "B"),
+        (1, "C"),
+        (2, "D"),
+    ]
+
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df, avsc=sample_avsc_dict, engine="columns"
+    )
+    assert report.empty
+
+
+def test_df_avro_validate_logical_types():
+    """Tests column-wise avro validation of logical type values"""
+    sample_df4 = pd.DataFrame(
+        {
+            "day": [datetime.date(2021, 1, 1), 18628, "2021-01-03"],
+            "at": [datetime.time(9, 30), datetime.time(17), 3600000],
+            "amount": [decimal.Decimal("1.25"), decimal.Decimal("2.50"), 3.75],
+        }
+    )
+
+    sample_avsc_dict4 = {
+        "type": "record",
+        "name": "logical_test",
+        "fields": [
+            {"name": "day", "type": {"type": "int", "logicalType": "date"}},
+            {"name": "at", "type": {"type": "int", "logicalType": "time-millis"}},
+            {
+                "name": "amount",
+                "type": {
+                    "type": "bytes",
+                    "logicalType": "decimal",
+                    "precision": 9,
+                    "scale": 2,
+                },
+            },
+        ],
+    }
+
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df4, avsc=sample_avsc_dict4, engine="columns"
+    )
+    assert list(zip(report["Row"], report["Field"], report["Reason"])) == [
+        (2, "day", "not a int"),
+        (2, "amount", "not a bytes"),
+    ]
+
+    # fastavro agrees with the valid rows
+    assert DFValidateSchemaAvro().run(
+        dataframe=sample_df4.iloc[:2], avsc=sample_avsc_dict4
+    )
+
+
+def test_df_avro_validate_strategies():
+    """Tests avro validation strategies"""
+    sample_df4 = pd.DataFrame(
+        {"A": list(range(100)), "B": ["x", "y"] * 50, "C": [1.0] * 99 + [None]}
+    )
+
+    sample_avsc_dict4 = {
+        "type": "record",
+        "name": "validation_test",
+        "fields": [
+            {"name": "A", "type": "long"},
+            {"name": "B", "type": "string"},
+            {"name": "C", "type": "double"},
+        ],
+    }
+
+    # the only null is in the last row, which head and samples may not reach
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df4,
+        avsc=sample_avsc_dict4,
+        engine="columns",
+        strategy="head",
+        sample_size=10,
+    )
+    assert report.empty
+
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df4.iloc[:99],
+        avsc=sample_avsc_dict4,
+        engine="columns",
+        strategy="stratified",
+        stratify_by="B",
+        sample_size=0.2,
+    )
+    assert report.empty
+
+    report = DFValidateSchemaAvro().run(
+        dataframe=sample_df4,
+        avsc=sample_avsc_dict4,
+        engine="columns",
+        strategy="chunked",
+        chunk_size=10,
+        max_workers=2,
+    )
+    assert list(report["Row"]) == [99]
+
+
+def test_sample_frames_lazy():
+    """Tests sampling a record batch reader across its batches"""
+    table = pa.Table.from_pandas(pd.DataFrame({"A": list(range(100))}))
+
+    def reader():
+        return pa.RecordBatchReader.from_batches(
+            table.schema, table.to_batches(max_chunksize=10)
+        )
+
+    frames = list(_sample_frames(reader(), "sample", 15, random_state=1))
+    sampled = pd.concat(frames)
+    assert len(sampled.index) == 15
+    assert sampled["A"].is_monotonic_increasing
+    assert sampled["A"].max() >= 10
+
+    again = pd.concat(_sample_frames(reader(), "sample", 15, random_state=1))
+    assert list(again["A"]) == list(sampled["A"])
+
+    frames = list(_sample_frames(reader(), "head", 25))
+    assert sum(len(frame.index) for frame in frames) == 25
+
+    with pytest.raises(ValueError):
+        list(_sample_frames(reader(), "head", 0.5))
+
+
+def test_sample_frames_stratified_lazy():
+    """Tests stratified sampling caps the rows across batches, not per batch"""
+    table = pa.Table.from_pandas(
+        pd.DataFrame({"A": list(range(100)), "B": ["x"] * 80 + [None] * 20})
+    )
+    reader = pa.RecordBatchReader.from_batches(
+        table.schema, table.to_batches(max_chunksize=10)
+    )
+
+    sampled = pd.concat(
+        _sample_frames(reader, "stratified", 20, stratify_by="B", random_state=1)
+    )
+    assert len(sampled.index) == 20
+    assert sampled["A"].is_monotonic_increasing
+    # each group in proportion to its rows, drawn from all of its batches
+    assert sampled["B"].isna().sum() == 4
+    assert sampled["A"].iloc[:16].max() >= 10
+
+
+def test_df_arrow_validate_dtypes():
+    """Tests arrow validation from dtypes"""
+    sample_df5 = pd.DataFrame(
+        {
+            "A": pd.Series([1, 2, 3], dtype="int32"),
+            "B": [4.4, 5.5, 6.6],
+            "C": ["Lions", "Tigers", "Bears"],
+            "D": [True, False, True],
+            "F": [None, None, None],
+            "G": [1, "2", 3.0],
+        }
+    )
+
+    arsc = pa.schema(
+        [
+            pa.field("A", pa.int64()),
+            pa.field("B", pa.float64(), nullable=False),
+            pa.field("C", pa.string()),
+            pa.field("E", pa.string()),
+            pa.field("F", pa.string()),
+            pa.field("G", pa.string()),
+        ]
+    )
+
+    # object columns are typed from their values, empty ones aren't checked
+    diff = DFValidateSchemaArrow().run(sample_df5, arsc, mode="dtypes")
+    assert dict(zip(diff["Field"], diff["Status"])) == {
+        "B": "nullability",
+        "D": "unexpected",
+        "E": "missing",
+        "G": "type mismatch",
+    }
+
+    # columns with a leading null and with more values than the sample size
+    object_df = pd.DataFrame({"H": [None, "Lions", "Bears"], "I": ["Tigers"] * 3})
+    diff = DFValidateSchemaArrow(sample_size=2).run(
+        object_df,
+        pa.schema([pa.field("H", pa.string()), pa.field("I", pa.string())]),
+        mode="dtypes",
+    )
+    assert diff.empty
+
+    valid_arsc = pa.schema([arsc.field("A"), arsc.field("C"), arsc.field("F")])
+    diff = DFValidateSchemaArrow().run(
+        sample_df5[["A", "C", "F"]], valid_arsc, mode="dtypes"
+    )
+    assert diff.empty
+
+    diff = DFValidateSchemaArrow().run(
+        sample_df5, arsc, mode="dtypes", compatible=False
+    )
+    assert dict(zip(diff["Field"], diff["Status"]))["A"] == "type mismatch"
+
+
+def test_infer_schema_samples(caplog):
+    """Tests arrow and avro schema inference from samples"""
+    sample_df6 = pd.DataFrame(
+        {"A": list(range(100)), "B": [None] * 50 + ["Lemurs"] * 50}
+    )
+
+    arsc = DFInferArrowSchema().run(sample_df6, sample="batches", sample_size=30)
+    assert arsc.field("A").type == pa.int64()
+    assert arsc.field("B").type == pa.string()
+
+    # the head only sees nulls in B, the confidence check widens it from a sample
+    arsc = DFInferArrowSchema().run(sample_df6, sample="head", sample_size=50)
+    assert arsc.field("B").type == pa.string()
+
+    # sampled rows keep their index, which isn't inferred as a field
+    caplog.clear()
+    arsc = DFInferArrowSchema(random_state=1).run(
+        sample_df6, sample="random", sample_size=80
+    )
+    assert arsc.names == ["A", "B"]
+    assert not [
+        record for record in caplog.records if record.levelno >= logging.WARNING
+    ]
+
+    # full and sampled inference agree on the index, whether it's kept or not
+    indexed_df6 = sample_df6.set_index(
+        pd.Index([f"k{num}" for num in range(100)], name="key")
+    )
+    for dataframe, names in [
+        (sample_df6, ["A", "B"]),
+        (indexed_df6, ["A", "B", "key"]),
+    ]:
+        full_arsc = DFInferArrowSchema().run(dataframe)
+        assert full_arsc.names == names
+        for sample in ["head", "random", "batches"]:
+            assert (
+                DFInferArrowSchema(random_state=1)
+                .run(dataframe, sample=sample, sample_size=60)
+                .equals(full_arsc)
+            )
+
+    assert DFInferArrowSchema().run(
+        indexed_df6, sample="random", preserve_index=False
+    ).names == ["A", "B"]
+
+    avsc = DFInferAvroSchema().run(
+        [sample_df6.iloc[:50], sample_df6.iloc[50:].astype({"A": "float64"})],
+        sample="batches",
+    )
+    assert [field["type"] for field in avsc["fields"]] == [
+        ["null", "double"],
+        ["null", "string"],
+    ]
+
+
+class RangeClient:
+    """object store client stand-in serving byte ranges of a local file"""
+
+    def __init__(self, filepath):
+        with open(filepath, "rb") as data_file:
+            self.data = data_file.read()
+        self.bytes_read = 0
+
+    def stat_object(self, bucket_name, object_name):
+        """object size and etag"""
+        return Box({"size": len(self.data), "etag": f"{bucket_name}/{object_name}"})
+
+    def get_object(self, bucket_name, object_name, offset=0, length=0):
+        """object byte range"""
+        assert bucket_name and object_name
+        self.bytes_read += length
+        response = io.BytesIO(self.data[offset : offset + length])
+        response.release_conn = lambda: None
+        return response
+
+
+def test_arrow_schema_footer(tmpdir):
+    """Tests reading arrow schemas from file footers"""
+    large_df = pd.DataFrame({"A": range(200000), "B": ["Lemurs"] * 200000})
+    arsc = DFInferArrowSchema().run(dataframe=large_df)
+
+    large_df.to_parquet(f"{tmpdir}/large.parquet")
+    large_df.to_feather(f"{tmpdir}/large.feather")
+
+    assert ArrowSchemaFromParquet().run(source=f"{tmpdir}/large.feather").equals(arsc)
+
+    # only the footer ranges of the remote object are fetched
+    client = RangeClient(f"{tmpdir}/large.parquet")
+    remote_arsc = ArrowSchemaFromParquet().run(
+        source="large.parquet", client=client, bucket_name="bucket"
+    )
+    assert remote_arsc.equals(arsc)
+    assert client.bytes_read < len(client.data) / 2
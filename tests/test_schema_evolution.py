@@ -0,0 +1,61 @@
+""" Tests schema evolution nuggets """
+import pandas as pd
+import pyarrow as pa
+from cupyopt.schema_evolution_tasks import DFProjectSchema, SchemaCompatibility
+
+# create a test avro schema dict and its evolution
+old_avsc_dict = {
+    "type": "record",
+    "name": "evolution_test",
+    "fields": [
+        {"name": "C", "type": ["null", "int"]},
+        {"name": "D", "type": ["null", "string"]},
+    ],
+}
+
+new_avsc_dict = {
+    "type": "record",
+    "name": "evolution_test",
+    "fields": [
+        {"name": "C", "type": ["null", "long"]},
+        {"name": "D", "type": ["null", "string"]},
+        {"name": "E", "type": ["null", "double"], "default": None},
+    ],
+}
+
+
+def test_avro_compatibility():
+    """Tests avro schema compatibility and projection"""
+    result = SchemaCompatibility().run(
+        old_schema=old_avsc_dict, new_schema=new_avsc_dict
+    )
+
+    # int promotes to long, but long can't be read back as int
+    assert result["backward"]
+    assert not result["forward"]
+
+    old_df = pd.DataFrame({"D": ["Lemurs", "Leopards"], "C": [1, 2]})
+    new_df = DFProjectSchema().run(old_df, plan=result["plan"])
+
+    assert list(new_df.columns) == ["C", "D", "E"]
+    assert str(new_df["C"].dtype) == "int64"
+    assert new_df["E"].isna().all()
+
+
+def test_arrow_compatibility():
+    """Tests arrow schema compatibility and projection"""
+    old_arsc = pa.schema([pa.field("C", pa.int32()), pa.field("D", pa.string())])
+    new_arsc = pa.schema(
+        [
+            pa.field("C", pa.int64()),
+            pa.field("E", pa.float64(), nullable=False),
+        ]
+    )
+
+    result = SchemaCompatibility().run(old_schema=old_arsc, new_schema=new_arsc)
+    assert not result["backward"]
+    assert "backward: field E is added and not nullable" in result["issues"]
+
+    table = DFProjectSchema().run(old_arsc.empty_table(), plan=result["plan"])
+    assert table.schema.names == ["C", "E"]
+    assert table.schema.field("C").type == pa.int64()
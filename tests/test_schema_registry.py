@@ -0,0 +1,122 @@
+""" Tests schema registry nuggets """
+import hashlib
+
+import pyarrow as pa
+import pytest
+from cupyopt.schema_registry_tasks import (
+    LocalSchemaRegistry,
+    SchemaRegistry,
+    SchemaRegistryGet,
+    SchemaRegistryRegister,
+)
+from cupyopt.schema_tasks import avro_fingerprint
+
+# create a test avro schema dict
+sample_avsc_dict = {
+    "type": "record",
+    "name": "registry_test",
+    "fields": [
+        {"name": "C", "type": ["null", "long"]},
+        {"name": "D", "type": ["null", "string"]},
+    ],
+}
+
+
+def test_local_schema_registry(tmpdir):
+    """Tests registering and getting schemas from a local registry"""
+    registry = LocalSchemaRegistry(root_dir=str(tmpdir))
+
+    # registering the same schema twice keeps the one version
+    version = SchemaRegistryRegister().run(
+        schema=sample_avsc_dict, registry=registry, schema_name="sample"
+    )
+    assert version == 1
+    assert registry.register("sample", sample_avsc_dict) == 1
+
+    evolved_avsc_dict = dict(
+        sample_avsc_dict,
+        fields=sample_avsc_dict["fields"] + [{"name": "E", "type": "double"}],
+    )
+    assert registry.register("sample", evolved_avsc_dict) == 2
+
+    avsc = SchemaRegistryGet().run(registry=registry, schema_name="sample")
+    assert [field["name"] for field in avsc["fields"]] == ["C", "D", "E"]
+
+    # cached by digest, modifying a returned schema doesn't change the cache
+    avsc = registry.get("sample", 1)
+    avsc["fields"].append({"name": "F", "type": "string"})
+    assert registry.get("sample", 1) is not avsc
+    assert len(registry.get("sample", 1)["fields"]) == 2
+
+    arsc = pa.schema([pa.field("C", pa.int64()), pa.field("D", pa.string())])
+    assert registry.register("sample_arrow", arsc) == 1
+    assert registry.get("sample_arrow").equals(arsc)
+
+
+def test_schema_registry_full_schema_versions(tmpdir):
+    """Tests schemas differing only by attributes outside the fingerprint version"""
+    registry = LocalSchemaRegistry(root_dir=str(tmpdir))
+    assert registry.register("sample", sample_avsc_dict) == 1
+
+    defaulted_avsc_dict = dict(
+        sample_avsc_dict,
+        fields=[dict(sample_avsc_dict["fields"][0], default=None)]
+        + sample_avsc_dict["fields"][1:],
+    )
+    dated_avsc_dict = dict(
+        sample_avsc_dict,
+        fields=sample_avsc_dict["fields"]
+        + [{"name": "E", "type": {"type": "int", "logicalType": "date"}}],
+    )
+    undated_avsc_dict = dict(
+        sample_avsc_dict,
+        fields=sample_avsc_dict["fields"] + [{"name": "E", "type": "int"}],
+    )
+    assert avro_fingerprint(defaulted_avsc_dict) == avro_fingerprint(sample_avsc_dict)
+    assert avro_fingerprint(dated_avsc_dict) == avro_fingerprint(undated_avsc_dict)
+
+    assert registry.register("sample", defaulted_avsc_dict) == 2
+    assert registry.register("sample", dated_avsc_dict) == 3
+    assert registry.register("sample", undated_avsc_dict) == 4
+    assert registry.register("sample", dated_avsc_dict) == 3
+
+    # each version shares the fingerprint but gets back its own schema
+    versions = registry.versions("sample")
+    assert versions[1] == versions[2] and versions[3] == versions[4]
+    assert "default" not in registry.get("sample", 1)["fields"][0]
+    assert registry.get("sample", 2)["fields"][0]["default"] is None
+    assert registry.get("sample", 3)["fields"][2]["type"]["logicalType"] == "date"
+    assert registry.get("sample", 4)["fields"][2]["type"] == "int"
+
+
+def test_avro_fingerprint():
+    """Tests avro fingerprints ignore attributes which don't affect parsing"""
+    documented_avsc_dict = {
+        "type": "record",
+        "name": "registry_test",
+        "namespace": "cupyopt",
+        "doc": "documented",
+        "fields": [
+            {"name": "C", "type": ["null", "long"], "default": None},
+            {"name": "D", "type": {"type": "string"}, "doc": "D"},
+            {"name": "E", "type": {"type": "enum", "name": "E", "symbols": ["X"]}},
+            {"name": "F", "type": "E"},
+        ],
+    }
+
+    canonical = (
+        '{"name":"cupyopt.registry_test","type":"record","fields":['
+        '{"name":"C","type":["null","long"]},{"name":"D","type":"string"},'
+        '{"name":"E","type":{"name":"cupyopt.E","type":"enum","symbols":["X"]}},'
+        '{"name":"F","type":"cupyopt.E"}]}'
+    )
+    assert (
+        avro_fingerprint(documented_avsc_dict)
+        == hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    )
+
+
+def test_schema_registry_is_abstract():
+    """Tests registries must provide their storage"""
+    with pytest.raises(TypeError):
+        SchemaRegistry()  # pylint: disable=abstract-class-instantiated